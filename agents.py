@@ -1,25 +1,37 @@
-import os
 import streamlit as st
-from dotenv import load_dotenv
-from langchain_core.tools import tool
-# Re-import the specific library for Google Gemini
-from langchain_google_genai import ChatGoogleGenerativeAI
-from crewai import Agent, Task, Crew, Process
+import bootstrap
 # --- 1. Application Configuration & Setup ---
+bootstrap.begin_page("agents")
+# This page defines its tools and agents on every run, so crewai and langchain
+# load with it; going through bootstrap.load records what each import costs.
 # To define the Auditor, we first need to instantiate the tools it will use.
 # We need to import the BaseTool class to create our own custom tools.
-from langchain_core.tools import BaseTool
+langchain_tools = bootstrap.load("langchain_core.tools")
+tool, BaseTool = langchain_tools.tool, langchain_tools.BaseTool
+crewai = bootstrap.load("crewai")
+Agent, Task = crewai.Agent, crewai.Task
 from pydantic import BaseModel, Field
-from typing import Type
-# Load environment variables from your .env file
-load_dotenv()
+from typing import Literal, Type
+from crew_registry import registry
+from dag_process import DagCrew
+from direct_tasks import DirectAgent, DirectTask
+import json
+import model_tiers
+import re
+import sandbox
+import submission_store
+import vector_memory
+import verification_rules
+import web_fetch
+crews = bootstrap.load("crews")
 
 # Configure the Streamlit page
 st.set_page_config(page_title="CrewAI Base Configuration", layout="centered")
 
-# Explicitly load your Google credentials from the .env file
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-google_cloud_project = os.getenv("GOOGLE_CLOUD_PROJECT")
+# Google credentials come from the .env file, read once per process
+config = bootstrap.config()
+gemini_api_key = config.gemini_api_key
+google_cloud_project = config.google_cloud_project
 
 # --- 2. Streamlit User Interface ---
 
@@ -44,12 +56,9 @@ if gemini_api_key and google_cloud_project:
     try:
         # Define the LLM using the robust ChatGoogleGenerativeAI class
         # This confirms that the connection to the service is working.
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-lite-001",
-            verbose=True,
-            temperature=0.3,
-            google_api_key=gemini_api_key
-        )
+        # The client is cached per process, so reruns reuse the same instance.
+        # Tasks start on Flash Lite and move to Flash only when their output fails its contract.
+        llm = crews.get_tiered_gemini_llm(gemini_api_key, temperature=0.3)
         st.success("✅ **LLM Connection:** Successfully initialized a connection to Google Gemini.")
         st.info("You can now add your Agents and Tasks to this script.")
         st.info("You can now add your Agents and Tasks to this script.")
@@ -116,7 +125,7 @@ if gemini_api_key and google_cloud_project:
 # It will be used to run verification scripts in a secure sandbox.
 #  For example, it can execute Python code to check JSON structure,
 #    run a linter, or execute a unit test.
-# FileReadTool: To read the submitted work file.
+# SubmissionReadTool: To read the submitted work file, a window of lines or a byte range at a time.
 # WebsiteSearchTool: To fetch any external dependencies needed for verification.
 
 # 4. The "Treasurer" Agent (Conceptual)
@@ -132,88 +141,190 @@ if gemini_api_key and google_cloud_project:
 # s This would be a custom tool you build. It would be a simple Python function that takes a wallet_address, amount, and milestone_id as input and makes the necessary API call to the CDP Wallet service to execute the payment.
 
 # """
-class CodeInterpreterTool(BaseTool):
+class CodeInterpreterInput(BaseModel):
+    """Input schema for the CodeInterpreterTool."""
+    code_to_execute: str = Field(..., description="The Python verification script. It should define `verify(file_content)`.")
+    file_content: str = Field("", description="The submitted work the script's `verify` function is called with.")
+
+# crewai agents only accept crewai tools, so the Auditor's tools derive from crewai's BaseTool
+class CodeInterpreterTool(crewai.tools.BaseTool):
     name: str = "Code Interpreter"
-    description: str = "Executes Python code in a sandboxed environment to verify a task. The code must be a single function."
-    args_schema: Type[BaseModel] = type('CodeInterpreterToolInput', (BaseModel,), {
-       # 'code_to_execute': Field(..., description="The Python code to be executed for verification.")
-    })
+    description: str = "Executes Python code in a sandboxed environment to verify a task. The code must define a single function `verify(file_content)`."
+    args_schema: Type[BaseModel] = CodeInterpreterInput
 
-    def _run(self, **kwargs) -> str:
-        # In a real scenario, you would execute this code in a secure sandbox
-        # and return the actual output ('SUCCESS' or 'FAILURE').
-        # For this hackathon, we can simulate the execution.
-        code = kwargs.get('code_to_execute')
+    def _run(self, code_to_execute: str, file_content: str = "") -> str:
+        # Runs on a warm, resource-limited worker (no network, capped CPU time,
+        # memory and wall clock) from the process-wide sandbox pool.
         st.info(f"🤖 **Auditor Action:** Executing verification script...")
-        st.code(code, language='python')
-        # Simulate a successful outcome for the demo
-        return "Execution Result: SUCCESS"
-
-class FileReadTool(BaseTool):
-    name: str = "File Reader"
-    description: str = "Reads the content of a local file to be used for verification."
-    args_schema: Type[BaseModel] = type('FileReadToolInput', (BaseModel,), {
-      #  'file_path': Field(..., description="The path to the file that needs to be read.")
-    })
-
-    def _run(self, **kwargs) -> str:
-        # In a real scenario, you would read the file from the filesystem.
-        # For this hackathon, we can simulate reading a file.
-        path = kwargs.get('file_path')
-        st.info(f"🤖 **Auditor Action:** Reading file from path: {path}")
-        return "File Content: {\"key\": \"value\", \"status\": \"submitted\"}"
-
-
-# Instantiate the correctly defined tools
-code_interpreter = CodeInterpreterTool()
-file_reader = FileReadTool()
+        st.code(code_to_execute, language='python')
+        outcome = sandbox.default_pool().run(code_to_execute, file_content or None)
+        if outcome.violation:
+            return f"Execution Result: FAILURE (sandbox violation: {outcome.violation})"
+        if not outcome.ok:
+            return f"Execution Result: FAILURE ({outcome.error})\nOutput:\n{outcome.stdout}"
+        return f"Execution Result: {outcome.result or 'SUCCESS'}\nOutput:\n{outcome.stdout}"
+
+# Instantiate the correctly defined tools once per process
+auditor_tools = registry.get(
+    "tools:auditor",
+    {},
+    lambda _: {"code_interpreter": CodeInterpreterTool(), "submission_reader": submission_store.SubmissionReadTool()},
+)
+code_interpreter = auditor_tools["code_interpreter"]
+# Start the sandbox workers now, so the Auditor's first check already runs on a warm one
+sandbox.default_pool()
+submission_reader = auditor_tools["submission_reader"]
 
 
 # Now, let's define the Auditor Agent
 st.header("Agent & Task Definition")
 
 try:
-    auditor_agent = Agent(
-        role='Automated Quality Assurance Engineer',
-        goal="To programmatically verify submitted work against a set of predefined rules and deliver a clear, final verdict ('verified' or 'rejected') with evidence.",
-        backstory=(
-            "You are an emotionless, logic-driven verification bot. "
-            "You exist to execute checks and report results. You are incorruptible, "
-            "and your analysis is based purely on the data and rules you are given. "
-            "You run a battery of tests to ensure nothing gets past you."
-        ),
-        llm=llm,  # Using the first LLM instance
-        #tools=[code_interpreter, file_reader],
-        verbose=True,
-        allow_delegation=False, # The Auditor's verdict should be final
-        memory=True
-    )
+    def build_auditor_agent(config):
+        return Agent(
+            role='Automated Quality Assurance Engineer',
+            goal="To programmatically verify submitted work against a set of predefined rules and deliver a clear, final verdict ('verified' or 'rejected') with evidence.",
+            backstory=(
+                "You are an emotionless, logic-driven verification bot. "
+                "You exist to execute checks and report results. You are incorruptible, "
+                "and your analysis is based purely on the data and rules you are given. "
+                "You run a battery of tests to ensure nothing gets past you."
+            ),
+            llm=llm,  # Using the first LLM instance
+            tools=[code_interpreter, submission_reader],
+            verbose=True,
+            allow_delegation=False, # The Auditor's verdict should be final
+            # crewai keeps memory per crew, not per agent: the Auditor's crews
+            # recall earlier verdicts from the local vector store (vector_memory.py)
+        )
+    # Agents are keyed by the LLM they wrap; a new LLM client rebuilds them.
+    auditor_agent = registry.get("agent:auditor", {"llm": id(llm)}, build_auditor_agent)
     st.success("✅ **Auditor Agent:** Created successfully.")
 
     # Define the primary task for the Auditor Agent
-    verification_task = Task(
-        description=(
-            "You have been provided with a path to a submitted file ('submitted_work.json') and a verification script. "
-            "Your critical mission is to determine if the submitted work is valid. "
-            "You must follow these steps precisely:\n"
-            "1. Use the FileReadTool to read the content of the file at 'submitted_work.json'.\n"
-            "2. Use the CodeInterpreterTool to execute the provided verification script. The script is designed to run against the file's content.\n"
-            "   (Verification Script: `def verify(file_content): return 'SUCCESS'`)\n" # Providing a dummy script in the description
-            "3. Analyze the output from the CodeInterpreterTool. The script will output a simple 'SUCCESS' or 'FAILURE' message.\n"
-            "4. Based *only* on the script's output, declare your final verdict."
-        ),
-        expected_output=(
-            "A single, definitive JSON object containing the verification status and a brief reason. "
-            "Example: `{{\"status\": \"verified\", \"reason\": \"All programmatic checks passed successfully.\"}}` or "
-            "`{{\"status\": \"rejected\", \"reason\": \"Verification script failed: The submitted JSON file has missing keys.\"}}`"
-        ),
-        agent=auditor_agent,
-    )
+    class AuditVerdict(BaseModel):
+        """The Auditor's typed verdict; malformed answers are repaired by the page's TypedLLM."""
+        status: Literal["verified", "rejected"]
+        reason: str
+    verdict_contract = model_tiers.Contract("auditor: verdict", model=AuditVerdict)
+    def build_verification_task(agent, check: str = "pending_checks"):
+        # `check` names the kickoff input with the checks this task evaluates
+        return Task(
+            description=(
+                "The deterministic verification rules have already checked this submission. "
+                "Checks that passed: {passed_checks}\n"
+                "Checks the rules could not decide, which are your critical mission:\n{" + check + "}\n\n"
+                "Submitted work (gig type '{gig_type}'): submission ID {submission_id}\n"
+                "Digest of the whole file: {submission_digest}\n\n"
+                "You must follow these steps precisely:\n"
+                "1. Evaluate only the pending checks against the submitted work. Read the parts you need with the "
+                "Submission Reader tool (a window of lines or a byte range); don't read the whole file. If a check needs code, "
+                "write a verification script `def verify(file_content)` and run it with the CodeInterpreterTool.\n"
+                "2. Based *only* on that evidence, declare your final verdict."
+            ),
+            expected_output=(
+                "A single, definitive JSON object containing the verification status and a brief reason. "
+                "Example: `{{\"status\": \"verified\", \"reason\": \"All programmatic checks passed successfully.\"}}` or "
+                "`{{\"status\": \"rejected\", \"reason\": \"Verification script failed: The submitted JSON file has missing keys.\"}}`"
+            ),
+            agent=agent,
+            name=check,
+            context=[],
+            output_pydantic=AuditVerdict,
+            # A verdict that isn't this JSON object is retried one model tier up
+            guardrail=verdict_contract.guard,
+        )
+    verification_task = registry.get("task:verification", {"agent": id(auditor_agent)},
+                                     lambda config: build_verification_task(auditor_agent))
     st.success("✅ **Verification Task:** Created successfully.")
 
 except Exception as e:
     st.error(f"An error occurred while creating the Agent or Task: {e}")
 
+# --- 3. Verify a Submission ---
+# Structural checks are decided locally by the rule set for the gig type; the
+# Auditor LLM only sees a submission when some check is left undecided.
+engine = verification_rules.default_engine()
+submissions = submission_store.default_store()
+
+def parse_verdict(raw):
+    match = re.search(r"\{.*\}", raw, re.DOTALL)
+    try:
+        return json.loads(match.group(0))
+    except (AttributeError, ValueError):
+        return {"status": "rejected", "reason": f"The Auditor did not return a JSON verdict: {raw[:200]}"}
+
+def merge_verdicts(inputs, upstream):
+    # Verified only if every check was; the reasons of the deciding checks, in check order
+    verdicts = [parse_verdict(raw) for raw in upstream.values()]
+    rejected = [v for v in verdicts if v.get("status") != "verified"]
+    return json.dumps({
+        "status": "rejected" if rejected else "verified",
+        "reason": " ".join(str(v.get("reason", "")) for v in rejected or verdicts),
+    })
+
+def build_auditor_crew(config):
+    # One Auditor per pending check, so the checks run concurrently as a task
+    # graph; a direct task merges their verdicts without another LLM call.
+    if config["checks"] == 1:
+        return DagCrew(agents=[auditor_agent], tasks=[verification_task], verbose=True, name="auditor",
+                       short_term_memory=vector_memory.short_term_memory("auditor"))
+    agents, checks = [], []
+    for i in range(config["checks"]):
+        agent = auditor_agent.copy()
+        agent.role = f"{auditor_agent.role} (check {i + 1})"
+        agents.append(agent)
+        checks.append(build_verification_task(agent, f"pending_check_{i}"))
+    merger = DirectAgent(role="Verdict Merger", goal="Merge the verdicts of the Auditor's checks.")
+    verdict = DirectTask(
+        name="verdict",
+        description="Merge the verdicts of the pending checks.",
+        expected_output="The JSON verdict for the whole submission.",
+        agent=merger,
+        context=checks,
+        action=merge_verdicts,
+    )
+    return DagCrew(agents=agents + [merger], tasks=checks + [verdict], verbose=True, name="auditor",
+                   short_term_memory=vector_memory.short_term_memory("auditor"))
+
+def llm_review(verdict, gig_type, submission_id):
+    checks = len(verdict.pending)
+    auditor_crew = registry.get(f"crew:auditor:{checks}", {"task": id(verification_task), "checks": checks},
+                                build_auditor_crew).copy()
+    inputs = {
+        "gig_type": gig_type,
+        "passed_checks": verdict.reason,
+        "pending_checks": "\n".join(f"- {check}" for check in verdict.pending),
+        "submission_id": submission_id,
+        "submission_digest": json.dumps(submissions.digest(submission_id)),
+    }
+    inputs.update({f"pending_check_{i}": f"- {check}" for i, check in enumerate(verdict.pending)})
+    return parse_verdict(auditor_crew.kickoff(inputs=inputs).raw)
+
+st.header("Verify a Submission")
+gig_type = st.selectbox("Gig type", list(engine.rule_sets), format_func=lambda t: f"{t} - {engine.rule_sets[t]['description']}")
+submitted_file = st.file_uploader("Submitted work", type=["json", "txt", "md"], key="submitted_work")
+reference_file = st.file_uploader("Reference file (e.g. en.json, for translations)", type=["json"], key="reference_file")
+
+if submitted_file is not None and st.button("Verify Submission"):
+    data = submitted_file.getvalue()
+    # Stored once by content hash; the Auditor reads it through the Submission Reader tool
+    submission_id = submissions.put(data)
+    files = {"submission": data.decode("utf-8")}
+    if reference_file is not None:
+        files["reference"] = reference_file.getvalue().decode("utf-8")
+    try:
+        verdict = engine.decide(gig_type, files, lambda v: llm_review(v, gig_type, submission_id))
+        st.json(verdict)
+    except Exception as e:
+        st.error(f"An error occurred while verifying the submission: {e}")
+
+verification_stats = engine.stats()
+st.caption(
+    f"Verdicts: {verification_stats['verdicts']} ({verification_stats['by_rules']} by rules, "
+    f"{verification_stats['by_llm']} by the Auditor LLM, {verification_stats['llm_skip_rate']:.0%} skipped the LLM)"
+)
+
 # create the gig architect agent
 # Define the input schema for the WebsiteScraperTool
 class WebsiteScraperInput(BaseModel):
@@ -232,16 +343,19 @@ class WebsiteScraperInput(BaseModel):
 @tool
 def website_scraper(url: str) -> str:
     """
-    Scrapes the content of a given URL and returns it as a string.
+    Scrapes the content of one or more URLs and returns their main text.
     Use this to fetch related materials for a gig from a web page or public GitHub file.
+    Pass several URLs separated by spaces or commas to fetch them all at once.
     
     Args:
-        url (str): The URL of the website to scrape.
+        url (str): The URL (or URLs) of the website to scrape.
     """
-    st.info(f"🤖 **Gig Architect Action:** Scraping content from URL: {url}")
-    # In a real app, you would use a library like BeautifulSoup or requests.
-    # For now, we return mock content to test the flow.
-    return "Scraped Content: This project requires translating a JSON file from English to Spanish. The file is located at 'data/en.json'."
+    urls = [u for u in re.split(r"[\s,]+", url) if u]
+    st.info(f"🤖 **Gig Architect Action:** Scraping content from: {', '.join(urls)}")
+    # Pooled HTTP client and on-disk cache with ETag/Last-Modified revalidation;
+    # each page is cut to a token budget so it fits in the agent's context.
+    results = web_fetch.default_fetcher().fetch_many(urls, token_budget=2000)
+    return web_fetch.format_results(results)
 
 
 st.success("✅ **Tools:** WebsiteScraperTool created successfully using the langchain @tool decorator.")
@@ -251,23 +365,34 @@ st.success("✅ **Tools:** WebsiteScraperTool created successfully using the lan
 # --- Define the Gig Architect Agent ---
 # The agent definition remains the same, but we pass the new function-based tool.
 try:
-    gig_architect_agent = Agent(
-        role='Senior Project Scoping Specialist',
-        goal="To transform a user's natural language request into a fully-defined, structured, and verifiable gig, complete with milestones and a programmable payout strategy.",
-        backstory=(
-            "You are a seasoned project manager with deep expertise in technical requirement analysis. "
-            "You are meticulous, detail-oriented, and excellent at asking clarifying questions to "
-            "eliminate all ambiguity before a project begins. You never leave anything to chance."
-        ),
-        llm=llm, # Reusing the same shared LLM instance
-        tools=[website_scraper], # Pass the decorated function directly as the tool
-        verbose=True,
-        allow_delegaion=True,
-        memory=True
-    )
+    def build_gig_architect_agent(config):
+        return Agent(
+            role='Senior Project Scoping Specialist',
+            goal="To transform a user's natural language request into a fully-defined, structured, and verifiable gig, complete with milestones and a programmable payout strategy.",
+            backstory=(
+                "You are a seasoned project manager with deep expertise in technical requirement analysis. "
+                "You are meticulous, detail-oriented, and excellent at asking clarifying questions to "
+                "eliminate all ambiguity before a project begins. You never leave anything to chance."
+            ),
+            llm=llm, # Reusing the same shared LLM instance
+            tools=[website_scraper], # Pass the decorated function directly as the tool
+            verbose=True,
+            allow_delegaion=True,
+            # Memory is set on the crew that runs this agent, as for the Auditor:
+            # Crew(..., short_term_memory=vector_memory.short_term_memory("gig_architect"))
+        )
+    gig_architect_agent = registry.get("agent:gig_architect", {"llm": id(llm)}, build_gig_architect_agent)
     st.success("✅ **Gig Architect Agent:** Created successfully.")
 
     # You can now define the task for this agent below this line
 
 except Exception as e:
     st.error(f"An error occurred while creating the Gig Architect Agent: {e}")
+
+
+# Cached objects reused across reruns of this page
+stats = registry.stats()
+st.caption(f"Crew registry: {stats['hits']} hits / {stats['misses']} misses")
+vector_memory.render_panel()
+
+bootstrap.end_page()
@@ -1,11 +1,14 @@
 import os
 import streamlit as st
-from crewai import Agent, Task, Crew, Process
-from langchain_groq import ChatGroq
-from dotenv import load_dotenv
+import bootstrap
 
 # --- Step 1: Load Environment Variables ---
-load_dotenv()
+bootstrap.begin_page("app")
+config = bootstrap.config()
+
+# crewai and the Groq client are imported (and timed) on first use
+crewai = bootstrap.lazy("crewai")
+crews = bootstrap.lazy("crews")
 
 # --- Streamlit Frontend ---
 st.title("🔑 API Key Diagnostic Tool")
@@ -13,7 +16,7 @@ st.markdown(f"**Location:** Madel, Goa, India | **Time:** {os.getenv('CURRENT_TI
 
 # --- Step 2: API KEY DIAGNOSTIC ---
 st.subheader("API Key Status")
-api_key = os.environ.get("GROQ_API_KEY")
+api_key = config.groq_api_key
 
 if api_key:
     st.success("✅ GROQ_API_KEY was found in the environment.")
@@ -27,11 +30,8 @@ else:
 # --- Step 3: Configure the LLM ---
 # We are going back to the stable LangChain Groq class and passing the key directly.
 try:
-    llm = ChatGroq(
-        model_name="llama3-8b-8192",
-        temperature=0.7,
-        groq_api_key=api_key # We pass the key directly here
-    )
+    # Shared per process and backed by the on-disk response cache
+    llm = crews.get_groq_llm(api_key, model_name="llama3-8b-8192", temperature=0.7)
     st.success("✅ LLM configured successfully.")
 
 except Exception as e:
@@ -49,19 +49,19 @@ if st.button("Run Agent Crew"):
         with st.spinner("🚀 Agent is running..."):
             try:
                 # Agent and Task setup remains the same
-                final_agent = Agent(
+                final_agent = crewai.Agent(
                     role="System Administrator",
                     goal=f"Confirm the API connection is working by writing about {topic}.",
                     backstory="You are an expert in resolving API authentication issues.",
                     llm=llm,
                     verbose=True
                 )
-                final_task = Task(
+                final_task = crewai.Task(
                     description=f"Write a short, successful confirmation message about {topic}.",
                     expected_output="A single success paragraph.",
                     agent=final_agent
                 )
-                final_crew = Crew(agents=[final_agent], tasks=[final_task], verbose=True)
+                final_crew = crewai.Crew(agents=[final_agent], tasks=[final_task], verbose=True)
 
                 result = final_crew.kickoff()
 
@@ -71,4 +71,6 @@ if st.button("Run Agent Crew"):
                 st.write(result)
 
             except Exception as e:
-                st.error(f"An error occurred while running the crew: {e}")
\ No newline at end of file
+                st.error(f"An error occurred while running the crew: {e}")
+
+bootstrap.end_page()
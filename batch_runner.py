@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+from dotenv import load_dotenv
+
+# --- Headless batch runner for the gig workflow ---
+# Usage:
+#   python batch_runner.py gigs.jsonl --output results.jsonl --concurrency 8
+#
+# Each input line is either a JSON string (the gig description) or an object
+# with a "gig_description" key and an optional "id". One result line is written
+# per gig as soon as it finishes, so output order follows completion order.
+
+
+def read_gigs(path: str, run_id: str = None):
+    """
+    Yields (gig_id, gig_description, error) triples from a JSONL file, skipping
+    blank lines. A malformed line yields its error instead of a description.
+    Lines without an "id" get `<run_id>:line-<n>`.
+    """
+    run_id = run_id or new_run_id()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            # Gig IDs key the escrow and payouts, so the default one is unique to this run
+            gig_id = f"{run_id}:line-{line_no}"
+            try:
+                record = json.loads(line)
+                if not isinstance(record, str):
+                    gig_id = str(record.get("id", gig_id))
+                    record = record["gig_description"]
+                if not isinstance(record, str) or not record.strip():
+                    raise TypeError("gig_description must be a non-empty string")
+                yield gig_id, record, None
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                yield gig_id, None, f"invalid input line: {type(e).__name__}: {e}"
+
+
+def new_run_id() -> str:
+    return f"run-{uuid.uuid4().hex[:12]}"
+
+
+def run_gig(gig_id: str, gig_description: str, groq_api_key: str, gemini_api_key: str = None) -> dict:
+    """Runs one gig through the crew and returns a JSON-serialisable result record."""
+    # Imported here so `--help` and input validation don't pay for crewai.
+    from crews import kickoff_gig
+
+    started = time.time()
+    start = time.perf_counter()
+    record = {"id": gig_id, "gig_description": gig_description, "started_at": started}
+    try:
+        result = kickoff_gig(gig_description, groq_api_key, gemini_api_key, gig_id=gig_id)
+        record["status"] = "ok"
+        record["result"] = getattr(result, "raw", str(result))
+        usage = getattr(result, "token_usage", None)
+        if usage is not None:
+            record["token_usage"] = usage.model_dump()
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["duration_s"] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def run_batch(gigs, output, groq_api_key: str, concurrency: int = 4, gemini_api_key: str = None) -> dict:
+    """
+    Runs gigs on a pool of `concurrency` worker threads and streams each result
+    to `output` as it completes. At most 2 x concurrency gigs are read ahead, so
+    arbitrarily large input files run in constant memory. Malformed input lines
+    get an error record and don't stop the batch.
+    """
+    write_lock = threading.Lock()
+    summary = {"ok": 0, "error": 0}
+    batch_start = time.perf_counter()
+
+    def write(record):
+        with write_lock:
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            summary[record["status"]] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="gig") as pool:
+        in_flight = set()
+        for gig_id, gig_description, error in gigs:
+            if error is not None:
+                write({"id": gig_id, "status": "error", "error": error})
+                continue
+            if len(in_flight) >= 2 * concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future.result())
+            in_flight.add(pool.submit(run_gig, gig_id, gig_description, groq_api_key, gemini_api_key))
+        for future in as_completed(in_flight):
+            write(future.result())
+
+    summary["wall_time_s"] = round(time.perf_counter() - batch_start, 4)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many gigs through the gig workflow crew.")
+    parser.add_argument("input", help="JSONL file with one gig per line")
+    parser.add_argument("--output", "-o", default="-", help="JSONL file for results (default: stdout)")
+    parser.add_argument("--concurrency", "-c", type=int, default=4, help="number of gigs run at once")
+    parser.add_argument("--no-settle", action="store_true", help="leave payouts unsettled after the run")
+    parser.add_argument("--run-id", help="ID of an interrupted run to resume; its gigs are not paid twice")
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    load_dotenv()
+    groq_api_key = os.getenv("GROQ_API_KEY")
+    if not groq_api_key:
+        parser.error("GROQ_API_KEY not found. Please set it in your .env file.")
+
+    output = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8")
+    try:
+        run_id = args.run_id or new_run_id()
+        print(f"run ID {run_id} (resume with --run-id {run_id})", file=sys.stderr)
+        # With a Gemini key too, calls are routed to whichever provider is fastest and healthy
+        summary = run_batch(read_gigs(args.input, run_id), output, groq_api_key, args.concurrency,
+                            gemini_api_key=os.getenv("GEMINI_API_KEY"))
+        summary["run_id"] = run_id
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if not args.no_settle:
+        # Pay every contributor owed by this run in a single settlement batch.
+        from ledger import default_ledger
+        summary["settlement_batch"] = default_ledger().settle()
+    print(json.dumps(summary), file=sys.stderr)
+    return 0 if summary["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
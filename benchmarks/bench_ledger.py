@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import Ledger, LedgerError
+
+# --- Ledger throughput benchmark ---
+# Usage: python benchmarks/bench_ledger.py --payouts 20000 --batch 500
+#
+# Funds each gig's escrow and posts a 3-way split payout from it against a
+# fresh on-disk SQLite ledger, flushing every --batch gigs, then settles
+# everything in one batch and checks that every entry still balances.
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure payout postings per second on a local SQLite ledger.")
+    parser.add_argument("--payouts", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=500, help="payouts written per transaction")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "bench.sqlite3"))
+        splits = {"alice": 50, "bob": 30, "carol": 20}
+
+        start = time.perf_counter()
+        for i in range(args.payouts):
+            ledger.fund(f"gig-{i}", 1_501)
+            ledger.post_payout(f"gig-{i}", 1_501, splits)
+            if (i + 1) % args.batch == 0:
+                ledger.flush()
+        ledger.flush()
+        post_s = time.perf_counter() - start
+
+        # Replaying the same payouts must not change any balance.
+        replay_start = time.perf_counter()
+        for i in range(args.batch):
+            ledger.post_payout(f"gig-{i}", 1_501, splits)
+        replayed = ledger.flush()
+        replay_s = time.perf_counter() - replay_start
+
+        # Paying out more than the escrow holds must be rejected.
+        ledger.post_payout("gig-0", 1, splits, milestone="extra")
+        try:
+            ledger.flush()
+            raise AssertionError("overdrawn escrow was accepted")
+        except LedgerError:
+            pass
+
+        start = time.perf_counter()
+        batch_id = ledger.settle()
+        settle_s = time.perf_counter() - start
+
+        settled = ledger.balances("settled:")
+        assert sum(settled.values()) == 1_501 * args.payouts, settled
+        assert replayed == 0
+        assert ledger.check_integrity()
+        ledger.close()
+
+    print(f"payouts posted:     {args.payouts} funded ({args.payouts * 6} postings) in {post_s:.3f}s")
+    print(f"payouts per second: {args.payouts / post_s:,.0f}")
+    print(f"postings per second: {args.payouts * 6 / post_s:,.0f}")
+    print(f"idempotent replay:  {args.batch} duplicates ignored in {replay_s * 1000:.1f}ms")
+    print(f"settlement {batch_id}: {len(settled)} contributors in {settle_s * 1000:.1f}ms")
+    print(f"settled balances:   {settled}")
+
+
+if __name__ == "__main__":
+    main()
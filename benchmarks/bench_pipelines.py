@@ -0,0 +1,244 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Everything the pipelines write goes to a scratch directory, and nothing
+# phones home: no keys, no network.
+SCRATCH = tempfile.mkdtemp(prefix="bench-pipelines-")
+os.environ.update({
+    "OTEL_SDK_DISABLED": "true",
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+    "LEDGER_PATH": os.path.join(SCRATCH, "ledger.sqlite3"),
+    "LLM_CACHE_PATH": os.path.join(SCRATCH, "llm_cache.sqlite3"),
+    "SUBMISSION_STORE_PATH": os.path.join(SCRATCH, "submissions"),
+    "VECTOR_MEMORY_PATH": os.path.join(SCRATCH, "vector_memory"),
+})
+
+import crewai
+import bujo_parser
+import crews
+import dag_process
+import submission_store
+import vector_memory
+import verification_rules
+from context_budget import BudgetedLLM
+from crew_stream import CrewStream
+from direct_tasks import DirectAgent, DirectTask
+from fake_llm import FakeLLM, ReActScript
+from typed_outputs import TypedLLM
+from upload_store import upload_store
+
+# --- End-to-end pipeline benchmark with a deterministic fake LLM ---
+# Usage: python benchmarks/bench_pipelines.py [--pipelines gig weaver] [--runs 5] [--latency-ms 0]
+#
+# Runs each page's crew pipeline offline, built by the same builders the pages
+# use, with FakeLLM in place of Groq/Gemini:
+#   gig       main.py      4-agent posting -> execution -> verification -> payment crew
+#   weaver    katha.py     parsed journal through the streaming Weaver crew (CrewStream)
+#   article   paywall.py   article crew reading an uploaded brief through its tool
+#   auditor   agents.py    rule engine + concurrent Auditor checks reading the submission store
+# With --latency-ms 0 the numbers are pure framework overhead. Per pipeline it
+# reports median wall and CPU time, Python peak memory (one extra traced run)
+# and LLM calls per run. Results are appended, with the current commit, to
+# benchmarks/results/pipelines.jsonl and compared with the previous commit's.
+
+JOURNAL = """\
+# 2025-09-01
+- . Write the gig spec *
+- o Standup with the payments team
+- - Quota refunds look wrong on retries !
+  - . Add a test for the refund path
+# 2025-09-02
+- x Ship the ledger batch job
+- o Demo day
+- - Users keep asking for streaming answers
+"""
+
+BRIEF = b"# Brief\n\nWrite about offline benchmarks for LLM pipelines: why provider latency hides framework cost.\n" * 20
+
+SUMMARY = "\n".join(f"Paragraph {i}: the source explains the milestones, acceptance notes and payout rules." for i in range(15))
+
+
+def fake(latency_s: float, **kwargs) -> FakeLLM:
+    return FakeLLM(latency_s=latency_s, jitter_s=latency_s / 2, seed=42, **kwargs)
+
+
+def gig_pipeline(latency_s):
+    llm = fake(latency_s, responder=ReActScript('{"status": "Approved", "notes": "The work is complete and matches the task."}'))
+    template = crews.build_gig_crew(BudgetedLLM(TypedLLM(llm), budget_tokens=crews.GIG_PROMPT_BUDGET), crews.get_gig_tools())
+    return llm, lambda: template.copy().kickoff(inputs=crews.gig_inputs("Translate en.json into German"))
+
+
+def weaver_pipeline(latency_s):
+    llm = fake(latency_s, stream=True, responder=ReActScript("It was a day of shipping and listening. " * 20))
+    template = crews.build_weaver_crew(llm)
+
+    def run():
+        entries = bujo_parser.render_compact(bujo_parser.parse(JOURNAL))
+        return "".join(CrewStream(template.copy(), {"journal_entries": entries}))
+    return llm, run
+
+
+def article_pipeline(latency_s):
+    document_id = upload_store.put("bench", "brief.md", BRIEF)
+    llm = fake(latency_s, responder=ReActScript(
+        "# Offline benchmarks\n\n" + "Provider latency hides framework cost. " * 60,
+        tool_inputs={"Uploaded Document Reader": {"document_id": document_id}},
+    ))
+    template = crews.build_article_crew(llm)
+    return llm, lambda: template.copy().kickoff(inputs={"document_id": document_id})
+
+
+def auditor_pipeline(latency_s):
+    # agents.py defines its Auditor in the page; this is the same agent/tool/task
+    # graph: one Auditor task per pending check, then a direct task merging verdicts.
+    store = submission_store.default_store()
+    submission_id = store.put(SUMMARY.encode())
+    llm = fake(latency_s, responder=ReActScript(
+        '{"status": "verified", "reason": "The summary matches the source."}',
+        tool_inputs={"Submission Reader": {"submission_id": submission_id, "start_line": 0, "line_count": 50}},
+    ))
+    rules = dict(verification_rules.RULE_SETS)
+    rules["summary"] = dict(rules["summary"], judgment=rules["summary"]["judgment"] + [
+        "The summary covers the payout rules."])
+    engine = verification_rules.VerificationEngine(rules)
+    agents, checks = [], []
+    for i in range(len(rules["summary"]["judgment"])):
+        auditor = crewai.Agent(role=f"Automated Quality Assurance Engineer (check {i + 1})", goal="Verify submitted work.",
+                               backstory="A logic-driven verification bot.", llm=llm,
+                               tools=[submission_store.SubmissionReadTool()], allow_delegation=False)
+        agents.append(auditor)
+        checks.append(crewai.Task(
+            name=f"pending_check_{i}",
+            description=("Checks that passed: {passed_checks}\nPending checks:\n{pending_check_" + str(i) + "}\n"
+                         "Submission {submission_id} (gig type '{gig_type}'), digest: {submission_digest}"),
+            expected_output='A JSON object like {{"status": "verified", "reason": "..."}}',
+            agent=auditor,
+            context=[],
+        ))
+
+    def merge(inputs, upstream):
+        verdicts = [json.loads(raw) for raw in upstream.values()]
+        rejected = [v for v in verdicts if v["status"] != "verified"]
+        return json.dumps({"status": "rejected" if rejected else "verified",
+                           "reason": " ".join(v["reason"] for v in rejected or verdicts)})
+
+    merger = DirectAgent(role="Verdict Merger", goal="Merge the verdicts of the Auditor's checks.")
+    verdict_task = DirectTask(name="verdict", description="Merge the verdicts.", expected_output="A JSON verdict.",
+                              agent=merger, context=checks, action=merge)
+    template = dag_process.DagCrew(agents=agents + [merger], tasks=checks + [verdict_task], name="auditor",
+                                   short_term_memory=vector_memory.short_term_memory("auditor"))
+
+    def review(verdict):
+        inputs = {"gig_type": "summary", "passed_checks": verdict.reason,
+                  "submission_id": submission_id, "submission_digest": json.dumps(store.digest(submission_id))}
+        inputs.update({f"pending_check_{i}": check for i, check in enumerate(verdict.pending)})
+        return json.loads(template.copy().kickoff(inputs=inputs).raw)
+
+    return llm, lambda: engine.decide("summary", {"submission": SUMMARY}, review)
+
+
+PIPELINES = {"gig": gig_pipeline, "weaver": weaver_pipeline, "article": article_pipeline, "auditor": auditor_pipeline}
+
+
+def measure(name: str, runs: int, latency_s: float) -> dict:
+    llm, run = PIPELINES[name](latency_s)
+    quiet = io.StringIO()
+    with contextlib.redirect_stdout(quiet):
+        run()  # warm-up: first-use imports and lazy setup
+        walls, cpus, calls, reports = [], [], [], []
+        for _ in range(runs):
+            before = llm.calls
+            wall, cpu = time.perf_counter(), time.process_time()
+            run()
+            walls.append(time.perf_counter() - wall)
+            cpus.append(time.process_time() - cpu)
+            calls.append(llm.calls - before)
+            reports.append(dag_process.default_stats().last(name))
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    result = {"pipeline": name, "runs": runs, "latency_ms": latency_s * 1000, "wall_median_s": median(walls),
+              "cpu_median_s": median(cpus), "peak_mb": peak / 1e6, "llm_calls": median(calls)}
+    # Crews that run as a task graph also report their critical path (timed runs
+    # only: the tracemalloc run is several times slower)
+    reports = [report for report in reports if report]
+    if reports:
+        result["critical_path_s"] = median([report["critical_path_s"] for report in reports])
+        result["sum_of_tasks_s"] = median([report["sum_of_tasks_s"] for report in reports])
+    return result
+
+
+def git_commit() -> str:
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() or "unknown"
+
+
+def previous(output: str, commit: str, latency_ms: float) -> dict:
+    """The last recorded result per pipeline from another commit, at the same synthetic latency."""
+    found = {}
+    if os.path.exists(output):
+        with open(output, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["commit"] != commit:
+                    for result in record["pipelines"]:
+                        if result.get("latency_ms") == latency_ms:
+                            found[result["pipeline"]] = dict(result, commit=record["commit"])
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every crew pipeline offline with a fake LLM.")
+    parser.add_argument("--pipelines", nargs="+", choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="synthetic latency per LLM call")
+    parser.add_argument("--threshold", type=float, default=0.2, help="flag wall/CPU changes above this fraction")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "pipelines.jsonl"))
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    baseline = previous(args.output, commit, args.latency_ms)
+    results = []
+    try:
+        for name in args.pipelines:
+            result = measure(name, args.runs, args.latency_ms / 1000)
+            results.append(result)
+            line = (f"{name:8s} wall {result['wall_median_s'] * 1000:8.1f} ms   cpu {result['cpu_median_s'] * 1000:8.1f} ms   "
+                    f"peak {result['peak_mb']:6.1f} MB   llm calls {result['llm_calls']:g}")
+            if "critical_path_s" in result:
+                line += (f"   critical path {result['critical_path_s'] * 1000:.1f} ms"
+                         f" of {result['sum_of_tasks_s'] * 1000:.1f} ms in tasks")
+            before = baseline.get(name)
+            if before:
+                changes = []
+                for field in ("wall_median_s", "cpu_median_s"):
+                    change = result[field] / before[field] - 1 if before[field] else 0.0
+                    flag = " !" if change > args.threshold else ""
+                    changes.append(f"{field.split('_')[0]} {change:+.0%}{flag}")
+                line += f"   vs {before['commit']}: {', '.join(changes)}"
+            print(line)
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"commit": commit, "at": time.time(), "pipelines": results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quota import QuotaTracker
+
+# --- Free-quota microbenchmark ---
+# Usage: python benchmarks/bench_quota.py --users 20000 --processes 4
+#
+# Measures the per-request cost of check() and consume(), then has several
+# processes race to consume the same users' quota and checks that every user
+# got exactly `limit` free uses in total.
+
+
+def per_request_us(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def race(path, users, attempts, results):
+    tracker = QuotaTracker(path)
+    granted = sum(tracker.consume(user).allowed for user in users for _ in range(attempts))
+    tracker.close()
+    results.put(granted)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure quota check/consume cost and cross-process correctness.")
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = QuotaTracker(os.path.join(tmp, "quota.bin"))
+        users = [f"user-{i}" for i in range(args.users)]
+        consume = per_request_us(tracker.consume, users)
+        check = per_request_us(tracker.check, users)
+        for _ in range(tracker.limit):
+            tracker.consume(users[0])
+        denied = per_request_us(tracker.consume, [users[0]] * args.users)
+        print(f"consume:         {consume:6.2f} us/request  ({1e6 / consume:,.0f} req/s)")
+        print(f"check:           {check:6.2f} us/request  ({1e6 / check:,.0f} req/s)")
+        print(f"consume, denied: {denied:6.2f} us/request  ({1e6 / denied:,.0f} req/s)")
+        print(f"tracker stats:   {tracker.stats()}")
+        tracker.close()
+
+        path = os.path.join(tmp, "race.bin")
+        QuotaTracker(path).close()
+        racers = users[:1_000]
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=race, args=(path, racers, 2, results)) for _ in range(args.processes)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        granted = sum(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        expected = len(racers) * min(QuotaTracker(path).limit, 2 * args.processes)
+        print(f"{args.processes} processes: {granted} free uses granted for {len(racers)} users "
+              f"(expected {expected}) in {elapsed:.2f} s")
+        assert granted == expected, (granted, expected)
+
+
+if __name__ == "__main__":
+    main()
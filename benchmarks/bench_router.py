@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from fake_llm import FakeLLM
+from llm_metrics import percentile
+from llm_router import RouterLLM
+
+# --- Router benchmark against local stub providers ---
+# Usage: python benchmarks/bench_router.py --calls 300 --concurrency 4
+#
+# Two FakeLLM providers stand in for Groq and Gemini:
+#   fast    40 ms +-10 ms, but 4% of calls stall for 1 s and 5% fail
+#   steady  90 ms +-30 ms, 1% fail
+# Each setup answers the same number of calls; a failed call counts as an
+# error for the single-provider setups and fails over inside the router.
+
+
+def providers(seed: int) -> dict:
+    return {
+        "fast": FakeLLM(model="stub/fast", responder="ok", latency_s=0.04, jitter_s=0.01,
+                        slow_rate=0.04, slow_s=1.0, fail_rate=0.05, seed=seed),
+        "steady": FakeLLM(model="stub/steady", responder="ok", latency_s=0.09, jitter_s=0.03,
+                          fail_rate=0.01, seed=seed + 1),
+    }
+
+
+def run(label: str, llm, calls: int, concurrency: int):
+    def one(_):
+        start = time.perf_counter()
+        try:
+            llm.call("benchmark prompt")
+            return time.perf_counter() - start, False
+        except Exception:
+            return time.perf_counter() - start, True
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(calls)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(failed for _, failed in results)
+    return (f"{label:14s} p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  "
+            f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  errors {errors:3d}  total {elapsed:5.1f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare single providers with the router, with and without hedging.")
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    # Silence crewai's console rendering of the injected failures
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            setups = [
+                ("fast only", providers(1)["fast"]),
+                ("steady only", providers(1)["steady"]),
+                ("router", RouterLLM(providers(1))),
+                ("router+hedge", RouterLLM(providers(1), hedge=True)),
+            ]
+            lines = [run(label, llm, args.calls, args.concurrency) for label, llm in setups]
+        finally:
+            sys.stdout = stdout
+    print("\n".join(lines))
+    for label, llm in setups[2:]:
+        stats = llm.stats()
+        routes = ", ".join(f"{name}: {r['calls']} calls, {r['errors']} errors, {r['hedge_wins']} hedge wins"
+                           for name, r in stats["routes"].items())
+        print(f"{label}: {stats['failovers']} failovers, {stats['hedged']} hedged; {routes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sandbox import SandboxPool
+
+# --- Sandbox benchmark ---
+# Usage: python benchmarks/bench_sandbox.py --checks 500
+#
+# Compares running a verification script on a warm pool worker with starting a
+# fresh interpreter per check, then runs one script per limit to show each
+# violation being caught (and its worker replaced).
+
+VERIFY = """
+import json
+def verify(file_content):
+    data = json.loads(file_content)
+    return "SUCCESS" if {"key", "status"} <= data.keys() else "FAILURE"
+"""
+SUBMISSION = '{"key": "value", "status": "submitted"}'
+
+VIOLATIONS = {
+    "cpu": "def verify():\n    while True:\n        pass",
+    "memory": "blob = bytearray(1024 * 1024 * 1024)",
+    "network": "import socket\nsocket.create_connection(('example.com', 80))",
+    "subprocess": "import os\nos.system('true')",
+    "file write": "open('sandbox-escape.txt', 'w').write('x')",
+    "file read": "open(__import__('os').path.expanduser('~/.bashrc')).read()",
+    "file delete": "import os\nos.remove('/tmp/sandbox-escape.txt')",
+    "wall clock": "import time\ntime.sleep(60)",
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure warm sandbox checks against a fresh interpreter per check.")
+    parser.add_argument("--checks", type=int, default=500)
+    parser.add_argument("--fresh", type=int, default=20, help="fresh-interpreter checks to time")
+    args = parser.parse_args(argv)
+
+    pool = SandboxPool(size=2, cpu_s=1.0, timeout_s=3.0)
+    start = time.perf_counter()
+    for _ in range(args.checks):
+        result = pool.run(VERIFY, SUBMISSION)
+    warm = (time.perf_counter() - start) / args.checks * 1000
+    assert result.result == "SUCCESS", result
+
+    script = VERIFY + f"\nprint(verify({SUBMISSION!r}))"
+    start = time.perf_counter()
+    for _ in range(args.fresh):
+        subprocess.run([sys.executable, "-I", "-c", script], capture_output=True, check=True)
+    fresh = (time.perf_counter() - start) / args.fresh * 1000
+
+    print(f"warm pool worker:    {warm:8.2f} ms/check")
+    print(f"fresh interpreter:   {fresh:8.2f} ms/check  ({fresh / warm:,.0f}x slower)")
+    for name, code in VIOLATIONS.items():
+        result = pool.run(code)
+        print(f"{name:12s} -> {result.violation or result.error or 'not caught!'} ({result.duration_s * 1000:.0f} ms)")
+    print(f"pool stats: {pool.stats()}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --- Startup benchmark for the Streamlit pages ---
+# Usage: python benchmarks/bench_startup.py [--pages katha.py main.py] [--reruns 5]
+#
+# Each page runs in a fresh interpreter under streamlit's AppTest: the first
+# run is the cold start (the page's imports included), the following runs
+# are warm reruns in the same process, just as Streamlit does them. A second
+# pass uses `python -X importtime` to break the cost of importing `crews`
+# (what a page pays the first time a crew runs) down by package.
+# Results are appended, with the current commit, to benchmarks/results/startup.jsonl.
+
+PAGES = ["katha.py", "main.py", "paywall.py", "agents.py", "geminiapp.py", "brutal.py", "app.py"]
+
+_CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_s = time.perf_counter() - start
+page, reruns = sys.argv[1], int(sys.argv[2])
+at = AppTest.from_file(page, default_timeout=300)
+start = time.perf_counter()
+at.run()
+cold = time.perf_counter() - start
+warm = []
+for _ in range(reruns):
+    start = time.perf_counter()
+    at.run()
+    warm.append(time.perf_counter() - start)
+print(json.dumps({"streamlit_import_s": streamlit_s, "cold_s": cold, "warm_s": warm,
+                  "exceptions": len(at.exception), "heavy_loaded": [m for m in ("crewai", "litellm", "langchain_core") if m in sys.modules]}))
+"""
+
+
+def child_env() -> dict:
+    # Placeholder keys let every page render its full UI; nothing is sent anywhere.
+    env = dict(os.environ)
+    for key in ("GEMINI_API_KEY", "GOOGLE_API_KEY", "GROQ_API_KEY", "GOOGLE_CLOUD_PROJECT"):
+        env.setdefault(key, "benchmark-placeholder")
+    env.pop("STARTUP_PROFILE", None)
+    return env
+
+
+def time_page(page: str, reruns: int) -> dict:
+    proc = subprocess.run([sys.executable, "-c", _CHILD, page, str(reruns)], cwd=ROOT, env=child_env(),
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"page": page, "error": proc.stderr.strip().splitlines()[-1:]}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["warm_median_s"] = median(result.pop("warm_s")) if reruns else None
+    return dict(page=page, **result)
+
+
+def import_profile(module: str, top: int) -> list:
+    """Self time per top-level package while importing `module`, slowest first."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                          env=child_env(), capture_output=True, text=True)
+    per_package = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        per_package[name.strip().partition(".")[0]] += int(self_us)
+    ranked = sorted(per_package.items(), key=lambda item: item[1], reverse=True)
+    return [{"package": name, "seconds": round(us / 1e6, 4)} for name, us in ranked[:top]]
+
+
+def git_commit() -> str:
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() or "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start and warm rerun time of the Streamlit pages.")
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to list in the import profile")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "startup.jsonl"))
+    args = parser.parse_args(argv)
+
+    pages = []
+    for page in args.pages:
+        result = time_page(page, args.reruns)
+        pages.append(result)
+        if "error" in result:
+            print(f"{page:14s} failed: {result['error']}")
+        else:
+            warm = f"{result['warm_median_s'] * 1000:8.1f} ms" if result["warm_median_s"] is not None else "       -"
+            print(f"{page:14s} cold {result['cold_s'] * 1000:8.1f} ms   warm {warm}   "
+                  f"heavy modules on load: {', '.join(result['heavy_loaded']) or 'none'}")
+
+    imports = import_profile("crews", args.top)
+    print(f"\nimporting crews (first crew run), self time by package:")
+    for item in imports:
+        print(f"  {item['package']:28s} {item['seconds'] * 1000:8.1f} ms")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"commit": git_commit(), "at": time.time(), "pages": pages, "crews_import": imports}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_memory import VectorStore
+
+# --- Vector memory microbenchmark ---
+# Usage: python benchmarks/bench_vector_memory.py --entries 20000 --dim 128
+#
+# Fills a store to capacity with synthetic texts, then measures recall latency
+# for queries the store has never seen (p50/p99 including embedding the query,
+# and the embedding alone), the cost of saves that evict, and how long
+# reopening the memory-mapped store takes.
+
+WORDS = ("payout milestone ledger verified rejected summary translation submission quota refund gig "
+         "review header csv log error contract budget agent task crew deadline invoice wallet").split()
+
+
+def synthetic_texts(count: int, seed: int = 7) -> list:
+    rng = np.random.default_rng(seed)
+    return [f"entry {i}: " + " ".join(rng.choice(WORDS, size=12)) for i in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure vector memory recall latency, eviction and reopen cost.")
+    parser.add_argument("--entries", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=2_000)
+    args = parser.parse_args(argv)
+
+    texts = synthetic_texts(args.entries + args.queries)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench")
+        store = VectorStore(path, capacity=args.entries, dim=args.dim)
+        start = time.perf_counter()
+        for text in texts[:args.entries]:
+            store.add(text)
+        fill = (time.perf_counter() - start) / args.entries * 1e6
+        # Fresh word mixes, so every query is embedded during its search
+        queries = [text.split(":", 1)[1] for text in synthetic_texts(2 * args.queries, seed=11)]
+        start = time.perf_counter()
+        for query in queries[args.queries:]:
+            store.embed([query])
+        embed = (time.perf_counter() - start) / args.queries * 1e3
+        embedded = store.counters["embedded"]
+        for query in queries[:args.queries]:
+            store.search(query, limit=3, score_threshold=0.35)
+        assert store.counters["embedded"] - embedded == args.queries
+        stats = store.stats()
+        start = time.perf_counter()
+        for text in texts[args.entries:]:
+            store.add(text)
+        evicting = (time.perf_counter() - start) / args.queries * 1e6
+        store.close()
+
+        start = time.perf_counter()
+        reopened = VectorStore(path, capacity=args.entries, dim=args.dim)
+        reopen = time.perf_counter() - start
+        assert reopened.size == args.entries and reopened.counters["embedded"] == 0
+        reopened.close()
+
+    print(f"{args.entries} entries x {args.dim} dims ({args.entries * args.dim * 4 / 1e6:.1f} MB float32)")
+    print(f"recall (unseen): p50 {stats['search_p50_ms']:.3f} ms   p99 {stats['search_p99_ms']:.3f} ms")
+    print(f"  of which embed:    {embed:.3f} ms/query")
+    print(f"save (embed):    {fill:7.1f} us/entry")
+    print(f"save, evicting:  {evicting:7.1f} us/entry")
+    print(f"reopen:          {reopen * 1000:7.1f} ms, nothing re-embedded")
+
+
+if __name__ == "__main__":
+    main()
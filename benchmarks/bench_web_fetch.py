@@ -0,0 +1,108 @@
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web_fetch import WebFetcher
+
+# --- Web fetch benchmark against a local HTTP server fixture ---
+# Usage: python benchmarks/bench_web_fetch.py --pages 40 --latency-ms 50
+#
+# The fixture serves HTML pages with ETag/Last-Modified and a fixed response
+# latency, and counts full (200) and conditional (304) answers. Passes:
+#   sequential   cold fetch of every page, one after another
+#   concurrent   cold fetch of every page with fetch_many (fresh cache file)
+#   fresh        every page again within fresh_s: no requests at all
+#   revalidate   fresh_s=0: every page is revalidated and answered with 304
+
+
+class FixtureServer:
+    def __init__(self, pages: int, latency_s: float, paragraphs: int = 200):
+        self.latency_s = latency_s
+        self.counts = {"200": 0, "304": 0}
+        self.lock = threading.Lock()
+        self.pages = {}
+        for i in range(pages):
+            body = "".join(f"<p>Paragraph {j} of page {i}: requirements, milestones and acceptance notes.</p>" for j in range(paragraphs))
+            html = (f"<html><head><title>Gig material {i}</title><script>var x = 1;</script></head>"
+                    f"<body><nav>Home | Docs</nav><main>{body}</main><footer>(c) fixture</footer></body></html>").encode()
+            self.pages[f"/page/{i}"] = (html, '"' + hashlib.sha256(html).hexdigest()[:16] + '"')
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                time.sleep(server.latency_s)
+                html, etag = server.pages[self.path]
+                if self.headers.get("If-None-Match") == etag:
+                    with server.lock:
+                        server.counts["304"] += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                with server.lock:
+                    server.counts["200"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", "Mon, 01 Sep 2025 00:00:00 GMT")
+                self.send_header("Content-Length", str(len(html)))
+                self.end_headers()
+                self.wfile.write(html)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.urls = [f"http://127.0.0.1:{self.httpd.server_address[1]}{path}" for path in self.pages]
+
+
+def timed(label, fn, server):
+    before = dict(server.counts)
+    start = time.perf_counter()
+    results = fn()
+    elapsed = time.perf_counter() - start
+    requests = {k: server.counts[k] - before[k] for k in before}
+    sources = {s: sum(r.source == s for r in results) for s in ("network", "cache", "revalidated")}
+    print(f"{label:11s} {elapsed * 1000:8.1f} ms   200s: {requests['200']:3d}  304s: {requests['304']:3d}   {sources}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark WebFetcher against a local HTTP fixture.")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--budget", type=int, default=1500, help="token budget per page")
+    args = parser.parse_args(argv)
+
+    server = FixtureServer(args.pages, args.latency_ms / 1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        sequential = WebFetcher(os.path.join(tmp, "seq.sqlite3"))
+        timed("sequential", lambda: [sequential.fetch(u, args.budget) for u in server.urls], server)
+        sequential.close()
+
+        fetcher = WebFetcher(os.path.join(tmp, "web.sqlite3"))
+        results = timed("concurrent", lambda: fetcher.fetch_many(server.urls, args.budget), server)
+        timed("fresh", lambda: fetcher.fetch_many(server.urls, args.budget), server)
+        fetcher.fresh_s = 0
+        timed("revalidate", lambda: fetcher.fetch_many(server.urls, args.budget), server)
+        fetcher.close()
+
+    sample = results[0]
+    print(f"\npage 0: {sample.tokens} tokens, truncated={sample.truncated}; starts with {sample.text[:60]!r}")
+    server.httpd.shutdown()
+
+
+if __name__ == "__main__":
+    main()
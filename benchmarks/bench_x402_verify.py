@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from x402 import FacilitatorServer, LocalWallet, PaidResource, encode_header
+from x402_verify import CLOCK_SKEW_S, PaymentVerifier, decode_header
+
+# --- x402 verification microbenchmark ---
+# Usage: python benchmarks/bench_x402_verify.py --payments 5000
+#
+# Measures the per-request cost of the verification hot path without HTTP:
+#   verify (cold)   first sight of a payment: decode + checks + ECDSA verify
+#   verify (warm)   re-verifying a known payment (memoized decode and signature)
+#   settle          the facilitator's second pass, which also consumes the nonce
+#   replay          rejecting an already settled payment
+#   batch           settling a burst of fresh headers with settle_batch
+
+
+def per_request_us(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure x402 payment verification cost per request.")
+    parser.add_argument("--payments", type=int, default=5_000)
+    parser.add_argument("--wallets", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    server = FacilitatorServer()
+    server.add_resource(PaidResource("/article", 0.50, "One generated article"))
+    requirements = server.requirements(server.resources["/article"])
+    wallets = [LocalWallet() for _ in range(args.wallets)]
+
+    def signed_headers(n):
+        return [encode_header(wallets[i % len(wallets)].sign_payment(requirements)) for i in range(n)]
+
+    verifier = PaymentVerifier()
+    for wallet in wallets:
+        verifier.register(wallet.address, wallet.public_key_bytes)
+
+    headers = signed_headers(args.payments)
+    cold = per_request_us(lambda h: verifier.verify(h, requirements), headers)
+    warm = per_request_us(lambda h: verifier.verify(h, requirements), headers)
+    settle = per_request_us(lambda h: verifier.settle(h, requirements), headers)
+    replay = per_request_us(lambda h: verifier.settle(h, requirements), headers)
+
+    burst = signed_headers(args.payments)
+    start = time.perf_counter()
+    results = verifier.settle_batch(burst + burst[: len(burst) // 10], requirements)
+    batch = (time.perf_counter() - start) / len(results) * 1e6
+
+    accepted = sum(r.ok for r in results)
+    assert accepted == len(burst), accepted
+    assert not any(verifier.settle(h, requirements).ok for h in headers[:100])
+    # Replays stay rejected up to the last second the payment itself is valid
+    last_valid = int(decode_header(headers[0])["payload"]["authorization"]["validBefore"]) + CLOCK_SKEW_S
+    assert not verifier.settle(headers[0], requirements, now=last_valid).ok
+
+    print(f"verify, cold:   {cold:8.1f} us/request  ({1e6 / cold:,.0f} req/s)")
+    print(f"verify, warm:   {warm:8.1f} us/request  ({1e6 / warm:,.0f} req/s)")
+    print(f"settle:         {settle:8.1f} us/request  ({1e6 / settle:,.0f} req/s)")
+    print(f"replay reject:  {replay:8.1f} us/request  ({1e6 / replay:,.0f} req/s)")
+    print(f"settle_batch:   {batch:8.1f} us/request  ({accepted} accepted, {len(results) - accepted} replays rejected)")
+    print(f"verifier stats: {verifier.stats()}")
+
+
+if __name__ == "__main__":
+    main()
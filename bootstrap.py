@@ -0,0 +1,168 @@
+import importlib
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from statistics import median
+from typing import Optional
+
+# --- Shared bootstrap for the Streamlit pages ---
+# Streamlit re-executes a page on every interaction, but imported modules and
+# module state survive for the life of the server process. Pages therefore:
+#   * read .env and the API keys once per process through `config()`;
+#   * import crewai / langchain / litellm (via crews, tools, ...) with `lazy()`,
+#     so the import happens the first time a crew actually runs, not on page load;
+#   * wrap their script in `begin_page()` / `end_page()`, which records how long
+#     each run took (the first run in a process is the cold one).
+# Set STARTUP_PROFILE=1 or open a page with `?profile=1` to see the import and
+# rerun timings under the page.
+
+PROFILE_ENV = "STARTUP_PROFILE"
+RECENT_RUNS = 50
+
+
+@dataclass(frozen=True)
+class Config:
+    gemini_api_key: Optional[str] = None
+    google_api_key: Optional[str] = None
+    groq_api_key: Optional[str] = None
+    google_cloud_project: Optional[str] = None
+
+
+_config = None
+_lock = threading.Lock()
+_imports = []
+_runs = {}
+_current = threading.local()
+
+
+# --- 1. Configuration ---
+
+def config() -> Config:
+    """The process-wide configuration; .env is read on the first call only."""
+    global _config
+    if _config is None:
+        with _lock:
+            if _config is None:
+                start = time.perf_counter()
+                from dotenv import load_dotenv
+                load_dotenv()
+                _config = Config(
+                    gemini_api_key=os.getenv("GEMINI_API_KEY"),
+                    google_api_key=os.getenv("GOOGLE_API_KEY"),
+                    groq_api_key=os.getenv("GROQ_API_KEY"),
+                    google_cloud_project=os.getenv("GOOGLE_CLOUD_PROJECT"),
+                )
+                _imports.append({"module": "config (.env)", "seconds": time.perf_counter() - start, "new_modules": 0, "packages": {}})
+    return _config
+
+
+def reload_config() -> Config:
+    """Forgets the cached configuration, e.g. after .env was edited."""
+    global _config
+    with _lock:
+        _config = None
+    return config()
+
+
+# --- 2. Deferred imports ---
+
+def load(name: str):
+    """Imports `name` (if needed) and records what the import cost."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    before = set(sys.modules)
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+    new = set(sys.modules) - before
+    packages = Counter(n.partition(".")[0] for n in new)
+    with _lock:
+        _imports.append({"module": name, "seconds": elapsed, "new_modules": len(new), "packages": dict(packages.most_common(8))})
+    return module
+
+
+def loaded(name: str):
+    """Returns `name` if something in this process already imported it, else None."""
+    return sys.modules.get(name)
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = load(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+# --- 3. Rerun timing ---
+
+def begin_page(name: str):
+    """Marks the start of a page run; call first thing in the page script."""
+    _current.page = (name, time.perf_counter())
+
+
+def end_page():
+    """Records the run started by `begin_page` and shows the profile if enabled."""
+    page = getattr(_current, "page", None)
+    if page is None:
+        return
+    name, start = page
+    elapsed = time.perf_counter() - start
+    _current.page = None
+    with _lock:
+        runs = _runs.setdefault(name, {"first_s": elapsed, "count": 0, "recent_s": deque(maxlen=RECENT_RUNS)})
+        runs["count"] += 1
+        if runs["count"] > 1:
+            runs["recent_s"].append(elapsed)
+    if profiling_enabled():
+        render_report()
+
+
+def report() -> dict:
+    """Import costs (slowest first) and per-page cold/warm run times for this process."""
+    with _lock:
+        imports = sorted(_imports, key=lambda i: i["seconds"], reverse=True)
+        pages = {
+            name: {
+                "runs": runs["count"],
+                "cold_s": round(runs["first_s"], 4),
+                "warm_median_s": round(median(runs["recent_s"]), 4) if runs["recent_s"] else None,
+            }
+            for name, runs in _runs.items()
+        }
+    return {"imports": [dict(i, seconds=round(i["seconds"], 4)) for i in imports], "pages": pages}
+
+
+def profiling_enabled() -> bool:
+    if os.getenv(PROFILE_ENV) == "1":
+        return True
+    import streamlit as st
+    return st.query_params.get("profile") == "1"
+
+
+def render_report():
+    import streamlit as st
+    data = report()
+    with st.expander("Startup profile"):
+        st.caption("Deferred imports (first use in this process)")
+        st.dataframe(data["imports"], use_container_width=True)
+        st.caption("Page runs (cold = first run in this process)")
+        st.dataframe([dict(page=name, **runs) for name, runs in data["pages"].items()], use_container_width=True)
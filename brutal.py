@@ -1,21 +1,19 @@
-import os
 import streamlit as st
-from dotenv import load_dotenv
-# Re-import the specific library for Google Gemini
-from langchain_google_genai import ChatGoogleGenerativeAI
-from crewai import Agent, Task, Crew, Process
+import bootstrap
 
 # --- 1. Application Configuration & Setup ---
+bootstrap.begin_page("brutal")
 
-# Load environment variables from your .env file
-load_dotenv()
+# The Google Gemini library is imported (and timed) when the LLM is created
+langchain_google_genai = bootstrap.lazy("langchain_google_genai")
 
 # Configure the Streamlit page
 st.set_page_config(page_title="CrewAI Base Configuration", layout="centered")
 
-# Explicitly load your Google credentials from the .env file
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-google_cloud_project = os.getenv("GOOGLE_CLOUD_PROJECT")
+# Google credentials come from the .env file, read once per process
+config = bootstrap.config()
+gemini_api_key = config.gemini_api_key
+google_cloud_project = config.google_cloud_project
 
 st.title("🤖 Your brutal action plan generator")
 st.markdown("Big dreams are worthless. Without small actions.")
@@ -35,7 +33,7 @@ if gemini_api_key and google_cloud_project:
     try:
         # Define the LLM using the robust ChatGoogleGenerativeAI class
         # This confirms that the connection to the service is working.
-        llm = ChatGoogleGenerativeAI(
+        llm = langchain_google_genai.ChatGoogleGenerativeAI(
             model="gemini-2.0-flash-lite-001",
             verbose=True,
             temperature=0.3,
@@ -47,3 +45,4 @@ if gemini_api_key and google_cloud_project:
     except Exception as e:
         st.error(f"An error occurred while connecting to the LLM: {e}")
 
+bootstrap.end_page()
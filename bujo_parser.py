@@ -0,0 +1,159 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# --- Bullet Journal parser ---
+# Turns a rapid-logging journal (see log21june.md) into structured entries so the
+# Weaver agent gets the day's content directly instead of reading and decoding a
+# file through a tool call. Each line is looked at once, so parsing is linear in
+# the size of the log.
+#
+#   •  task        ○  event        —  note (also - and –)
+#   *  priority    !  inspiration  (before or right after the bullet)
+
+TASK, EVENT, NOTE = "task", "event", "note"
+
+BULLETS = {"•": TASK, "○": EVENT, "—": NOTE, "–": NOTE, "-": NOTE}
+SIGNIFIERS = "*!"
+KIND_CODES = {TASK: "T", EVENT: "E", NOTE: "N"}
+_BULLET_START = frozenset(BULLETS) | frozenset(SIGNIFIERS)
+_PREFIX_CHARS = SIGNIFIERS + " "
+
+_DATE_LINE = re.compile(r"^\s*date\s*:\s*(?P<date>.+?)\s*$", re.IGNORECASE)
+_HEADING = re.compile(r"^\s*#{1,6}\s+(?P<date>.+?)\s*#*\s*$")
+_BARE_DATE = re.compile(
+    r"^\s*(?P<date>(?:(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*,?\s+)?"
+    r"(?:\d{4}-\d{2}-\d{2}"
+    r"|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+\d{1,2}(?:st|nd|rd|th)?(?:,?\s+\d{4})?"
+    r"|\d{1,2}(?:st|nd|rd|th)?\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?(?:,?\s+\d{4})?))\s*:?\s*$",
+    re.IGNORECASE,
+)
+# The key that journal templates put at the top, e.g. "Tasks: Start with •"
+_LEGEND = re.compile(r"^\s*(tasks|events|notes(/thoughts)?|priority|inspiration)\s*:", re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class Entry:
+    kind: str
+    text: str
+    depth: int = 0
+    priority: bool = False
+    inspiration: bool = False
+
+    @property
+    def important(self) -> bool:
+        return self.priority or self.inspiration
+
+
+@dataclass
+class JournalDay:
+    date: Optional[str]
+    entries: List[Entry] = field(default_factory=list)
+
+
+def _indent_width(line: str) -> int:
+    width = 0
+    for ch in line:
+        if ch == " ":
+            width += 1
+        elif ch == "\t":
+            width += 4
+        else:
+            break
+    return width
+
+
+def _split_bullet(body: str):
+    """Returns (kind, text, priority, inspiration), or None if the line has no bullet or signifier."""
+    rest = body.lstrip(_PREFIX_CHARS)
+    flags = body[:len(body) - len(rest)]
+    kind = BULLETS.get(rest[:1])
+    # A bare "-" only counts as a bullet when followed by a space (not "-5 degrees").
+    if kind is not None and rest[0] == "-" and not rest[1:2].isspace():
+        kind = None
+    if kind is not None:
+        text = rest[1:].lstrip(_PREFIX_CHARS)
+        flags += rest[1:len(rest) - len(text)]
+    elif not flags.strip():
+        return None
+    else:
+        kind, text = NOTE, rest
+    return kind, text.strip(), "*" in flags, "!" in flags
+
+
+def parse(text: str) -> List[JournalDay]:
+    """
+    Parses a journal into days of entries. Entries before the first date header
+    go into a day whose date is None. Unmarked lines indented under an entry
+    continue it; other unmarked lines become notes.
+    """
+    days = [JournalDay(date=None)]
+    stack = []  # (indent width, depth) of the open entries above the current line
+    last = None
+
+    for line in text.splitlines():
+        body = line.strip()
+        if not body:
+            last = None
+            continue
+
+        # Most lines start with a bullet; only the rest can be headers or legend lines.
+        parsed = _split_bullet(body) if body[0] in _BULLET_START else None
+        if parsed is None:
+            header = _DATE_LINE.match(body) or _HEADING.match(body) or _BARE_DATE.match(body)
+            if header:
+                days.append(JournalDay(date=header.group("date")))
+                stack.clear()
+                last = None
+                continue
+            if _LEGEND.match(body):
+                continue
+
+        indent = len(line) - len(line.lstrip(" ")) if line[0] != "\t" else _indent_width(line)
+        if parsed is None:
+            if last is not None and (indent > stack[-1][0] or stack[-1][0] == 0):
+                last.text = f"{last.text} {body}"
+                continue
+            parsed = (NOTE, body, False, False)
+
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        depth = stack[-1][1] + 1 if stack else 0
+        stack.append((indent, depth))
+
+        kind, entry_text, priority, inspiration = parsed
+        last = Entry(kind=kind, text=entry_text, depth=depth, priority=priority, inspiration=inspiration)
+        days[-1].entries.append(last)
+
+    if not days[0].entries:
+        days.pop(0)
+    return days
+
+
+def render_compact(days: List[JournalDay], important_only: bool = False) -> str:
+    """
+    Renders parsed days as one short line per entry, e.g. `T* Finish the project`.
+    With `important_only`, only priority and inspiration entries are kept.
+    """
+    lines = ["Legend: T=task E=event N=note; *=priority !=inspiration; indentation=nested"]
+    for day in days:
+        entries = [e for e in day.entries if e.important] if important_only else day.entries
+        if not entries:
+            continue
+        lines.append(f"## {day.date or 'Undated'}")
+        for e in entries:
+            marks = ("*" if e.priority else "") + ("!" if e.inspiration else "")
+            indent = "" if important_only else "  " * e.depth
+            lines.append(f"{indent}{KIND_CODES[e.kind]}{marks} {e.text}")
+    return "\n".join(lines)
+
+
+def summarize(days: List[JournalDay]) -> dict:
+    """Counts of entries by kind and flag, for previews."""
+    counts = {TASK: 0, EVENT: 0, NOTE: 0, "priority": 0, "inspiration": 0}
+    for day in days:
+        for e in day.entries:
+            counts[e.kind] += 1
+            counts["priority"] += e.priority
+            counts["inspiration"] += e.inspiration
+    return counts
@@ -0,0 +1,288 @@
+import contextvars
+import hashlib
+import re
+import threading
+from collections import OrderedDict, deque
+
+from crewai.utilities.events import crewai_event_bus, CrewKickoffCompletedEvent, CrewKickoffStartedEvent
+
+import tokens
+from llm_base import DelegatingLLM
+from llm_metrics import current_attribution
+
+# --- Prompt-size budgeting ---
+# A crewai agent's prompt is its system message (role, backstory, goal, tools),
+# the task prompt with the raw output of every upstream task as context, then
+# one Thought/Observation turn per ReAct step, so it grows with every task and
+# every step. BudgetedLLM counts the prompt's tokens locally (tokens.py) before
+# each call; over budget it compacts, in this order:
+#   1. the upstream context in the task prompt;
+#   2. the observations of earlier steps (the last step is kept whole).
+# Each section is cut to a fixed size, extractively (first and last lines,
+# then the lines sharing most words with the task) or by a `summarizer` LLM,
+# and cached by content hash, so a context is compacted once however many
+# calls carry it. The system message is never touched and agent goals carry no
+# per-request text, so the prompt prefix stays byte-identical across calls and
+# requests and provider-side prefix caching can hit. Tokens saved are counted
+# per crew run.
+
+# The task prompt as crewai assembles it (translations/en.json, slices
+# "task_with_context" and "task").
+CONTEXT_START = "This is the context you're working with:\n"
+CONTEXT_END = "\n\nBegin!"
+_WORDS = re.compile(r"[a-z0-9]{3,}")
+_GAP = "[...]"
+
+_run = contextvars.ContextVar("budget_run", default=None)
+# DagCrew runs tasks on threads that inherit the context, so they share one run dict
+_run_lock = threading.Lock()
+_handlers_registered = False
+_handlers_lock = threading.Lock()
+
+
+def _register_handlers():
+    global _handlers_registered
+    with _handlers_lock:
+        if _handlers_registered:
+            return
+        _handlers_registered = True
+
+    @crewai_event_bus.on(CrewKickoffStartedEvent)
+    def _on_crew_started(source, event):
+        _run.set({"crew": event.crew_name or "crew", "calls": 0, "compacted_calls": 0,
+                  "prompt_tokens": 0, "saved_tokens": 0})
+
+    @crewai_event_bus.on(CrewKickoffCompletedEvent)
+    def _on_crew_completed(source, event):
+        run = _run.get()
+        if run is not None:
+            with _run_lock:
+                run = dict(run)
+            if run["calls"]:
+                default_stats().record_run(run)
+        _run.set(None)
+
+
+def compact_extractive(text: str, budget: int, query: str = "") -> str:
+    """
+    Keeps the first and last lines of `text`, then the lines sharing most words
+    with `query`, in their original order and within `budget` tokens.
+    """
+    if tokens.count_tokens(text) <= budget:
+        return text
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) < 3:
+        return tokens.truncate_to_tokens(text, budget)
+    wanted = set(_WORDS.findall(query.lower()))
+    edges = {0, 1, len(lines) - 1}
+    order = sorted(range(len(lines)), key=lambda i: (
+        i not in edges, -len(wanted & set(_WORDS.findall(lines[i].lower()))), i))
+    kept, used = set(), tokens.count_tokens(_GAP)
+    for i in order:
+        cost = tokens.count_tokens(lines[i]) + 1
+        if used + cost <= budget:
+            kept.add(i)
+            used += cost
+    if not kept:
+        return tokens.truncate_to_tokens(text, budget)
+    out, previous = [], -1
+    for i in sorted(kept):
+        if i != previous + 1:
+            out.append(_GAP)
+        out.append(lines[i])
+        previous = i
+    if previous != len(lines) - 1:
+        out.append(_GAP)
+    return "\n".join(out)
+
+
+class Compactor:
+    """Compacts text to a token budget, extractively or with `summarizer`, caching results by content hash."""
+
+    def __init__(self, summarizer=None, max_entries: int = 512):
+        self.summarizer = summarizer
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def compact(self, text: str, budget: int, query: str = "") -> str:
+        key = hashlib.sha256(f"{budget}\0{query}\0{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        result = self._summarize(text, budget) if self.summarizer is not None else None
+        if result is None or tokens.count_tokens(result) > budget:
+            result = compact_extractive(result or text, budget, query)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def _summarize(self, text: str, budget: int):
+        try:
+            return str(self.summarizer.call([
+                {"role": "system", "content": f"Summarize the text in at most {budget * 3 // 4} words. Keep every "
+                                              "name, number, status and decision; drop everything else."},
+                {"role": "user", "content": text},
+            ]))
+        except Exception:
+            return None  # fall back to extractive compaction
+
+
+class BudgetStats:
+    """Prompt tokens sent and saved, per crew and agent and per crew run, and system-prefix reuse."""
+
+    def __init__(self, window: int = 50):
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._prefixes = set()
+        self._runs = deque(maxlen=window)
+
+    def record(self, crew: str, agent: str, sent: int, saved: int, prefix: str):
+        with self._lock:
+            entry = self._totals.setdefault((crew, agent), {
+                "calls": 0, "compacted_calls": 0, "prompt_tokens": 0, "saved_tokens": 0, "prefix_hits": 0})
+            entry["calls"] += 1
+            entry["compacted_calls"] += saved > 0
+            entry["prompt_tokens"] += sent
+            entry["saved_tokens"] += saved
+            entry["prefix_hits"] += prefix in self._prefixes
+            if len(self._prefixes) >= 10000:  # only a leak if prefixes vary per request
+                self._prefixes.clear()
+            self._prefixes.add(prefix)
+
+    def record_run(self, run: dict):
+        with self._lock:
+            self._runs.append(run)
+
+    def runs(self) -> list:
+        with self._lock:
+            return list(self._runs)
+
+    def rows(self) -> list:
+        with self._lock:
+            items = [(key, dict(entry)) for key, entry in self._totals.items()]
+        rows = []
+        for (crew, agent), entry in items:
+            before = entry["prompt_tokens"] + entry["saved_tokens"]
+            rows.append({
+                "crew": crew, "agent": agent, "calls": entry["calls"], "compacted_calls": entry["compacted_calls"],
+                "prompt_tokens": entry["prompt_tokens"], "saved_tokens": entry["saved_tokens"],
+                "saved": round(entry["saved_tokens"] / before, 3) if before else 0.0,
+                "system_prefix_reuse": round(entry["prefix_hits"] / entry["calls"], 3),
+            })
+        return sorted(rows, key=lambda r: r["saved_tokens"], reverse=True)
+
+
+_default_stats = None
+_default_lock = threading.Lock()
+
+
+def default_stats() -> BudgetStats:
+    """The prompt budget statistics shared by every BudgetedLLM in this process."""
+    global _default_stats
+    with _default_lock:
+        if _default_stats is None:
+            _default_stats = BudgetStats()
+        return _default_stats
+
+
+def _content(message) -> str:
+    content = message.get("content") if isinstance(message, dict) else message
+    return content if isinstance(content, str) else str(content or "")
+
+
+def count_prompt_tokens(messages) -> int:
+    if isinstance(messages, str):
+        return tokens.count_tokens(messages)
+    return sum(tokens.count_tokens(_content(m)) + 4 for m in messages)  # + per-message framing
+
+
+class BudgetedLLM(DelegatingLLM):
+    """
+    Keeps prompts within `budget_tokens` (default: `context_share` of the wrapped
+    LLM's context window). Over budget, the upstream context is cut to
+    `context_tokens` (default: half the budget) and, while still over, earlier
+    observations to `observation_tokens` each. The sizes are fixed, so a section
+    compacts the same way on every step and stays a stable, cached prefix.
+    """
+
+    def __init__(self, llm, budget_tokens: int = None, context_share: float = 0.5, context_tokens: int = None,
+                 observation_tokens: int = 200, summarizer=None, stats: BudgetStats = None):
+        super().__init__(llm)
+        self.budget_tokens = budget_tokens or int(self.inner.get_context_window_size() * context_share)
+        self.context_tokens = context_tokens or self.budget_tokens // 2
+        self.observation_tokens = observation_tokens
+        self.compactor = Compactor(summarizer)
+        self.stats = stats or default_stats()
+        _register_handlers()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        before = count_prompt_tokens(messages)
+        sent = self._fit(messages, before) if before > self.budget_tokens else messages
+        after = count_prompt_tokens(sent) if sent is not messages else before
+        crew, agent, _ = current_attribution()
+        run = _run.get()
+        if run is not None:
+            crew = run["crew"] if crew == "-" else crew
+            with _run_lock:
+                run["calls"] += 1
+                run["compacted_calls"] += after < before
+                run["prompt_tokens"] += after
+                run["saved_tokens"] += before - after
+        system = (_content(messages[0]) if not isinstance(messages, str) and messages
+                  and messages[0].get("role") == "system" else "")
+        self.stats.record(crew, agent, after, before - after, hashlib.sha256(system.encode("utf-8")).hexdigest())
+        return self.call_inner(sent, tools, callbacks, available_functions, **kwargs)
+
+    def _fit(self, messages, total: int):
+        if isinstance(messages, str):
+            return self._fit_task_prompt(messages)
+        messages = [dict(m) for m in messages]
+        first_user = next((i for i, m in enumerate(messages) if m.get("role") == "user"), None)
+        if first_user is not None:
+            content = _content(messages[first_user])
+            messages[first_user]["content"] = self._fit_task_prompt(content)
+            total -= tokens.count_tokens(content) - tokens.count_tokens(messages[first_user]["content"])
+        # Earlier ReAct steps, oldest first; the last two messages are the step in progress
+        for i in range(first_user + 1 if first_user is not None else 0, len(messages) - 2):
+            if total <= self.budget_tokens:
+                break
+            content = _content(messages[i])
+            size = tokens.count_tokens(content)
+            if size > self.observation_tokens and messages[i].get("role") != "system":
+                messages[i]["content"] = self.compactor.compact(content, self.observation_tokens)
+                total -= size - tokens.count_tokens(messages[i]["content"])
+        return messages
+
+    def _fit_task_prompt(self, prompt: str) -> str:
+        start = prompt.find(CONTEXT_START)
+        if start == -1:
+            return prompt
+        start += len(CONTEXT_START)
+        end = prompt.find(CONTEXT_END, start)
+        end = len(prompt) if end == -1 else end
+        context = prompt[start:end]
+        if tokens.count_tokens(context) <= self.context_tokens:
+            return prompt
+        return prompt[:start] + self.compactor.compact(context, self.context_tokens, query=prompt[:start]) + prompt[end:]
+
+
+def render_panel(stats: BudgetStats = None):
+    """Streamlit panel with the prompt tokens saved per crew run and per agent."""
+    import streamlit as st
+    stats = stats or default_stats()
+    runs, rows = stats.runs(), stats.rows()
+    with st.expander("Prompt budget"):
+        if not rows:
+            st.caption("No budgeted LLM call yet.")
+            return
+        if runs:
+            st.caption("Last crew runs")
+            st.dataframe(runs[::-1], use_container_width=True)
+        st.dataframe(rows, use_container_width=True)
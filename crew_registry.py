@@ -0,0 +1,93 @@
+import hashlib
+import json
+import threading
+
+# --- Process-wide registry for LLM clients, tools and agent/crew templates ---
+# Streamlit re-executes the page script on every interaction, but imported
+# modules stay loaded for the lifetime of the server process. Objects kept in
+# this registry are therefore built once and reused across reruns and sessions.
+
+
+def fingerprint(config) -> str:
+    """
+    Returns a short, stable hash of a configuration dict.
+    Secrets such as API keys can be part of the config; only the hash is kept.
+    """
+    canonical = json.dumps(config, sort_keys=True, default=repr)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class CrewRegistry:
+    """
+    Caches expensive objects under a slot name, keyed by their configuration.
+
+    Each slot holds one object. Asking for a slot with a different configuration
+    invalidates the old object and builds a new one, so callers that need several
+    variants side by side should encode the variant in the slot name.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._build_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, name: str, config: dict, factory):
+        """
+        Returns the cached object for `name`, calling `factory(config)` on a miss.
+        Concurrent callers for the same slot wait for a single build.
+        """
+        key = fingerprint(config)
+        with self._lock:
+            cached = self._lookup(name, key)
+            if cached is not None:
+                return cached
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                cached = self._lookup(name, key)
+                if cached is not None:
+                    return cached
+
+            value = factory(config)
+
+            with self._lock:
+                if name in self._entries:
+                    self.invalidations += 1
+                self.misses += 1
+                self._entries[name] = (key, value)
+            return value
+
+    def _lookup(self, name, key):
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def invalidate(self, name: str = None):
+        """Drops one slot, or every slot when no name is given."""
+        with self._lock:
+            if name is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            elif self._entries.pop(name, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# The shared instance used by every app in this repo.
+registry = CrewRegistry()
@@ -0,0 +1,131 @@
+import queue
+import threading
+
+from crewai.utilities.events import crewai_event_bus, LLMCallStartedEvent, LLMStreamChunkEvent
+
+# --- Token streaming for crew kickoffs ---
+# crewai emits an LLMStreamChunkEvent for every token when the agent's LLM is
+# created with `stream=True`. Handlers on the event bus are global and run in
+# the thread that made the LLM call, so one pair of handlers is registered per
+# process and chunks are routed to whichever stream owns the calling thread.
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+_handlers_registered = False
+
+
+class FinalAnswerFilter:
+    """
+    Hides the ReAct 'Thought/Action/Observation' steps and passes through only
+    the text after 'Final Answer:'. The marker may be split across chunks, so a
+    short tail of unmatched text is held back until the next chunk arrives.
+    """
+
+    def __init__(self, marker: str = FINAL_ANSWER_MARKER):
+        self.marker = marker
+        self.reset()
+
+    def reset(self):
+        self._pending = ""
+        self._in_answer = False
+        self._leading = True
+
+    def feed(self, chunk: str) -> str:
+        if self._in_answer:
+            return self._strip_leading(chunk)
+        self._pending += chunk
+        index = self._pending.find(self.marker)
+        if index == -1:
+            self._pending = self._pending[-(len(self.marker) - 1):]
+            return ""
+        self._in_answer = True
+        visible = self._pending[index + len(self.marker):]
+        self._pending = ""
+        return self._strip_leading(visible)
+
+    def _strip_leading(self, text: str) -> str:
+        if self._leading:
+            text = text.lstrip()
+            self._leading = not text
+        return text
+
+
+def _register_handlers():
+    global _handlers_registered
+    with _sinks_lock:
+        if _handlers_registered:
+            return
+        _handlers_registered = True
+
+    @crewai_event_bus.on(LLMCallStartedEvent)
+    def _on_call_started(source, event):
+        sink = _sinks.get(threading.get_ident())
+        if sink is not None:
+            sink.filter.reset()
+
+    @crewai_event_bus.on(LLMStreamChunkEvent)
+    def _on_chunk(source, event):
+        sink = _sinks.get(threading.get_ident())
+        if sink is not None:
+            sink.push(event.chunk)
+
+
+class CrewStream:
+    """
+    Runs `crew.kickoff(inputs)` on a background thread and iterates over the
+    final answer's text as it is generated:
+
+        stream = CrewStream(crew, inputs)
+        st.write_stream(stream)
+        output = stream.result
+
+    If the answer arrives without chunks (e.g. from the response cache), the
+    whole answer is yielded once at the end.
+    """
+
+    _DONE = object()
+
+    def __init__(self, crew, inputs: dict = None):
+        self.crew = crew
+        self.inputs = inputs or {}
+        self.filter = FinalAnswerFilter()
+        self.result = None
+        self.error = None
+        self._queue = queue.Queue()
+        _register_handlers()
+
+    def push(self, chunk: str):
+        visible = self.filter.feed(chunk)
+        if visible:
+            self._queue.put(visible)
+
+    def _run(self):
+        ident = threading.get_ident()
+        with _sinks_lock:
+            _sinks[ident] = self
+        try:
+            self.result = self.crew.kickoff(inputs=self.inputs)
+        except Exception as e:
+            self.error = e
+        finally:
+            with _sinks_lock:
+                _sinks.pop(ident, None)
+            self._queue.put(self._DONE)
+
+    def __iter__(self):
+        worker = threading.Thread(target=self._run, name="crew-stream", daemon=True)
+        worker.start()
+        streamed = False
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                break
+            streamed = True
+            yield item
+        worker.join()
+        if self.error is not None:
+            raise self.error
+        if not streamed and self.result is not None:
+            yield getattr(self.result, "raw", str(self.result))
@@ -0,0 +1,377 @@
+import uuid
+from typing import Literal
+
+from crewai import Agent, Task, Crew, Process, LLM
+# Import the specific library for Groq
+from langchain_groq import ChatGroq
+from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import BaseModel
+
+from context_budget import BudgetedLLM
+from crew_registry import registry
+from dag_process import DagCrew
+from direct_tasks import DirectAgent, DirectTask, tool_action
+from ledger import default_ledger
+from llm_cache import CachedLLM
+from llm_metrics import InstrumentedLLM
+from llm_router import RouterLLM
+from model_tiers import Contract, TieredLLM
+from tools import TaskPostingTool, TaskExecutionTool, VerificationTool, PaymentTool
+from typed_outputs import IncrementalJSON, TypedLLM
+from upload_store import BufferReadTool
+
+# --- Shared crew definitions ---
+# Every builder here is pure configuration -> object, and is only called on a
+# registry miss. Per-request values (like the gig description) are written as
+# `{placeholders}` and bound by `crew.kickoff(inputs=...)`.
+
+GIG_MODEL = "groq/llama3-8b-819"
+GIG_STRONG_MODEL = "groq/llama3-70b-8192"
+GEMINI_MODEL = "gemini-2.0-flash-lite-001"
+GEMINI_STRONG_MODEL = "gemini-2.0-flash-001"
+# Prompt tokens per LLM call before upstream context and old observations are compacted
+GIG_PROMPT_BUDGET = 2000
+
+
+# --- 1. LLM Clients ---
+
+# The response cache wraps the metrics layer, so usage accounting (llm_metrics)
+# only sees the calls that actually reach the provider.
+
+def get_groq_llm(groq_api_key: str, model_name: str = GIG_MODEL, temperature: float = 0.3):
+    """Returns the shared, response-cached and instrumented ChatGroq client for this model."""
+    config = {"groq_api_key": groq_api_key, "model_name": model_name, "temperature": temperature}
+    return registry.get(
+        f"llm:groq:{model_name}:{temperature}",
+        config,
+        lambda c: CachedLLM(_groq_client(c)),
+    )
+
+
+def _groq_client(c):
+    return InstrumentedLLM(ChatGroq(temperature=c["temperature"], groq_api_key=c["groq_api_key"], model_name=c["model_name"]))
+
+
+def _gemini_client(c):
+    return InstrumentedLLM(ChatGoogleGenerativeAI(model=c["model"], verbose=True, temperature=c["temperature"], google_api_key=c["google_api_key"]))
+
+
+def get_gemini_llm(gemini_api_key: str, model: str = GEMINI_MODEL, temperature: float = 0.3):
+    """Returns the shared, response-cached and instrumented ChatGoogleGenerativeAI client for this model."""
+    config = {"google_api_key": gemini_api_key, "model": model, "temperature": temperature}
+    return registry.get(
+        f"llm:gemini:{model}:{temperature}",
+        config,
+        lambda c: CachedLLM(_gemini_client(c)),
+    )
+
+
+def get_router_llm(groq_api_key: str = None, gemini_api_key: str = None, temperature: float = 0.3, hedge: bool = True):
+    """
+    Returns the shared, response-cached router over every provider with a key:
+    each call goes to the fastest healthy one, fails over to the other, and is
+    hedged on the other when the first is slower than its own p95.
+    """
+    config = {"groq_api_key": groq_api_key, "gemini_api_key": gemini_api_key, "temperature": temperature, "hedge": hedge}
+
+    def build(c):
+        routes = {}
+        if c["groq_api_key"]:
+            routes["groq"] = _groq_client({"groq_api_key": c["groq_api_key"], "model_name": GIG_MODEL, "temperature": c["temperature"]})
+        if c["gemini_api_key"]:
+            routes["gemini"] = _gemini_client({"google_api_key": c["gemini_api_key"], "model": GEMINI_MODEL, "temperature": c["temperature"]})
+        return CachedLLM(RouterLLM(routes, hedge=c["hedge"]))
+    return registry.get(f"llm:router:{temperature}:{hedge}", config, build)
+
+
+def get_tiered_gemini_llm(gemini_api_key: str, temperature: float = 0.3):
+    """
+    Flash Lite first, Flash when a task's output fails its contract (see
+    `model_tiers`); both tiers are the shared, cached Gemini clients. Answers of
+    typed tasks are checked and repaired by `typed_outputs.TypedLLM`, and
+    prompts are kept within half the context window by `context_budget`.
+    """
+    return registry.get(
+        f"llm:gemini-tiers:{temperature}",
+        {"gemini_api_key": gemini_api_key, "temperature": temperature},
+        lambda c: BudgetedLLM(TypedLLM(TieredLLM({
+            "flash-lite": get_gemini_llm(c["gemini_api_key"], GEMINI_MODEL, c["temperature"]),
+            "flash": get_gemini_llm(c["gemini_api_key"], GEMINI_STRONG_MODEL, c["temperature"]),
+        }))),
+    )
+
+
+def get_streaming_gemini_llm(gemini_api_key: str, model: str = GEMINI_MODEL, temperature: float = 0.7):
+    """
+    Returns a Gemini LLM that emits token chunks while it generates, for pages
+    that render answers through `crew_stream.CrewStream`.
+    """
+    config = {"api_key": gemini_api_key, "model": model, "temperature": temperature}
+    return registry.get(
+        f"llm:gemini-stream:{model}:{temperature}",
+        config,
+        lambda c: CachedLLM(InstrumentedLLM(LLM(model=f"gemini/{c['model']}", api_key=c["api_key"], temperature=c["temperature"], stream=True))),
+    )
+
+
+# --- 2. Gig Workflow Crew ---
+
+def get_gig_tools() -> dict:
+    """The gig tools are stateless, so one set is shared by every crew."""
+    return registry.get(
+        "tools:gig",
+        {},
+        lambda _: {
+            "task": TaskPostingTool(),
+            "execution": TaskExecutionTool(),
+            "verification": VerificationTool(),
+            "payment": PaymentTool(),
+        },
+    )
+
+
+class VerificationReport(BaseModel):
+    """Typed output of the gig verification task; payment only reads `status`."""
+    status: Literal["Approved", "Rejected"]
+    notes: str
+
+
+# Output contracts of the LLM-run gig tasks. A task whose output fails its
+# contract is retried by crewai, one model tier up when the agent's LLM is a
+# TieredLLM. Posting and payment are direct tasks and need no contract.
+GIG_CONTRACTS = {
+    "execution": Contract("gig: work completed", validator=lambda raw: (
+        len(raw.split()) >= 5, "the answer must contain the completed work, not just a status")),
+    "verification": Contract("gig: verification status", model=VerificationReport),
+}
+
+
+def _pay_if_approved(payment_tool):
+    """Payment action: pays out for the gig only when the verification report says 'Approved'."""
+    def action(inputs: dict, upstream: dict) -> str:
+        # TypedLLM hands on the bare object, but the raw output may still be fenced
+        parser = IncrementalJSON(VerificationReport)
+        parser.feed(upstream["verification"].strip())
+        report = parser.finish()
+        if report.status != "Approved":
+            return f"No payment was made: the work was not approved ({report.notes})."
+        return payment_tool.run(gig_id=inputs["gig_id"])
+    return action
+
+
+def build_gig_crew(llm, tools: dict) -> Crew:
+    """
+    Builds the Gig Work Bot crew template. The gig itself is left as the
+    `{gig_description}` placeholder and supplied at kickoff. Execution and
+    verification run on `llm` and check their output against GIG_CONTRACTS
+    (verification answers a typed VerificationReport);
+    posting and payment are direct tasks that call their tool without an LLM.
+    Each task declares the output it consumes, so the crew runs as a task graph
+    (dag_process) and a second verification can run alongside the first.
+    """
+    project_manager = DirectAgent(
+        role='Project Manager',
+        goal='Post gig tasks to the platform.',
+        tools=[tools["task"]],
+    )
+    gig_worker = Agent(
+        role='Gig Worker',
+        goal='Execute the assigned task to the highest standard and submit it for verification.',
+        backstory='A skilled freelancer specializing in digital tasks, known for reliability and attention to detail.',
+        verbose=True,
+        tools=[tools["execution"]],
+        llm=llm
+    )
+    qa_specialist = Agent(
+        role='Quality Assurance Specialist',
+        goal='Rigorously check the submitted work against the original requirements and approve or reject it.',
+        backstory='A meticulous QA professional with an uncompromising eye for detail and quality.',
+        verbose=True,
+        tools=[tools["verification"]],
+        llm=llm
+    )
+    payment_processor = DirectAgent(
+        role='Payment Processor',
+        goal='Process payments to contributors for successfully verified tasks.',
+        tools=[tools["payment"]],
+    )
+
+    task_definition = DirectTask(
+        name="definition",
+        description='Define and post the gig task: "{gig_description}".',
+        expected_output='A confirmation that the task has been posted.',
+        agent=project_manager,
+        action=tool_action(tools["task"], "{gig_description}"),
+    )
+    task_execution = Task(
+        name="execution",
+        description='Execute the gig task that was just posted.',
+        expected_output='The completed work, ready for verification.',
+        agent=gig_worker,
+        context=[task_definition],
+        guardrail=GIG_CONTRACTS["execution"].guard,
+    )
+    task_verification = Task(
+        name="verification",
+        description='Verify the completed work against the task requirements. Use the verification tool.',
+        expected_output="A verification report: status 'Approved' or 'Rejected', with notes.",
+        agent=qa_specialist,
+        output_pydantic=VerificationReport,
+        context=[task_execution],
+        guardrail=GIG_CONTRACTS["verification"].guard,
+    )
+    task_payment = DirectTask(
+        name="payment",
+        description='If the work was approved, process payment to the contributor.',
+        expected_output='A payment confirmation receipt or a message stating no payment was made.',
+        agent=payment_processor,
+        context=[task_verification],
+        action=_pay_if_approved(tools["payment"]),
+    )
+
+    return DagCrew(
+        agents=[project_manager, gig_worker, qa_specialist, payment_processor],
+        tasks=[task_definition, task_execution, task_verification, task_payment],
+        process=Process.sequential,
+        verbose=True,
+        name="gig",
+    )
+
+
+def get_gig_crew(groq_api_key: str, model_name: str = GIG_MODEL, temperature: float = 0.3,
+                 gemini_api_key: str = None) -> Crew:
+    """
+    Returns the cached gig crew template for this LLM configuration. Tasks start
+    on the 8B model (or the Groq/Gemini router, with a Gemini key as well) and
+    escalate to the 70B model when their output fails its contract. Typed
+    answers are checked as they arrive and repaired without a new agent loop,
+    and prompts over GIG_PROMPT_BUDGET tokens are compacted.
+    """
+    config = {"groq_api_key": groq_api_key, "model_name": model_name, "temperature": temperature,
+              "gemini_api_key": gemini_api_key}
+
+    def build(c):
+        if c["gemini_api_key"]:
+            fast = get_router_llm(c["groq_api_key"], c["gemini_api_key"], c["temperature"])
+        else:
+            fast = get_groq_llm(c["groq_api_key"], c["model_name"], c["temperature"])
+        strong = get_groq_llm(c["groq_api_key"], GIG_STRONG_MODEL, c["temperature"])
+        llm = TypedLLM(TieredLLM({"fast": fast, "strong": strong}))
+        return build_gig_crew(BudgetedLLM(llm, budget_tokens=GIG_PROMPT_BUDGET), get_gig_tools())
+    return registry.get("crew:gig", config, build)
+
+
+def setup_crew(groq_api_key: str, gemini_api_key: str = None):
+    """
+    Returns a gig crew ready for kickoff. The template is shared, so each request
+    gets its own copy; agents in the copy reuse the cached LLM and tools.
+    """
+    return get_gig_crew(groq_api_key, gemini_api_key=gemini_api_key).copy()
+
+
+def gig_inputs(gig_description: str, gig_id: str = None) -> dict:
+    """
+    Kickoff inputs for one gig. The requester funds the gig's escrow with the
+    payout up front (once per gig ID), and payment is keyed on the gig ID, so
+    a retried gig is never paid twice. Without an ID the gig gets a new one.
+    """
+    gig_id = gig_id or f"gig-{uuid.uuid4().hex[:12]}"
+    ledger = default_ledger()
+    ledger.commit([ledger.fund(gig_id, get_gig_tools()["payment"].payout_cents)])
+    return {"gig_id": gig_id, "gig_description": gig_description}
+
+
+def kickoff_gig(gig_description: str, groq_api_key: str, gemini_api_key: str = None, gig_id: str = None):
+    """Runs the posting -> execution -> verification -> payment pipeline for one gig."""
+    crew = setup_crew(groq_api_key, gemini_api_key)
+    return crew.kickoff(inputs=gig_inputs(gig_description, gig_id))
+
+
+# --- 3. Weaver (Journal Narrative) Crew ---
+
+def build_weaver_crew(llm) -> Crew:
+    """
+    Builds the Weaver crew template. The journal arrives already parsed by
+    `bujo_parser` as the `{journal_entries}` placeholder, bound at kickoff, so
+    the agent needs no tools and makes no file-reading round trip.
+    """
+    journalist_agent = Agent(
+        role="Empathetic Journal Weaver",
+        goal="To take a user's bullet journal entry and transform it into a beautiful, first-person narrative that captures the essence of their day.",
+        backstory=(
+            "You are a master storyteller with a deep understanding of human emotion and the art of journaling. "
+            "You can find the hidden story in simple notes and weave them together into a compelling and reflective piece of writing."
+        ),
+        llm=llm,
+        verbose=True,
+        allow_delegation=False,
+    )
+    weaving_task = Task(
+        description="""
+        Here is the user's journal entry, one Bullet Journal item per line:
+        {journal_entries}
+
+        Each line starts with its type (T task, E event, N note), optionally followed by * for priority or ! for inspiration.
+        Do not just list the items. Weave them into a cohesive, first-person narrative. 
+        Capture the underlying mood and themes of the day. The final output should be a formatted markdown text.
+        """,
+        expected_output=(
+            "A beautifully written, reflective narrative in markdown format. It should feel like a personal story, not a summary."
+        ),
+        agent=journalist_agent
+    )
+    return Crew(
+        agents=[journalist_agent],
+        tasks=[weaving_task],
+        process=Process.sequential,
+        verbose=True,
+        name="weaver",
+    )
+
+
+def get_weaver_crew(gemini_api_key: str) -> Crew:
+    """Returns a fresh copy of the cached Weaver crew, wired to the streaming Gemini LLM."""
+    template = registry.get(
+        "crew:weaver",
+        {"gemini_api_key": gemini_api_key},
+        lambda c: build_weaver_crew(get_streaming_gemini_llm(c["gemini_api_key"])),
+    )
+    return template.copy()
+
+
+# --- 4. Article Writer Crew ---
+
+def build_article_crew(llm) -> Crew:
+    """
+    Builds the paid article crew template. The uploaded brief is read from the
+    in-memory upload store through the `{document_id}` placeholder, bound at kickoff.
+    """
+    writer_agent = Agent(
+        role="Expert Content Writer",
+        goal="Read the content from the provided uploaded document and expand it into a high-quality, engaging article.",
+        backstory="You are a renowned content writer, known for your ability to turn simple ideas into compelling stories.",
+        llm=llm,
+        tools=[BufferReadTool()],
+        verbose=True
+    )
+    writing_task = Task(
+        description="Read the content of the uploaded document with ID '{document_id}'. Use this content as the brief to write a full, engaging article. The article should be well-structured, informative, and at least 300 words long.",
+        expected_output="A complete article in markdown format.",
+        agent=writer_agent
+    )
+    return Crew(
+        agents=[writer_agent],
+        tasks=[writing_task],
+        verbose=True,
+        name="article",
+    )
+
+
+def get_article_crew(gemini_api_key: str) -> Crew:
+    """Returns a fresh copy of the cached article writer crew."""
+    template = registry.get(
+        "crew:article",
+        {"gemini_api_key": gemini_api_key},
+        lambda c: build_article_crew(get_gemini_llm(c["gemini_api_key"], temperature=0.5)),
+    )
+    return template.copy()
@@ -0,0 +1,210 @@
+import contextvars
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import ClassVar
+
+from crewai import Crew
+from crewai.tasks.conditional_task import ConditionalTask
+from crewai.utilities.constants import NOT_SPECIFIED
+
+from llm_metrics import percentile
+
+# --- Dependency-graph task execution ---
+# A DagCrew runs its tasks as a dependency graph instead of one after another.
+# A task depends on the tasks in its `context` list (its upstream outputs);
+# `context=[]` means it depends on nothing. A task that doesn't declare
+# a context depends on every task before it, as in a sequential crew. Tasks whose
+# dependencies are done run concurrently on a thread pool, each in a copy of
+# the kickoff's context (usage attribution included); outputs are merged in
+# task-list order, so the crew output doesn't depend on which task finished
+# first. An agent keeps per-task executor state, so tasks of the same agent
+# still run one at a time; give tasks that should overlap their own agents.
+#
+# Every run records its wall time, the sum of its task durations and its
+# critical path: the chain of dependent tasks with the longest total duration,
+# which bounds the run's latency however many workers there are.
+
+
+def dependencies(tasks: list) -> list:
+    """For each task, the set of task indices it depends on."""
+    index = {id(task): i for i, task in enumerate(tasks)}
+    deps = []
+    for i, task in enumerate(tasks):
+        if task.context is NOT_SPECIFIED:
+            deps.append(set(range(i)))
+        else:
+            deps.append({index[id(t)] for t in task.context or [] if id(t) in index})
+    return deps
+
+
+def critical_path(deps: list, durations: list) -> tuple:
+    """(total duration, task indices) of the longest dependency chain; `deps` is in topological order."""
+    finish, previous = [], []
+    for i, upstream in enumerate(deps):
+        before = max(upstream, key=lambda d: finish[d], default=None)
+        finish.append((finish[before] if before is not None else 0.0) + durations[i])
+        previous.append(before)
+    if not finish:
+        return 0.0, []
+    last = max(range(len(finish)), key=lambda i: finish[i])
+    path = []
+    while last is not None:
+        path.append(last)
+        last = previous[last]
+    return finish[path[0]], path[::-1]
+
+
+class DagStats:
+    """The last runs of every DagCrew, by crew name."""
+
+    def __init__(self, window: int = 50):
+        self._lock = threading.Lock()
+        self._runs = {}
+        self.window = window
+
+    def record(self, crew: str, report: dict):
+        with self._lock:
+            self._runs.setdefault(crew, deque(maxlen=self.window)).append(report)
+
+    def last(self, crew: str):
+        with self._lock:
+            runs = self._runs.get(crew)
+            return runs[-1] if runs else None
+
+    def rows(self) -> list:
+        with self._lock:
+            items = [(crew, list(runs)) for crew, runs in self._runs.items()]
+        rows = []
+        for crew, runs in items:
+            def median(field):
+                return round(percentile(sorted(run[field] for run in runs), 0.5), 3)
+            rows.append({
+                "crew": crew,
+                "runs": len(runs),
+                "wall_p50_s": median("wall_s"),
+                "critical_path_p50_s": median("critical_path_s"),
+                "sum_of_tasks_p50_s": median("sum_of_tasks_s"),
+                "last_critical_path": " -> ".join(runs[-1]["critical_path"]),
+            })
+        return rows
+
+
+_default_stats = None
+_default_lock = threading.Lock()
+
+
+def default_stats() -> DagStats:
+    """The run reports shared by every DagCrew in this process."""
+    global _default_stats
+    with _default_lock:
+        if _default_stats is None:
+            _default_stats = DagStats()
+        return _default_stats
+
+
+def _label(task, i: int) -> str:
+    return task.name or f"task {i + 1}"
+
+
+def _script_run_ctx():
+    """The calling Streamlit script's run context, or None (batch runs don't import Streamlit)."""
+    if "streamlit" not in sys.modules:
+        return None
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    return get_script_run_ctx(suppress_warning=True)
+
+
+class DagCrew(Crew):
+    """A crew whose tasks run as a dependency graph; build it like a sequential Crew."""
+
+    max_workers: ClassVar[int] = 8
+
+    def copy(self):
+        # Crew.copy always builds a plain Crew; the copy has the same fields.
+        # Task.copy turns an unspecified context into None ("depends on nothing"),
+        # so those tasks get back the "depends on every task before it" default.
+        copied = super().copy()
+        copied.__class__ = type(self)
+        for original, task in zip(self.tasks, copied.tasks):
+            if original.context is NOT_SPECIFIED:
+                task.context = NOT_SPECIFIED
+        return copied
+
+    def _run_sequential_process(self):
+        tasks = list(self.tasks)
+        deps = dependencies(tasks)
+        outputs, started, finished = [None] * len(tasks), [0.0] * len(tasks), [0.0] * len(tasks)
+        agent_locks = {id(task.agent): threading.Lock() for task in tasks}
+        script_ctx = _script_run_ctx()
+        run_start = time.monotonic()
+
+        def run(i):
+            task = tasks[i]
+            if script_ctx is not None:
+                # Tools write to the page with st.*; outside the script thread that
+                # output is dropped unless the thread carries the script's context
+                from streamlit.runtime.scriptrunner import add_script_run_ctx
+                add_script_run_ctx(threading.current_thread(), script_ctx)
+            with agent_locks[id(task.agent)]:
+                started[i] = time.monotonic()
+                try:
+                    return self._run_task(task, [outputs[d] for d in sorted(deps[i])])
+                finally:
+                    finished[i] = time.monotonic()
+
+        pending, running = set(range(len(tasks))), {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(tasks))),
+                                thread_name_prefix="crew-task") as pool:
+            while pending or running:
+                for i in sorted(pending):
+                    if all(outputs[d] is not None for d in deps[i]):
+                        pending.discard(i)
+                        running[pool.submit(contextvars.copy_context().run, run, i)] = i
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=running.get):
+                    i = running.pop(future)
+                    if future.exception() is not None:
+                        for other in running:
+                            other.cancel()
+                        raise future.exception()
+                    outputs[i] = future.result()
+                    self._process_task_result(tasks[i], outputs[i])
+                    self._store_execution_log(tasks[i], outputs[i], i)
+
+        durations = [end - start for start, end in zip(started, finished)]
+        path_s, path = critical_path(deps, durations)
+        report = {
+            "wall_s": time.monotonic() - run_start,
+            "critical_path_s": path_s,
+            "sum_of_tasks_s": sum(durations),
+            "critical_path": [_label(tasks[i], i) for i in path],
+            "tasks": [{"task": _label(task, i), "depends_on": [_label(tasks[d], d) for d in sorted(deps[i])],
+                       "start_s": started[i] - run_start, "end_s": finished[i] - run_start}
+                      for i, task in enumerate(tasks)],
+        }
+        default_stats().record(self.name or "crew", report)
+        return self._create_crew_output(outputs)
+
+    def _run_task(self, task, upstream: list):
+        agent = task.agent
+        if agent is None:
+            raise ValueError(f"No agent available for task: {task.description}")
+        tools = self._prepare_tools(agent, task, task.tools or agent.tools or [])
+        self._log_task_start(task, agent.role)
+        if isinstance(task, ConditionalTask) and upstream and not task.should_execute(upstream[-1]):
+            return task.get_skipped_task_output()
+        return task.execute_sync(agent=agent, context=self._get_context(task, upstream), tools=tools)
+
+
+def render_panel(stats: DagStats = None):
+    """Streamlit panel with the critical path of every DagCrew's recent runs."""
+    import streamlit as st
+    rows = (stats or default_stats()).rows()
+    with st.expander("Task graph critical paths"):
+        if not rows:
+            st.caption("No crew has run as a task graph yet.")
+            return
+        st.dataframe(rows, use_container_width=True)
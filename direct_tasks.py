@@ -0,0 +1,73 @@
+from typing import Any, Callable
+
+from crewai import Task
+from crewai.agents.agent_builder.base_agent import BaseAgent
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events.agent_events import (
+    AgentExecutionCompletedEvent,
+    AgentExecutionErrorEvent,
+    AgentExecutionStartedEvent,
+)
+from crewai.utilities.string_utils import interpolate_only
+
+# --- Direct tasks: crew steps that don't need an LLM ---
+# Some crew steps are plain function calls: posting a gig is one tool call with
+# the gig description, and paying out only depends on whether verification
+# said "Approved". A DirectTask runs its `action` in-process instead of an
+# agent's reasoning loop. Its agent is a DirectAgent, so to crewai it is an
+# ordinary task: the result becomes the task's output, is passed to later
+# tasks as context, and goes through the task's guardrail and callbacks.
+#
+# An action is called as action(inputs, upstream): the kickoff inputs, and the
+# raw outputs of the tasks that already ran, by task name (only the task's
+# `context` tasks, when it lists them). It returns the task output.
+
+
+class DirectTask(Task):
+    """A task whose output is `action(inputs, upstream)`; assign it to a DirectAgent."""
+
+    action: Callable[[dict, dict], Any]
+
+
+def tool_action(tool, argument: str) -> Callable[[dict, dict], Any]:
+    """An action that runs `tool` once, with `argument` interpolated from the kickoff inputs."""
+    def action(inputs: dict, upstream: dict):
+        return tool.run(argument=interpolate_only(argument, inputs))
+    return action
+
+
+class DirectAgent(BaseAgent):
+    """Runs the actions of its DirectTasks. It has no LLM, so it never calls a provider."""
+
+    backstory: str = ""
+    # Set on every agent by Crew.kickoff.
+    function_calling_llm: Any = None
+    step_callback: Any = None
+
+    def _upstream(self, task) -> dict:
+        if isinstance(task.context, list):
+            done = task.context
+        else:
+            tasks = list(getattr(self.crew, "tasks", None) or [])
+            done = tasks[:next((i for i, t in enumerate(tasks) if t is task), len(tasks))]
+        return {t.name or t.description: t.output.raw for t in done if t.output is not None}
+
+    def execute_task(self, task, context=None, tools=None) -> str:
+        if not isinstance(task, DirectTask):
+            raise TypeError(f"{self.role} can only run DirectTasks, not {type(task).__name__}")
+        crewai_event_bus.emit(self, AgentExecutionStartedEvent(
+            agent=self, task=task, tools=tools or [], task_prompt=task.description))
+        try:
+            inputs = dict(getattr(self.crew, "_inputs", None) or {})
+            result = str(task.action(inputs, self._upstream(task)))
+        except Exception as e:
+            crewai_event_bus.emit(self, AgentExecutionErrorEvent(agent=self, task=task, error=str(e)))
+            raise
+        crewai_event_bus.emit(self, AgentExecutionCompletedEvent(agent=self, task=task, output=result))
+        return result
+
+    def create_agent_executor(self, tools=None) -> None:
+        pass
+
+    def get_delegation_tools(self, agents) -> list:
+        return []
@@ -0,0 +1,137 @@
+import itertools
+import json
+import random
+import re
+import threading
+import time
+
+from crewai import BaseLLM
+from crewai.utilities.events import (
+    crewai_event_bus,
+    LLMCallCompletedEvent,
+    LLMCallFailedEvent,
+    LLMCallStartedEvent,
+    LLMCallType,
+    LLMStreamChunkEvent,
+)
+
+import tokens
+from llm_cache import make_key
+
+# --- Deterministic stand-in LLM for offline runs and benchmarks ---
+# FakeLLM is a crewai BaseLLM, so it plugs into any crew builder in place of a
+# provider client. It answers from, in order:
+#   * `replay`: an LLMCache file, i.e. answers recorded from real runs, looked up
+#     under the model and temperature they were recorded with;
+#   * `responder`: a callable(messages) -> str, a list of answers (cycled) or a
+#     fixed string; the default is a ReActScript.
+# Synthetic latency (fixed + seeded jitter + per completion token, plus an
+# occasional `slow_s` stall) is slept, not spun, so it shows up in wall time but
+# not CPU time. `fail_rate` injects provider errors (ConnectionError). It emits the same
+# call-started / stream-chunk / call-completed events as crewai's own LLM, so
+# streaming pages and usage metrics behave as with a real provider.
+
+_TOOL_NAME = re.compile(r"Tool Name: (.+)")
+
+
+class ReActScript:
+    """
+    Answers like a ReAct agent: an agent that has tools calls its first tool once
+    (with the input from `tool_inputs`, by tool name), then gives the final answer.
+    """
+
+    def __init__(self, final_answer: str = "The task is complete.", tool_inputs: dict = None):
+        self.final_answer = final_answer
+        self.tool_inputs = tool_inputs or {}
+
+    def __call__(self, messages) -> str:
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        texts = [m.get("content") or "" for m in messages if isinstance(m.get("content"), str)]
+        observed = any("Observation:" in t for m, t in zip(messages, texts) if m.get("role") != "system")
+        tool_names = _TOOL_NAME.findall("\n".join(texts))
+        if tool_names and not observed:
+            name = tool_names[0].strip()
+            arguments = self.tool_inputs.get(name, {"argument": "the task"})
+            return f"Thought: I should use the {name}.\nAction: {name}\nAction Input: {json.dumps(arguments)}"
+        return f"Thought: I now know the final answer\nFinal Answer: {self.final_answer}"
+
+
+class FakeLLM(BaseLLM):
+    def __init__(self, model: str = "fake/scripted", responder=None, replay=None, replay_model: str = None,
+                 replay_temperature: float = None, latency_s: float = 0.0, jitter_s: float = 0.0,
+                 s_per_token: float = 0.0, slow_rate: float = 0.0, slow_s: float = 0.0, fail_rate: float = 0.0,
+                 stream: bool = False, seed: int = 0, context_window: int = 8192):
+        super().__init__(model=model, temperature=replay_temperature)
+        if responder is None:
+            responder = ReActScript()
+        elif isinstance(responder, str):
+            responder = lambda _, answer=responder: answer
+        elif isinstance(responder, (list, tuple)):
+            answers, turn = list(responder), itertools.count()
+            responder = lambda _: answers[next(turn) % len(answers)]
+        self.responder = responder
+        self.replay = replay
+        self.replay_model = replay_model or model
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.s_per_token = s_per_token
+        self.slow_rate = slow_rate
+        self.slow_s = slow_s
+        self.fail_rate = fail_rate
+        self.stream = stream
+        self.context_window = context_window
+        # Agents copy their LLM when a crew is copied; the copies share these counters.
+        self.counters = {"calls": 0, "replayed": 0, "failed": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _answer(self, messages, tools) -> str:
+        if self.replay is not None:
+            tool_names = [t.get("function", {}).get("name", repr(t)) if isinstance(t, dict) else repr(t) for t in tools or []]
+            recorded = self.replay.get(make_key(self.replay_model, self.temperature, messages, tool_names, self.stop))
+            if recorded is not None:
+                with self._lock:
+                    self.counters["replayed"] += 1
+                return recorded
+        return self.responder(messages)
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        crewai_event_bus.emit(self, LLMCallStartedEvent(messages=messages, tools=tools, callbacks=callbacks,
+                                                        available_functions=available_functions))
+        with self._lock:
+            self.counters["calls"] += 1
+            delay = self.latency_s + (self._rng.uniform(0, self.jitter_s) if self.jitter_s else 0.0)
+            if self.slow_rate and self._rng.random() < self.slow_rate:
+                delay += self.slow_s
+            failed = bool(self.fail_rate) and self._rng.random() < self.fail_rate
+            self.counters["failed"] += failed
+        if failed:
+            time.sleep(delay)
+            error = f"{self.model}: injected provider failure"
+            crewai_event_bus.emit(self, LLMCallFailedEvent(error=error))
+            raise ConnectionError(error)
+        answer = self._answer(messages, tools)
+        delay += self.s_per_token * tokens.count_tokens(answer) if self.s_per_token else 0.0
+        if self.stream:
+            words = re.findall(r"\S+\s*", answer) or [answer]
+            for word in words:
+                time.sleep(delay / len(words))
+                crewai_event_bus.emit(self, LLMStreamChunkEvent(chunk=word))
+        elif delay:
+            time.sleep(delay)
+        crewai_event_bus.emit(self, LLMCallCompletedEvent(response=answer, call_type=LLMCallType.LLM_CALL))
+        return answer
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return self.context_window
+
+    @property
+    def calls(self) -> int:
+        return self.counters["calls"]
@@ -1,20 +1,20 @@
-import os
 import streamlit as st
-from dotenv import load_dotenv
-# Re-import the specific library for Google Gemini
-from langchain_google_genai import ChatGoogleGenerativeAI
-from crewai import Agent, Task, Crew, Process
+import bootstrap
 # --- 1. Application Configuration & Setup ---
+bootstrap.begin_page("geminiapp")
 
-# Load environment variables from your .env file
-load_dotenv()
+# crewai and the Gemini client are imported (and timed) on first use, i.e. only
+# once both credentials are set and the LLM and agent below are built
+crewai = bootstrap.lazy("crewai")
+crews = bootstrap.lazy("crews")
 
 # Configure the Streamlit page
 st.set_page_config(page_title="CrewAI Base Configuration", layout="centered")
 
-# Explicitly load your Google credentials from the .env file
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-google_cloud_project = os.getenv("GOOGLE_CLOUD_PROJECT")
+# Google credentials come from the .env file, read once per process
+config = bootstrap.config()
+gemini_api_key = config.gemini_api_key
+google_cloud_project = config.google_cloud_project
 
 # --- 2. Streamlit User Interface ---
 
@@ -39,38 +39,31 @@ if gemini_api_key and google_cloud_project:
     try:
         # Define the LLM using the robust ChatGoogleGenerativeAI class
         # This confirms that the connection to the service is working.
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-lite-001",
-            verbose=True,
-            temperature=0.3,
-            google_api_key=gemini_api_key
-        )
+        # Both handles share one cached client and the on-disk response cache
+        llm = crews.get_gemini_llm(gemini_api_key, temperature=0.3)
         st.success("✅ **LLM Connection:** Successfully initialized a connection to Google Gemini.")
         st.info("You can now add your Agents and Tasks to this script.")
-        llm2 = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-lite-001",
-            verbose=True,
-            temperature=0.3,
-            google_api_key=gemini_api_key
-        )
+        llm2 = crews.get_gemini_llm(gemini_api_key, temperature=0.3)
         st.success("✅ **LLM2 Connection:** Successfully initialized a connection to Google Gemini.")
         st.info("You can now add your Agents and Tasks to this script.")
+        article_researcher = crewai.Agent(
+            role="Senior Researcher",
+            # The topic belongs in the task: a goal that varies per request changes the
+            # system prompt and defeats provider-side prompt caching.
+            goal='Uncover groundbreaking technologies in the topic of each task',
+            verbose=True,
+            # crewai keeps memory per crew: run this agent in a
+            # Crew(..., short_term_memory=vector_memory.short_term_memory("research"))
+            backstory=(
+                "Driven by curiosity, you're at the forefront of"
+                "innovation, eager to explore and share knowledge that could change"
+                "the world."
+            ),
+            llm=llm2,
+            allow_delegation=True
+        )
+        st.success("Agent created successfully.")
     except Exception as e:
         st.error(f"An error occurred while connecting to the LLM: {e}")
 
-article_researcher=Agent(
-    role="Senior Researcher",
-    goal='Unccover ground breaking technologies in {topic}',
-    verbose=True,
-    memory=True,
-    backstory=(
-        "Driven by curiosity, you're at the forefront of"
-        "innovation, eager to explore and share knowledge that could change"
-        "the world."
-    ),
-
-    llm=llm2,
-    allow_delegation=True
-
-)
-st.success("Agent created successfully.")
+bootstrap.end_page()
@@ -0,0 +1,598 @@
+import argparse
+import contextvars
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+# --- Persistent background job queue ---
+# Usage: python job_queue.py --workers 4 [--kinds gig article weave]
+#
+# Crew kickoffs run as jobs instead of inside the Streamlit script thread. A
+# page submits a job and keeps its ID in the URL (`?job=`), so the result
+# survives a reload, then polls the job's status in a fragment that reruns on
+# its own without rerunning the whole script. Jobs and their events live in a
+# local SQLite file (WAL mode) shared by the web server and any number of
+# worker processes:
+#   * a worker claims the oldest queued job under a lease (one atomic
+#     transaction) and renews the lease while the job runs. A job whose worker
+#     died is claimed again once its lease expires, up to `max_attempts` times;
+#   * a job that raises fails at once: a crew error is usually not transient,
+#     and litellm already retries provider errors;
+#   * progress is written as events (tasks started/finished, answer chunks),
+#     which the page reads incrementally.
+# Workers are separate processes, so they scale across cores independently of
+# the web tier. The web server also starts JOB_LOCAL_WORKERS worker threads of
+# its own (default 1), so a single `streamlit run` works without a worker
+# process; set it to 0 when dedicated workers run. Workers read the API keys
+# from .env; they are never stored in a job.
+
+DEFAULT_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3")
+LOCAL_WORKERS = int(os.getenv("JOB_LOCAL_WORKERS", "1"))
+FINISHED = ("done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq);
+"""
+
+
+class JobQueue:
+    """SQLite-backed job queue with leased claims and per-job event logs."""
+
+    def __init__(self, path: str = DEFAULT_PATH, retention_s: float = 7 * 24 * 3600):
+        self.path = path
+        self.retention_s = retention_s
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, work):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    @staticmethod
+    def _event(conn, job_id: str, kind: str, data: str, now: float):
+        conn.execute("INSERT INTO job_events (job_id, at, kind, data) VALUES (?, ?, ?, ?)", (job_id, now, kind, data))
+
+    # --- 1. Submitting and reading ---
+
+    def submit(self, kind: str, payload: dict, max_attempts: int = 3) -> str:
+        """Queues a job and returns its ID."""
+        job_id, now = uuid.uuid4().hex, time.time()
+
+        def work(conn):
+            conn.execute("INSERT INTO jobs (id, kind, payload, max_attempts, created_at) VALUES (?, ?, ?, ?, ?)",
+                         (job_id, kind, json.dumps(payload), max_attempts, now))
+            self._event(conn, job_id, "status", "queued", now)
+        self._transaction(work)
+        return job_id
+
+    def get(self, job_id: str):
+        """The job as a dict (payload decoded), or None for an unknown ID."""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def events(self, job_id: str, after: int = 0) -> list:
+        """The job's events with a sequence number above `after`, oldest first."""
+        rows = self._connect().execute(
+            "SELECT seq, at, kind, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after))
+        return [dict(row) for row in rows]
+
+    def emit(self, job_id: str, kind: str, data: str):
+        """Appends a progress event to a job."""
+        now = time.time()
+        self._transaction(lambda conn: self._event(conn, job_id, kind, data, now))
+
+    # --- 2. Claiming and finishing (workers) ---
+
+    def claim(self, owner: str, kinds=None, lease_s: float = 60.0):
+        """
+        Leases the oldest runnable job of `kinds` to `owner`: a queued job, or a
+        running one whose lease expired. Returns (job or None, jobs that ran out
+        of attempts); the latter are marked failed here.
+        """
+        now = time.time()
+        kind_filter = ""
+        params = [now]
+        if kinds:
+            kind_filter = f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params += list(kinds)
+
+        def work(conn):
+            abandoned = [dict(row) for row in conn.execute(
+                "SELECT * FROM jobs WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts"
+                + kind_filter, params)]
+            for job in abandoned:
+                job["error"] = f"Worker lost: the lease expired on all {job['attempts']} attempts."
+                conn.execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_owner = NULL"
+                             " WHERE id = ?", (job["error"], now, job["id"]))
+                self._event(conn, job["id"], "status", "failed", now)
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' OR (status = 'running' AND lease_until < ?))"
+                + kind_filter + " ORDER BY created_at LIMIT 1", params).fetchone()
+            if row is None:
+                return None, abandoned
+            conn.execute("UPDATE jobs SET status = 'running', lease_owner = ?, lease_until = ?,"
+                         " attempts = attempts + 1, started_at = ? WHERE id = ?",
+                         (owner, now + lease_s, now, row["id"]))
+            attempt = row["attempts"] + 1
+            self._event(conn, row["id"], "status", "started" if attempt == 1 else f"started (attempt {attempt})", now)
+            job = dict(row, status="running", lease_owner=owner, attempts=attempt)
+            return job, abandoned
+
+        job, abandoned = self._transaction(work)
+        for entry in ([job] if job else []) + abandoned:
+            entry["payload"] = json.loads(entry["payload"])
+        return job, abandoned
+
+    def heartbeat(self, job_id: str, owner: str, lease_s: float = 60.0) -> bool:
+        """Extends `owner`'s lease; False if the job was reclaimed by another worker."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+            (time.time() + lease_s, job_id, owner))
+        return cursor.rowcount == 1
+
+    def _finish(self, job_id: str, owner: str, status: str, result: str = None, error: str = None) -> bool:
+        now = time.time()
+
+        def work(conn):
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_owner = NULL"
+                " WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (status, result, error, now, job_id, owner))
+            if cursor.rowcount == 1:
+                self._event(conn, job_id, "status", status, now)
+            return cursor.rowcount == 1
+        return self._transaction(work)
+
+    def complete(self, job_id: str, owner: str, result: str) -> bool:
+        """Stores the result; False (and nothing stored) if `owner` lost the lease."""
+        return self._finish(job_id, owner, "done", result=result)
+
+    def fail(self, job_id: str, owner: str, error: str) -> bool:
+        return self._finish(job_id, owner, "failed", error=error)
+
+    def unfinished(self, kind: str, field: str, value) -> int:
+        """Number of queued or running jobs of `kind` whose payload has `field` == `value`."""
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE kind = ? AND status IN ('queued', 'running')"
+            " AND json_extract(payload, '$.' || ?) = ?", (kind, field, value)).fetchone()[0]
+
+    def prune(self) -> int:
+        """Deletes finished jobs, and their events, older than `retention_s`."""
+        cutoff = time.time() - self.retention_s
+
+        def work(conn):
+            conn.execute("DELETE FROM job_events WHERE job_id IN"
+                         " (SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?)", (cutoff,))
+            return conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                                (cutoff,)).rowcount
+        return self._transaction(work)
+
+    def stats(self) -> list:
+        """Job counts per kind and status."""
+        rows = self._connect().execute(
+            "SELECT kind, status, COUNT(*) AS jobs FROM jobs GROUP BY kind, status ORDER BY kind, status")
+        return [dict(row) for row in rows]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_default_queue = None
+_default_lock = threading.Lock()
+
+
+def default_queue() -> JobQueue:
+    """The job queue shared by every page and worker in this process."""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+        return _default_queue
+
+
+# --- 3. Job kinds ---
+# A handler is called with a Job and returns the job's result text. `on_failure`
+# is called with the payload and error once a job has failed for good, then
+# `on_finish` with the Job once it is done or has failed for good. A worker
+# whose lease expired doesn't call them: the job is another worker's by then.
+
+HANDLERS = {}
+
+
+def register(kind: str, run, on_failure=None, on_finish=None):
+    HANDLERS[kind] = (run, on_failure, on_finish)
+
+
+class JobLost(RuntimeError):
+    """Raised in a run whose job was taken over by another worker."""
+
+
+class Job:
+    """A claimed job as its handler sees it: payload, progress events, lease state."""
+
+    def __init__(self, queue: JobQueue, job: dict, flush_s: float = 0.25):
+        self.queue = queue
+        self.id = job["id"]
+        self.kind = job["kind"]
+        self.payload = job["payload"]
+        self.attempt = job["attempts"]
+        self.lost = False
+        self.flush_s = flush_s
+        self._chunks = []
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Raises JobLost once the lease is gone, so the run stops instead of finishing for nothing."""
+        if self.lost:
+            raise JobLost(f"Job {self.id} was taken over by another worker.")
+
+    def progress(self, message: str):
+        self.queue.emit(self.id, "progress", message)
+
+    def chunk(self, text: str):
+        """Buffers streamed answer text; written as one event every `flush_s`."""
+        self.check()
+        with self._lock:
+            self._chunks.append(text)
+            if time.monotonic() - self._flushed_at < self.flush_s:
+                return
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            text, self._chunks = "".join(self._chunks), []
+            self._flushed_at = time.monotonic()
+        if text:
+            self.queue.emit(self.id, "chunk", text)
+
+
+# The job a worker thread is running; crew task threads inherit it (dag_process
+# runs tasks in a copy of the kickoff's context), so task events find their job.
+_current_job = contextvars.ContextVar("current_job", default=None)
+_handlers_registered = False
+_handlers_lock = threading.Lock()
+
+
+def _register_progress_handlers():
+    global _handlers_registered
+    with _handlers_lock:
+        if _handlers_registered:
+            return
+        _handlers_registered = True
+    from crewai.utilities.events import crewai_event_bus
+    from crewai.utilities.events.task_events import TaskCompletedEvent, TaskFailedEvent, TaskStartedEvent
+
+    def label(task) -> str:
+        name = getattr(task, "name", None) or " ".join(str(getattr(task, "description", "task")).split())[:60]
+        return f"Task '{name}'"
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def _on_task_started(source, event):
+        job = _current_job.get()
+        if job is not None:
+            job.progress(f"{label(event.task)} started")
+
+    @crewai_event_bus.on(TaskCompletedEvent)
+    def _on_task_completed(source, event):
+        job = _current_job.get()
+        if job is not None:
+            job.progress(f"{label(event.task)} finished")
+
+    @crewai_event_bus.on(TaskFailedEvent)
+    def _on_task_failed(source, event):
+        job = _current_job.get()
+        if job is not None:
+            job.progress(f"{label(event.task)} failed: {event.error}")
+
+
+def _run_gig(job: Job) -> str:
+    import bootstrap
+    import crews
+    config = bootstrap.config()
+    if not config.groq_api_key:
+        raise RuntimeError("GROQ_API_KEY is not configured for the workers.")
+    # The job ID doubles as the gig ID, so a retried job pays the gig at most once
+    result = crews.kickoff_gig(job.payload["gig_description"], config.groq_api_key, config.gemini_api_key,
+                               gig_id=job.id)
+    return getattr(result, "raw", str(result))
+
+
+def _run_article(job: Job) -> str:
+    # The page stores the upload in the submission store, which every worker process can read
+    import bootstrap
+    import crews
+    from submission_store import brief_store
+    from upload_store import upload_store
+    store = brief_store()
+    brief = store.read_range(job.payload["submission_id"], 0, store.size(job.payload["submission_id"]))
+    with upload_store.document(f"job-{job.id}", job.payload["name"], brief) as document_id:
+        result = crews.get_article_crew(bootstrap.config().google_api_key).kickoff(inputs={"document_id": document_id})
+    return getattr(result, "raw", str(result))
+
+
+def _refund_article(payload: dict, error: str):
+    refund = payload.get("refund")
+    if refund:
+        from quota import default_quota
+        default_quota().refund(refund["user_id"], refund["stamp"])
+
+
+def _drop_article_brief(job: Job):
+    # Briefs are content-addressed: an identical upload may back another queued article
+    from submission_store import brief_store
+    submission_id = job.payload["submission_id"]
+    if not job.queue.unfinished("article", "submission_id", submission_id):
+        brief_store().delete(submission_id)
+
+
+def _run_weave(job: Job) -> str:
+    import bootstrap
+    import crews
+    from crew_stream import CrewStream
+    stream = CrewStream(crews.get_weaver_crew(bootstrap.config().gemini_api_key),
+                        inputs={"journal_entries": job.payload["journal_entries"]})
+    streamed = []
+    for chunk in stream:
+        streamed.append(chunk)
+        job.chunk(chunk)
+    job.flush()
+    return stream.result.raw if stream.result is not None else "".join(streamed)
+
+
+register("gig", _run_gig)
+register("article", _run_article, on_failure=_refund_article, on_finish=_drop_article_brief)
+register("weave", _run_weave)
+
+
+# --- 4. Workers ---
+
+class Worker:
+    """Claims and runs jobs of `kinds` (default: every registered kind) one at a time."""
+
+    def __init__(self, queue: JobQueue = None, name: str = None, kinds=None, lease_s: float = 60.0,
+                 poll_s: float = 0.5):
+        self.queue = queue or default_queue()
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.kinds = list(kinds or HANDLERS)
+        self.lease_s = lease_s
+        self.poll_s = poll_s
+
+    def run_once(self) -> bool:
+        """Runs one job if one is ready; False if there was none."""
+        job, abandoned = self.queue.claim(self.name, self.kinds, self.lease_s)
+        for lost in abandoned:
+            self._finished(Job(self.queue, lost), lost["error"])
+        if job is None:
+            return False
+        _register_progress_handlers()
+        from llm_base import run_guard
+        run, _, _ = HANDLERS[job["kind"]]
+        handle = Job(self.queue, job)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(handle, stop), name="job-lease", daemon=True)
+        heartbeat.start()
+        # A run that lost its lease stops at its next LLM call or streamed chunk
+        job_token, guard_token = _current_job.set(handle), run_guard.set(handle.check)
+        try:
+            result = run(handle)
+        except Exception as e:
+            handle.flush()
+            error = f"{type(e).__name__}: {e}"
+            if self.queue.fail(handle.id, self.name, error):
+                self._finished(handle, error)
+        else:
+            if self.queue.complete(handle.id, self.name, str(result)):
+                self._finished(handle)
+        finally:
+            _current_job.reset(job_token)
+            run_guard.reset(guard_token)
+            stop.set()
+            heartbeat.join()
+        return True
+
+    def _heartbeat(self, job: Job, stop: threading.Event):
+        while not stop.wait(self.lease_s / 3):
+            if not self.queue.heartbeat(job.id, self.name, self.lease_s):
+                job.lost = True  # another worker has it now; Job.check stops this run
+                return
+
+    def _finished(self, job: Job, error: str = None):
+        _, on_failure, on_finish = HANDLERS.get(job.kind, (None, None, None))
+        if on_failure is not None and error is not None:
+            self._call_hook("failure", job.kind, on_failure, job.payload, error)
+        if on_finish is not None:
+            self._call_hook("finish", job.kind, on_finish, job)
+
+    @staticmethod
+    def _call_hook(name: str, kind: str, hook, *args):
+        try:
+            hook(*args)
+        except Exception as e:
+            print(f"job_queue: {name} handler for '{kind}' raised {e!r}", file=sys.stderr)
+
+    def run(self, stop=None):
+        """Runs jobs until `stop` (a threading or multiprocessing Event) is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if not self.run_once():
+                stop.wait(self.poll_s)
+
+
+_local_workers = []
+_local_lock = threading.Lock()
+
+
+def start_local_workers(count: int = LOCAL_WORKERS):
+    """Starts `count` worker threads in this process, once."""
+    with _local_lock:
+        if count and not _local_workers:
+            default_queue().prune()
+        while len(_local_workers) < count:
+            worker = threading.Thread(target=Worker().run, name=f"job-worker-{len(_local_workers)}", daemon=True)
+            worker.start()
+            _local_workers.append(worker)
+
+
+def submit(kind: str, payload: dict) -> str:
+    """Queues a job from a page, making sure this process has its local workers."""
+    job_id = default_queue().submit(kind, payload)
+    start_local_workers()
+    return job_id
+
+
+def _worker_process(name: str, kinds, lease_s: float, stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent stops workers between jobs
+    queue = JobQueue()
+    queue.prune()
+    Worker(queue, name=name, kinds=kinds, lease_s=lease_s).run(stop)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run crew jobs queued by the Streamlit pages.")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--kinds", nargs="+", choices=list(HANDLERS), help="job kinds to run (default: all)")
+    parser.add_argument("--lease-s", type=float, default=60.0, help="lease length; a dead worker's job is retried after it")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    host = socket.gethostname()
+    processes = [context.Process(target=_worker_process, args=(f"{host}:worker-{i}:{uuid.uuid4().hex[:6]}",
+                                                              args.kinds, args.lease_s, stop), daemon=False)
+                 for i in range(args.workers)]
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(f"job_queue: {args.workers} workers on {DEFAULT_PATH}; Ctrl-C stops them after their current job",
+          file=sys.stderr)
+    try:
+        while any(process.is_alive() for process in processes) and not stop.is_set():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    for process in processes:
+        process.join()
+    return 0
+
+
+# --- 5. Page status widget ---
+
+def watch(job_id: str, label: str, queue: JobQueue = None, poll_s: float = 1.0, stream: bool = False):
+    """
+    Returns the job once it has finished (None for an unknown ID). Until then
+    it shows the job's status in a fragment that polls again every `poll_s` on
+    its own (with `stream`, also the answer text so far) and returns None. When
+    the job finishes, the fragment reruns the whole page, which then gets it.
+    """
+    import streamlit as st
+    queue = queue or default_queue()
+    job = queue.get(job_id)
+    if job is None:
+        st.warning("This job no longer exists; finished jobs are kept for a week.")
+        return None
+    seen = st.session_state.setdefault("job_events", {})
+    if job["status"] in FINISHED:
+        seen.pop(job_id, None)
+        return job
+    # A reloaded page in a process that never submitted a job still needs workers
+    start_local_workers()
+
+    @st.fragment(run_every=poll_s)
+    def status():
+        current = queue.get(job_id)
+        if current is None or current["status"] in FINISHED:
+            st.rerun()
+        # Only events after the last one seen are read; the text so far is kept per session
+        state = seen.setdefault(job_id, {"seq": 0, "text": "", "message": None})
+        for event in queue.events(job_id, after=state["seq"]):
+            state["seq"] = event["seq"]
+            if event["kind"] == "chunk":
+                state["text"] += event["data"]
+            elif event["kind"] == "progress":
+                state["message"] = event["data"]
+            elif event["data"].startswith("started"):
+                state["text"] = ""  # a retried attempt streams its answer again
+        text, message = state["text"], state["message"]
+        if current["status"] == "queued":
+            waited = time.time() - current["created_at"]
+            st.info(f"{label} Waiting for a worker ({waited:.0f} s).")
+        else:
+            elapsed = time.time() - current["started_at"]
+            st.info(f"{label} {message or 'Running'} ({elapsed:.0f} s).")
+        if stream and text:
+            st.markdown(text)
+    status()
+    return None
+
+
+def render_panel(queue: JobQueue = None):
+    """Streamlit panel with job counts per kind and status."""
+    import streamlit as st
+    rows = (queue or default_queue()).stats()
+    with st.expander("Background jobs"):
+        if not rows:
+            st.caption("No job has been submitted yet.")
+            return
+        st.dataframe(rows, use_container_width=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
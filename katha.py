@@ -1,13 +1,11 @@
 import streamlit as st
-import os
-from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from crewai import Agent, Task, Crew, Process
-from crewai_tools import FileReadTool # Import the pre-built tool
+import bootstrap
+import bujo_parser
+import job_queue
 
 # --- Configuration & Setup ---
-load_dotenv()
-gemini_api_key = os.getenv("GEMINI_API_KEY")
+bootstrap.begin_page("katha")
+gemini_api_key = bootstrap.config().gemini_api_key
 
 # --- Page Configuration & CSS ---
 st.set_page_config(page_title="Weaver", page_icon="✍️", layout="wide", initial_sidebar_state="collapsed")
@@ -24,14 +22,6 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# --- LLM Initialization ---
-# We only proceed if the API key is available
-if gemini_api_key:
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-lite-001", google_api_key=gemini_api_key)
-else:
-    llm = None
-
-
 # --- Header Section ---
 st.title("Weaver ✍️")
 st.subheader("Transform your daily thoughts into beautiful narratives.")
@@ -39,9 +29,6 @@ st.write("---")
 
 
 # --- Main Application ---
-if 'narrative' not in st.session_state:
-    st.session_state.narrative = ""
-
 col1, col2, col3 = st.columns([1, 2, 1])
 
 with col2:
@@ -54,72 +41,45 @@ with col2:
     uploaded_file = st.file_uploader("Upload your journal entry", type=['txt', 'md'])
 
     if uploaded_file is not None:
-        # Create a temporary path to save the file
-        temp_file_path = os.path.join(".", uploaded_file.name)
-        
-        # Save the uploaded file to the temporary path
-        with open(temp_file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        # Parse the Bullet Journal syntax locally; the agent only gets the structured entries
+        journal_text = uploaded_file.getvalue().decode("utf-8")
+        journal_days = bujo_parser.parse(journal_text)
+        counts = bujo_parser.summarize(journal_days)
 
         with st.expander("Preview your uploaded log"):
-            st.text(uploaded_file.getvalue().decode("utf-8"))
+            st.text(journal_text)
+            st.caption(
+                f"{counts['task']} tasks · {counts['event']} events · {counts['note']} notes · "
+                f"{counts['priority']} priority · {counts['inspiration']} inspiration"
+            )
+
+        important_only = st.checkbox(
+            "Focus on priority (*) and inspiration (!) items only",
+            value=False,
+            disabled=counts["priority"] + counts["inspiration"] == 0,
+        )
 
         if st.button("Weave My Reflection"):
-            if not llm:
+            if not gemini_api_key:
                 st.error("Gemini API Key is not configured. Please check your .env file.")
             else:
-                with st.spinner("✍️ Weaver is interpreting your log and crafting your narrative..."):
-                    # --- Agent & Task Definition ---
-                    
-                    # 1. Instantiate the pre-built tool
-                    file_read_tool = FileReadTool()
-
-                    # 2. Define the "Journalist" Agent
-                    journalist_agent = Agent(
-                        role="Empathetic Journal Weaver",
-                        goal="To read a user's bullet journal entry from a file and transform it into a beautiful, first-person narrative that captures the essence of their day.",
-                        backstory=(
-                            "You are a master storyteller with a deep understanding of human emotion and the art of journaling. "
-                            "You can find the hidden story in simple notes and weave them together into a compelling and reflective piece of writing."
-                        ),
-                        llm=llm,
-                        tools=[file_read_tool],
-                        verbose=True,
-                        allow_delegation=False,
-                    )
-
-                    # 3. Define the Weaving Task
-                    # 3. Define the Weaving Task (Corrected)
-                    weaving_task = Task(
-                        # Add 'f' to make this an f-string and insert the variable directly
-                        description=f"""
-                        You must read the user's journal entry from the file located at: '{temp_file_path}'.
-                        Interpret the entry based on the Bullet Journal method (`•` Tasks, `○` Events, `—` Notes, `*` Priority, `!` Inspiration).
-                        Do not just list the items. Weave them into a cohesive, first-person narrative. 
-                        Capture the underlying mood and themes of the day. The final output should be a formatted markdown text.
-                        """,
-                        expected_output=(
-                            "A beautifully written, reflective narrative in markdown format. It should feel like a personal story, not a summary."
-                        ),
-                        agent=journalist_agent
-                        # The 'context' parameter has been removed
-                    )
-                    # 4. Create and Kick off the Crew
-                    story_crew = Crew(
-                        agents=[journalist_agent],
-                        tasks=[weaving_task],
-                        process=Process.sequential,
-                        verbose=True,
-                    )
-
-                    narrative_result = story_crew.kickoff()
-                    st.session_state.narrative = narrative_result
-
-                    # Clean up the temporary file
-                    os.remove(temp_file_path)
+                # The crew runs on a background worker (job_queue.py), which streams the
+                # narrative back as job events; only the parsed entries are sent. The job
+                # ID goes into the URL, so the narrative survives a page reload.
+                journal_entries = bujo_parser.render_compact(journal_days, important_only=important_only)
+                st.query_params["job"] = job_queue.submit("weave", {"journal_entries": journal_entries})
 
 # --- Output Section ---
-if st.session_state.narrative:
+# While the job runs, only the status widget below reruns, showing the narrative
+# as it is written; once it is done the whole page reruns with the final text.
+job_id = st.query_params.get("job")
+if job_id:
     with st.columns([1, 2, 1])[1]:
         st.header("Your Woven Narrative")
-        st.markdown(st.session_state.narrative)
\ No newline at end of file
+        job = job_queue.watch(job_id, "✍️ Weaver is crafting your narrative...", poll_s=0.5, stream=True)
+        if job is not None and job["status"] == "done":
+            st.markdown(job["result"])
+        elif job is not None:
+            st.error(f"The narrative could not be woven: {job['error']}")
+
+bootstrap.end_page()
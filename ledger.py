@@ -0,0 +1,343 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# --- Double-entry payout ledger ---
+# Every money movement is a journal entry whose postings sum to zero. Amounts
+# are integer cents, entries and postings are append-only (enforced by
+# triggers), and every entry carries an idempotency key, so retrying a payout
+# for the same gig/milestone can never pay twice.
+#
+# Accounts used by the gig workflow:
+#   funding                 where requester money comes from
+#   escrow:<gig_id>         money held for a gig
+#   payable:<contributor>   earned by a contributor, not yet paid out
+#   settled:<contributor>   paid out in a settlement batch
+#
+# Postings are queued in memory and written by `flush()` in one transaction;
+# `settle()` pays every outstanding payable in a single batch entry. Entries
+# that would overdraw an escrow or payable account are rejected.
+
+DEFAULT_PATH = os.getenv("LEDGER_PATH", "ledger.sqlite3")
+# Accounts that must never go below zero: a gig cannot pay out more than was
+# put in escrow, and a contributor cannot be settled more than they earned.
+GUARDED_PREFIXES = ("escrow:", "payable:")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    idempotency_key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    gig_id TEXT,
+    milestone TEXT,
+    batch_id TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    entry_key TEXT NOT NULL REFERENCES entries (idempotency_key),
+    account TEXT NOT NULL,
+    amount_cents INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS postings_account ON postings (account);
+CREATE TABLE IF NOT EXISTS balances (
+    account TEXT PRIMARY KEY,
+    balance_cents INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS entries_no_update BEFORE UPDATE ON entries
+    BEGIN SELECT RAISE(ABORT, 'ledger entries are append-only'); END;
+CREATE TRIGGER IF NOT EXISTS entries_no_delete BEFORE DELETE ON entries
+    BEGIN SELECT RAISE(ABORT, 'ledger entries are append-only'); END;
+CREATE TRIGGER IF NOT EXISTS postings_no_update BEFORE UPDATE ON postings
+    BEGIN SELECT RAISE(ABORT, 'ledger postings are append-only'); END;
+CREATE TRIGGER IF NOT EXISTS postings_no_delete BEFORE DELETE ON postings
+    BEGIN SELECT RAISE(ABORT, 'ledger postings are append-only'); END;
+"""
+
+
+class LedgerError(Exception):
+    """Raised for entries that would break the ledger's invariants."""
+
+
+def allocate(total_cents: int, weights: List[int]) -> List[int]:
+    """
+    Splits `total_cents` in proportion to integer `weights` so the shares sum
+    exactly to the total. Leftover cents go to the largest remainders, ties to
+    the earlier share, so the same inputs always give the same split.
+    """
+    if total_cents < 0:
+        raise LedgerError("Cannot allocate a negative amount")
+    if not weights or any(w < 0 for w in weights) or sum(weights) == 0:
+        raise LedgerError("Split weights must be non-negative and not all zero")
+    weight_sum = sum(weights)
+    shares = [total_cents * w // weight_sum for w in weights]
+    remainders = [total_cents * w % weight_sum for w in weights]
+    leftover = total_cents - sum(shares)
+    for i in sorted(range(len(weights)), key=lambda i: (-remainders[i], i))[:leftover]:
+        shares[i] += 1
+    return shares
+
+
+@dataclass
+class Entry:
+    idempotency_key: str
+    kind: str
+    postings: Dict[str, int]
+    gig_id: Optional[str] = None
+    milestone: Optional[str] = None
+    batch_id: Optional[str] = None
+
+
+class Ledger:
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._pending: List[Entry] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    # --- Queuing entries ---
+
+    def _queue(self, entry: Entry) -> str:
+        if sum(entry.postings.values()) != 0:
+            raise LedgerError(f"Entry {entry.idempotency_key} does not balance")
+        if any(not isinstance(cents, int) for cents in entry.postings.values()):
+            raise LedgerError("Amounts must be integer cents")
+        with self._lock:
+            self._pending.append(entry)
+        return entry.idempotency_key
+
+    def fund(self, gig_id: str, amount_cents: int, idempotency_key: str = None) -> str:
+        """Moves requester money into the gig's escrow account."""
+        return self._queue(Entry(
+            idempotency_key=idempotency_key or f"fund:{gig_id}",
+            kind="fund",
+            gig_id=gig_id,
+            postings={"funding": -amount_cents, f"escrow:{gig_id}": amount_cents},
+        ))
+
+    def post_payout(self, gig_id: str, amount_cents: int, splits: Dict[str, int], milestone: str = None) -> str:
+        """
+        Queues a payout from the gig's escrow to its contributors. `splits` maps
+        contributor -> integer weight; the amount is divided with `allocate`.
+        The idempotency key is derived from the gig and milestone, so posting the
+        same payout twice is a no-op.
+        """
+        contributors = sorted(splits)
+        shares = allocate(amount_cents, [splits[c] for c in contributors])
+        postings = {f"escrow:{gig_id}": -amount_cents}
+        for contributor, share in zip(contributors, shares):
+            postings[f"payable:{contributor}"] = postings.get(f"payable:{contributor}", 0) + share
+        return self._queue(Entry(
+            idempotency_key=f"payout:{gig_id}:{milestone or 'completion'}",
+            kind="payout",
+            gig_id=gig_id,
+            milestone=milestone,
+            postings=postings,
+        ))
+
+    def post_milestones(self, gig_id: str, amount_cents: int, milestones: Dict[str, int], splits: Dict[str, int], completed: List[str]) -> List[str]:
+        """
+        Splits a gig's total across weighted milestones and queues payouts for the
+        completed ones. Milestone amounts are allocated over all milestones, so the
+        total is exact once every milestone has been paid.
+        """
+        names = list(milestones)
+        amounts = dict(zip(names, allocate(amount_cents, [milestones[m] for m in names])))
+        return [self.post_payout(gig_id, amounts[m], splits, milestone=m) for m in completed]
+
+    # --- Writing ---
+
+    def flush(self) -> int:
+        """
+        Writes every queued entry in one transaction and returns how many were
+        new. Entries whose idempotency key is already recorded are skipped.
+        Entries that would overdraw a guarded account are dropped and reported
+        with a LedgerError once the rest are written; if the transaction itself
+        fails, every entry goes back on the queue for the next flush.
+        """
+        written, rejected = self._drain(lambda e: True)
+        if rejected:
+            raise LedgerError("Rejected entries that would overdraw an account: " + ", ".join(
+                f"{e.idempotency_key} ({account})" for e, account in rejected
+            ))
+        return len(written)
+
+    def commit(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Writes only the queued entries with these idempotency keys, in their own
+        transaction, and returns each key's outcome: "written", "duplicate"
+        (already recorded) or "rejected" (it would overdraw an account). Entries
+        queued by other threads stay queued, so a caller only ever hears about
+        its own entries.
+        """
+        keys = set(keys)
+        written, rejected = self._drain(lambda e: e.idempotency_key in keys)
+        outcomes = {e.idempotency_key: "written" for e in written}
+        outcomes.update((e.idempotency_key, "rejected") for e, _ in rejected)
+        # The rest were already recorded, or taken by another thread's flush of the
+        # same key; once that flush's transaction is over, the table says which.
+        with self._write_lock:
+            for key in keys - set(outcomes):
+                outcomes[key] = "duplicate" if self.has_entry(key) else "rejected"
+        return outcomes
+
+    def _drain(self, selected):
+        with self._lock:
+            pending = [e for e in self._pending if selected(e)]
+            self._pending = [e for e in self._pending if not selected(e)]
+        if not pending:
+            return [], []
+        try:
+            return self._transaction(lambda conn: self._write(conn, pending))
+        except Exception:
+            with self._lock:
+                self._pending[:0] = pending
+            raise
+
+    def _transaction(self, work):
+        """Runs `work(conn)` in a BEGIN IMMEDIATE transaction, so reads and writes see no other writer."""
+        conn = self._conn
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def _write(self, conn, pending: List[Entry]):
+        unrecorded = self._unrecorded(conn, pending)
+        guarded = sorted({a for e in unrecorded for a in e.postings if a.startswith(GUARDED_PREFIXES)})
+        balances = dict.fromkeys(guarded, 0)
+        for i in range(0, len(guarded), 500):
+            chunk = guarded[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            balances.update(conn.execute(
+                f"SELECT account, balance_cents FROM balances WHERE account IN ({placeholders})", chunk
+            ))
+        new_entries, rejected = [], []
+        for e in unrecorded:
+            overdrawn = next((a for a, cents in e.postings.items() if a in balances and balances[a] + cents < 0), None)
+            if overdrawn is not None:
+                rejected.append((e, overdrawn))
+                continue
+            for account, cents in e.postings.items():
+                if account in balances:
+                    balances[account] += cents
+            new_entries.append(e)
+
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO entries (idempotency_key, kind, gig_id, milestone, batch_id, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(e.idempotency_key, e.kind, e.gig_id, e.milestone, e.batch_id, now) for e in new_entries],
+        )
+        conn.executemany(
+            "INSERT INTO postings (entry_key, account, amount_cents) VALUES (?, ?, ?)",
+            [(e.idempotency_key, account, cents) for e in new_entries for account, cents in e.postings.items()],
+        )
+        deltas = {}
+        for e in new_entries:
+            for account, cents in e.postings.items():
+                deltas[account] = deltas.get(account, 0) + cents
+        conn.executemany(
+            "INSERT INTO balances (account, balance_cents) VALUES (?, ?)"
+            " ON CONFLICT (account) DO UPDATE SET balance_cents = balance_cents + excluded.balance_cents",
+            deltas.items(),
+        )
+        return new_entries, rejected
+
+    @staticmethod
+    def _unrecorded(conn, pending: List[Entry]) -> List[Entry]:
+        seen = set()
+        keys = [e.idempotency_key for e in pending]
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            seen.update(row[0] for row in conn.execute(
+                f"SELECT idempotency_key FROM entries WHERE idempotency_key IN ({placeholders})", chunk
+            ))
+        unique = []
+        for e in pending:
+            if e.idempotency_key not in seen:
+                seen.add(e.idempotency_key)
+                unique.append(e)
+        return unique
+
+    def settle(self) -> Optional[str]:
+        """
+        Pays out every positive payable balance in one batch entry and returns
+        the batch ID, or None when nothing is owed. Reading the balances and
+        writing the batch happen in one transaction, so concurrent settles from
+        other threads or processes cannot pay the same balance twice.
+        """
+        self.flush()
+
+        def settle_owed(conn):
+            owed = conn.execute(
+                "SELECT account, balance_cents FROM balances WHERE account LIKE 'payable:%' AND balance_cents > 0 ORDER BY account"
+            ).fetchall()
+            if not owed:
+                return None
+            batch_id = f"batch-{uuid.uuid4().hex[:12]}"
+            postings = {}
+            for account, cents in owed:
+                contributor = account.split(":", 1)[1]
+                postings[account] = -cents
+                postings[f"settled:{contributor}"] = cents
+            self._write(conn, [Entry(idempotency_key=f"settle:{batch_id}", kind="settlement", batch_id=batch_id, postings=postings)])
+            return batch_id
+
+        return self._transaction(settle_owed)
+
+    # --- Reading ---
+
+    def has_entry(self, idempotency_key: str) -> bool:
+        row = self._conn.execute("SELECT 1 FROM entries WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+        return row is not None
+
+    def balance(self, account: str) -> int:
+        row = self._conn.execute("SELECT balance_cents FROM balances WHERE account = ?", (account,)).fetchone()
+        return row[0] if row else 0
+
+    def balances(self, prefix: str = "") -> Dict[str, int]:
+        rows = self._conn.execute(
+            "SELECT account, balance_cents FROM balances WHERE account LIKE ? ORDER BY account", (prefix + "%",)
+        ).fetchall()
+        return dict(rows)
+
+    def check_integrity(self) -> bool:
+        """True if every entry balances and the balance table matches the postings."""
+        unbalanced = self._conn.execute(
+            "SELECT COUNT(*) FROM (SELECT entry_key FROM postings GROUP BY entry_key HAVING SUM(amount_cents) != 0)"
+        ).fetchone()[0]
+        drift = self._conn.execute(
+            "SELECT COUNT(*) FROM balances b LEFT JOIN"
+            " (SELECT account, SUM(amount_cents) AS total FROM postings GROUP BY account) p USING (account)"
+            " WHERE b.balance_cents != COALESCE(p.total, 0)"
+        ).fetchone()[0]
+        return unbalanced == 0 and drift == 0
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+_default_ledger = None
+_default_lock = threading.Lock()
+
+
+def default_ledger() -> Ledger:
+    """The ledger shared by every payment tool in this process."""
+    global _default_ledger
+    with _default_lock:
+        if _default_ledger is None:
+            _default_ledger = Ledger()
+        return _default_ledger
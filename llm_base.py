@@ -0,0 +1,77 @@
+import contextvars
+import copy
+import threading
+
+from crewai import BaseLLM
+from crewai.utilities.llm_utils import create_llm
+
+# --- Base class for LLM wrappers ---
+# Agents accept any crewai BaseLLM. Wrappers in this repo (caching, metrics,
+# routing, ...) subclass DelegatingLLM and override `call`; everything else is
+# forwarded to the wrapped LLM, so wrappers can be stacked in any order.
+
+
+_stopped = {}
+_stopped_lock = threading.Lock()
+
+# A check that raises once the current run should stop early (a background job
+# whose lease moved to another worker). It is a context variable, so crew task
+# threads, which run in a copy of the kickoff's context, see it too; every
+# wrapper runs it before calling the LLM it wraps.
+run_guard = contextvars.ContextVar("llm_run_guard", default=None)
+
+
+def with_stop(llm, stop):
+    """
+    `llm` with `stop` words, leaving `llm` itself alone. The agent executor sets
+    stop words on the LLM it was given, i.e. on the outermost wrapper; inner
+    clients are shared between agents and threads (see crew_registry), so they
+    get one private copy per set of stop words instead of being mutated.
+    """
+    if not stop or list(llm.stop or []) == list(stop):
+        return llm
+    key = (id(llm), tuple(stop))
+    with _stopped_lock:
+        entry = _stopped.get(key)
+        if entry is None or entry[0] is not llm:
+            stopped = copy.copy(llm)
+            stopped.stop = list(stop)
+            entry = _stopped[key] = (llm, stopped)
+        return entry[1]
+
+
+class DelegatingLLM(BaseLLM):
+    """
+    Forwards every call to `inner`. LangChain chat models (ChatGroq,
+    ChatGoogleGenerativeAI) are converted the same way crewai converts them
+    when they are passed to an Agent directly.
+    """
+
+    def __init__(self, llm):
+        inner = llm if isinstance(llm, BaseLLM) else create_llm(llm)
+        super().__init__(model=inner.model, temperature=getattr(inner, "temperature", None))
+        self.inner = inner
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        return self.call_inner(messages, tools, callbacks, available_functions, **kwargs)
+
+    def call_inner(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        guard = run_guard.get()
+        if guard is not None:
+            guard()
+        return with_stop(self.inner, self.stop).call(
+            messages,
+            tools=tools,
+            callbacks=callbacks,
+            available_functions=available_functions,
+            **kwargs,
+        )
+
+    def supports_function_calling(self) -> bool:
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
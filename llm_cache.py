@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from llm_base import DelegatingLLM
+
+# --- Persistent LLM response cache ---
+# Responses are stored in a local SQLite file shared by every app and process.
+# WAL mode lets readers and a writer work at the same time, and each thread
+# keeps its own connection. Entries expire after `ttl_s` and the least recently
+# used ones are evicted once the cache grows past its entry or byte cap.
+
+DEFAULT_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+
+
+def normalize_messages(messages) -> list:
+    """Turns a prompt string or message list into [{role, content}] with whitespace collapsed."""
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    normalized = []
+    for message in messages:
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True)
+        normalized.append({"role": message.get("role", "user"), "content": " ".join(content.split())})
+    return normalized
+
+
+def make_key(model: str, temperature, messages, tools=None, stop=None) -> str:
+    """Cache key over everything that changes the provider's answer."""
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "messages": normalize_messages(messages),
+        "tools": tools or [],
+        "stop": sorted(stop or []),
+    }
+    canonical = json.dumps(payload, sort_keys=True, default=repr)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed response store with TTL expiry and LRU eviction."""
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl_s: float = 7 * 24 * 3600,
+                 max_entries: int = 10_000, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str):
+        """Returns the cached response, or None on a miss or an expired entry."""
+        conn = self._connect()
+        row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self._count(False)
+            return None
+        if now - row[1] > self.ttl_s:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count(False)
+            return None
+        conn.execute("UPDATE responses SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        self._count(True)
+        return row[0]
+
+    def put(self, key: str, response: str, model: str = None):
+        """Stores a response and evicts least recently used entries over the caps."""
+        conn = self._connect()
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_s,))
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                self._evict(conn, count, total)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn, count, total):
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def clear(self):
+        self._connect().execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        """Hit rate for this process, plus the size of the shared store."""
+        count, total, lifetime_hits = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses"
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+            "stored_entry_hits": lifetime_hits,
+        }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> LLMCache:
+    """The cache shared by every LLM in this process."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
+
+
+class CachedLLM(DelegatingLLM):
+    """
+    Wraps any crewai or LangChain LLM and answers repeated prompts from the cache.
+    Only plain text answers are cached; tool-calling results are always fresh.
+    """
+
+    def __init__(self, llm, cache: LLMCache = None):
+        super().__init__(llm)
+        self.cache = cache or default_cache()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        tool_names = [t.get("function", {}).get("name", repr(t)) if isinstance(t, dict) else repr(t) for t in tools or []]
+        key = make_key(self.model, self.temperature, messages, tool_names, self.stop)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = self.call_inner(messages, tools, callbacks, available_functions, **kwargs)
+        if isinstance(response, str) and response.strip():
+            self.cache.put(key, response, model=self.model)
+        return response
@@ -0,0 +1,304 @@
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+from crewai.utilities.events import (
+    crewai_event_bus,
+    AgentExecutionStartedEvent,
+    CrewKickoffCompletedEvent,
+    CrewKickoffStartedEvent,
+)
+
+import tokens
+from llm_base import DelegatingLLM
+
+# --- Per-agent LLM call accounting ---
+# InstrumentedLLM wraps the provider client (inside the response cache, so only
+# calls that reach the provider are counted) and records, for every call:
+# prompt/completion tokens, latency, model, errors/retries and estimated cost.
+# Calls are attributed to the crew, agent and task running in the calling
+# context, which crewai announces on its event bus before the agent calls its
+# LLM. The attribution is a context variable, so work handed to another thread
+# with contextvars.copy_context() (e.g. the router's hedged calls) keeps it.
+#
+# Token counts come from the provider's usage report when crewai's token
+# callback received one during the call, and are estimated with tokens.py
+# otherwise. Latencies keep the last SAMPLES_PER_SERIES values per series for
+# p50/p95/p99. Exports: JSON and Prometheus text (summary + counters), written
+# to LLM_METRICS_DIR after every crew kickoff when that variable is set.
+
+EXPORT_DIR = os.getenv("LLM_METRICS_DIR")
+SAMPLES_PER_SERIES = 2048
+
+# USD per million (prompt, completion) tokens, matched as a substring of the model name
+PRICES = {
+    "llama3-8b": (0.05, 0.08),
+    "llama3-70b": (0.59, 0.79),
+    "llama-3.1-8b": (0.05, 0.08),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+_attribution = contextvars.ContextVar("llm_attribution", default=("-", "-", "-"))
+_handlers_registered = False
+_handlers_lock = threading.Lock()
+
+
+def price_per_million(model: str):
+    """(prompt, completion) price for the longest matching PRICES entry, or (0, 0) if unknown."""
+    matches = [name for name in PRICES if name in (model or "")]
+    return PRICES[max(matches, key=len)] if matches else (0.0, 0.0)
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def current_attribution() -> tuple:
+    """(crew, agent, task) running in this context, as announced on the crewai event bus."""
+    return _attribution.get()
+
+
+def _task_label(task) -> str:
+    if task is None:
+        return "-"
+    label = getattr(task, "name", None) or " ".join((getattr(task, "description", "") or "").split())
+    return label[:60] or "-"
+
+
+def _register_handlers():
+    global _handlers_registered
+    with _handlers_lock:
+        if _handlers_registered:
+            return
+        _handlers_registered = True
+
+    @crewai_event_bus.on(CrewKickoffStartedEvent)
+    def _on_crew_started(source, event):
+        _attribution.set((event.crew_name or "crew", "-", "-"))
+
+    @crewai_event_bus.on(AgentExecutionStartedEvent)
+    def _on_agent_started(source, event):
+        crew = getattr(getattr(event.agent, "crew", None), "name", None) or _attribution.get()[0]
+        _attribution.set((crew, (getattr(event.agent, "role", None) or "-").strip(), _task_label(event.task)))
+
+    @crewai_event_bus.on(CrewKickoffCompletedEvent)
+    def _on_crew_completed(source, event):
+        _attribution.set(("-", "-", "-"))
+        if EXPORT_DIR:
+            default_metrics().export(EXPORT_DIR)
+
+
+class _Series:
+    __slots__ = ("calls", "errors", "retries", "prompt_tokens", "completion_tokens",
+                 "estimated_calls", "cost_usd", "latency_total_s", "latencies")
+
+    def __init__(self):
+        self.calls = self.errors = self.retries = 0
+        self.prompt_tokens = self.completion_tokens = self.estimated_calls = 0
+        self.cost_usd = self.latency_total_s = 0.0
+        self.latencies = deque(maxlen=SAMPLES_PER_SERIES)
+
+
+class LLMMetrics:
+    """Aggregates LLM calls per (crew, agent, task, model) series."""
+
+    def __init__(self):
+        self._series = {}
+        self._last_failed = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, crew: str, agent: str, task: str, model: str, latency_s: float,
+               prompt_tokens: int = 0, completion_tokens: int = 0, error: bool = False, estimated: bool = False):
+        prompt_price, completion_price = price_per_million(model)
+        key = (crew, agent, task, model or "-")
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.calls += 1
+            # A call right after a failed one in the same series is crewai retrying it
+            series.retries += self._last_failed.get(key, False)
+            self._last_failed[key] = error
+            series.errors += error
+            series.prompt_tokens += prompt_tokens
+            series.completion_tokens += completion_tokens
+            series.estimated_calls += estimated
+            series.cost_usd += (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+            series.latency_total_s += latency_s
+            series.latencies.append(latency_s)
+
+    def rows(self) -> list:
+        """One dict per series, with latency percentiles, sorted by cost then latency."""
+        with self._lock:
+            items = [(key, series, sorted(series.latencies)) for key, series in self._series.items()]
+        rows = []
+        for (crew, agent, task, model), s, latencies in items:
+            rows.append({
+                "crew": crew, "agent": agent, "task": task, "model": model,
+                "calls": s.calls, "errors": s.errors, "retries": s.retries,
+                "prompt_tokens": s.prompt_tokens, "completion_tokens": s.completion_tokens,
+                "estimated_calls": s.estimated_calls, "cost_usd": round(s.cost_usd, 6),
+                "latency_total_s": round(s.latency_total_s, 4),
+                "p50_s": round(percentile(latencies, 0.50), 4),
+                "p95_s": round(percentile(latencies, 0.95), 4),
+                "p99_s": round(percentile(latencies, 0.99), 4),
+            })
+        rows.sort(key=lambda r: (r["cost_usd"], r["latency_total_s"]), reverse=True)
+        return rows
+
+    def by_agent(self) -> list:
+        """Rows rolled up per (crew, agent): where the tokens, money and time go."""
+        totals = {}
+        for row in self.rows():
+            total = totals.setdefault((row["crew"], row["agent"]), {
+                "crew": row["crew"], "agent": row["agent"], "calls": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "cost_usd": 0.0, "latency_total_s": 0.0,
+            })
+            for field in ("calls", "prompt_tokens", "completion_tokens", "cost_usd", "latency_total_s"):
+                total[field] += row[field]
+        return sorted(totals.values(), key=lambda t: (t["cost_usd"], t["latency_total_s"]), reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._last_failed.clear()
+            self.started_at = time.time()
+
+    # --- Exports ---
+
+    def to_json(self) -> str:
+        return json.dumps({"started_at": self.started_at, "exported_at": time.time(), "series": self.rows()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        rows = self.rows()
+
+        def labels(row, **extra):
+            pairs = {k: row[k] for k in ("crew", "agent", "task", "model")}
+            pairs.update(extra)
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ") for v in pairs.values())
+            return "{" + ",".join(f'{k}="{v}"' for k, v in zip(pairs, escaped)) + "}"
+
+        counters = [
+            ("llm_calls_total", "LLM calls that reached the provider.", "calls"),
+            ("llm_errors_total", "LLM calls that raised.", "errors"),
+            ("llm_retries_total", "LLM calls made right after a failed one.", "retries"),
+            ("llm_prompt_tokens_total", "Prompt tokens sent.", "prompt_tokens"),
+            ("llm_completion_tokens_total", "Completion tokens received.", "completion_tokens"),
+            ("llm_cost_usd_total", "Estimated cost in USD.", "cost_usd"),
+        ]
+        for name, help_text, field in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f"{name}{labels(row)} {row[field]}" for row in rows]
+        lines += ["# HELP llm_latency_seconds LLM call latency.", "# TYPE llm_latency_seconds summary"]
+        for row in rows:
+            for q, field in (("0.5", "p50_s"), ("0.95", "p95_s"), ("0.99", "p99_s")):
+                lines.append(f"llm_latency_seconds{labels(row, quantile=q)} {row[field]}")
+            lines.append(f"llm_latency_seconds_sum{labels(row)} {row['latency_total_s']}")
+            lines.append(f"llm_latency_seconds_count{labels(row)} {row['calls']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: str) -> dict:
+        """Writes llm_metrics.json and llm_metrics.prom atomically; returns their paths."""
+        os.makedirs(directory, exist_ok=True)
+        paths = {}
+        for name, text in (("llm_metrics.json", self.to_json()), ("llm_metrics.prom", self.to_prometheus())):
+            fd, tmp = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            paths[name] = os.path.join(directory, name)
+            os.replace(tmp, paths[name])
+        return paths
+
+
+_default_metrics = None
+_default_lock = threading.Lock()
+
+
+def default_metrics() -> LLMMetrics:
+    """The metrics shared by every instrumented LLM in this process."""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = LLMMetrics()
+        return _default_metrics
+
+
+def _usage(callbacks) -> tuple:
+    """(prompt, completion) totals from crewai's token callbacks, which the provider's usage report updates."""
+    prompt = completion = 0
+    for callback in callbacks or []:
+        process = getattr(callback, "token_cost_process", None)
+        if process is not None:
+            prompt += process.prompt_tokens
+            completion += process.completion_tokens
+    return prompt, completion
+
+
+def _prompt_text(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    parts = []
+    for message in messages:
+        content = message.get("content") or ""
+        parts.append(content if isinstance(content, str) else json.dumps(content))
+    return "\n".join(parts)
+
+
+class InstrumentedLLM(DelegatingLLM):
+    """Records tokens, latency, errors and cost of every call, attributed to crew/agent/task."""
+
+    def __init__(self, llm, metrics: LLMMetrics = None):
+        super().__init__(llm)
+        self.metrics = metrics or default_metrics()
+        _register_handlers()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        crew, agent, task = current_attribution()
+        before = _usage(callbacks)
+        start = time.perf_counter()
+        try:
+            response = self.call_inner(messages, tools, callbacks, available_functions, **kwargs)
+        except Exception:
+            self.metrics.record(crew, agent, task, self.model, time.perf_counter() - start, error=True)
+            raise
+        latency = time.perf_counter() - start
+        after = _usage(callbacks)
+        prompt, completion = after[0] - before[0], after[1] - before[1]
+        estimated = not (prompt or completion)
+        if estimated:
+            prompt = tokens.count_tokens(_prompt_text(messages))
+            completion = tokens.count_tokens(response if isinstance(response, str) else json.dumps(response, default=repr))
+        self.metrics.record(crew, agent, task, self.model, latency, prompt, completion, estimated=estimated)
+        return response
+
+
+def render_panel(metrics: LLMMetrics = None):
+    """Streamlit panel: per-agent totals, per-series percentiles and export downloads."""
+    import streamlit as st
+    metrics = metrics or default_metrics()
+    rows = metrics.rows()
+    with st.expander("LLM usage by agent"):
+        if not rows:
+            st.caption("No LLM calls have reached a provider in this process yet.")
+            return
+        total_cost = sum(r["cost_usd"] for r in rows)
+        total_tokens = sum(r["prompt_tokens"] + r["completion_tokens"] for r in rows)
+        st.caption(f"{sum(r['calls'] for r in rows)} calls, {total_tokens} tokens, ~${total_cost:.4f} since {time.strftime('%H:%M', time.localtime(metrics.started_at))}")
+        st.dataframe(metrics.by_agent(), use_container_width=True)
+        st.caption("Per task and model (latency percentiles in seconds)")
+        st.dataframe(rows, use_container_width=True)
+        left, right = st.columns(2)
+        left.download_button("metrics.json", metrics.to_json(), file_name="llm_metrics.json", mime="application/json")
+        right.download_button("metrics.prom", metrics.to_prometheus(), file_name="llm_metrics.prom", mime="text/plain")
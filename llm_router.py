@@ -0,0 +1,218 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from crewai import BaseLLM
+from crewai.utilities.llm_utils import create_llm
+
+from llm_base import with_stop
+from llm_metrics import percentile
+
+# --- Latency-aware routing across LLM providers ---
+# RouterLLM stands in for a single provider client. It keeps a rolling window
+# of latencies and outcomes per route (provider/model) and sends each call to
+# the fastest healthy route; a route that fails, or is slow to answer, does
+# not fail the call:
+#   * failover: a failed call is retried on the next route in rank order;
+#   * circuit breaker: after `failure_threshold` consecutive failures, or an
+#     error rate above `max_error_rate`, a route sits out `cooldown_s`, then
+#     gets a trial call; a success closes the circuit with fresh stats;
+#   * hedging (optional): when the primary hasn't answered by its own p95
+#     latency, the same call goes to the next route and the first answer wins.
+#     Python threads can't be interrupted, so the losing call is cancelled if
+#     it hasn't started and otherwise left to finish in the background with its
+#     answer discarded (its latency still feeds the stats). The thread pool is
+#     sized so these stragglers don't delay new hedges.
+# Routes are ranked by median latency scaled by expected attempts, 1 / (1 -
+# error rate); untried routes rank first, so every route gets measured. Routes that stream
+# tokens (crew_stream pages) are never hedged: chunks are only routed from the
+# calling thread.
+
+
+class AllRoutesFailed(RuntimeError):
+    """Raised when every route failed the same call."""
+
+
+class _Route:
+    def __init__(self, name: str, llm, window: int):
+        self.name = name
+        self.llm = llm if isinstance(llm, BaseLLM) else create_llm(llm)
+        self.latencies = deque(maxlen=window)
+        self.failures = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.counters = {"calls": 0, "errors": 0, "hedge_wins": 0}
+
+    def error_rate(self) -> float:
+        return sum(self.failures) / len(self.failures) if self.failures else 0.0
+
+    def streams(self) -> bool:
+        llm = self.llm
+        while not getattr(llm, "stream", False) and hasattr(llm, "inner"):
+            llm = llm.inner
+        return bool(getattr(llm, "stream", False))
+
+
+class RouterLLM(BaseLLM):
+    def __init__(self, routes: dict, hedge: bool = False, hedge_quantile: float = 0.95,
+                 default_hedge_s: float = 8.0, min_samples: int = 5, window: int = 50,
+                 max_error_rate: float = 0.5, failure_threshold: int = 3, cooldown_s: float = 30.0,
+                 max_workers: int = 32):
+        """`routes` maps a route name to a crewai or LangChain LLM, e.g. {"groq": ..., "gemini": ...}."""
+        self.routes = [_Route(name, llm, window) for name, llm in routes.items()]
+        if not self.routes:
+            raise ValueError("RouterLLM needs at least one route")
+        first = self.routes[0].llm
+        super().__init__(model="router:" + "|".join(r.llm.model for r in self.routes),
+                         temperature=getattr(first, "temperature", None))
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.default_hedge_s = default_hedge_s
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.counters = {"calls": 0, "failovers": 0, "hedged": 0}
+        self._lock = threading.Lock()
+        # Threads start on first use; crew copies share the pool like the routes.
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-route")
+
+    # --- Ranking ---
+
+    def ranked(self) -> list:
+        """Closed circuits by expected latency (untried and trial routes first), then open ones by reopening time."""
+        now = time.monotonic()
+        with self._lock:
+            closed, tripped = [], []
+            for route in self.routes:
+                if route.open_until > now:
+                    tripped.append((route, route.open_until))
+                elif not route.latencies or route.open_until:
+                    closed.append((route, -1.0))
+                else:
+                    median = percentile(sorted(route.latencies), 0.5)
+                    closed.append((route, median / max(1.0 - route.error_rate(), 0.05)))
+        closed.sort(key=lambda item: item[1])
+        tripped.sort(key=lambda item: item[1])
+        return [route for route, _ in closed + tripped]
+
+    def _hedge_after(self, route: _Route) -> float:
+        with self._lock:
+            if len(route.latencies) < self.min_samples:
+                return self.default_hedge_s
+            return percentile(sorted(route.latencies), self.hedge_quantile)
+
+    # --- Calls ---
+
+    def _call_route(self, route: _Route, messages, tools, callbacks, available_functions, kwargs):
+        llm = with_stop(route.llm, self.stop)
+        start = time.monotonic()
+        try:
+            response = llm.call(messages, tools=tools, callbacks=callbacks,
+                                      available_functions=available_functions, **kwargs)
+        except Exception:
+            self._record(route, None)
+            raise
+        self._record(route, time.monotonic() - start)
+        return response
+
+    def _record(self, route: _Route, latency_s):
+        with self._lock:
+            route.counters["calls"] += 1
+            if latency_s is None:
+                route.failures.append(True)
+                route.counters["errors"] += 1
+                route.consecutive_failures += 1
+                if (route.consecutive_failures >= self.failure_threshold
+                        or (len(route.failures) >= self.min_samples and route.error_rate() > self.max_error_rate)):
+                    route.open_until = time.monotonic() + self.cooldown_s
+            else:
+                if route.open_until:  # a successful trial call closes the circuit
+                    route.failures.clear()
+                    route.open_until = 0.0
+                route.failures.append(False)
+                route.latencies.append(latency_s)
+                route.consecutive_failures = 0
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counters[key] += 1
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        self._count("calls")
+        ranked = self.ranked()
+        args = (messages, tools, callbacks, available_functions, kwargs)
+        if self.hedge and len(ranked) > 1 and not ranked[0].streams():
+            return self._hedged(ranked, args)
+        errors = []
+        for route in ranked:
+            if errors:
+                self._count("failovers")
+            try:
+                return self._call_route(route, *args)
+            except Exception as e:
+                errors.append(f"{route.name}: {e}")
+        raise AllRoutesFailed("every LLM route failed: " + "; ".join(errors))
+
+    def _submit(self, route: _Route, args):
+        # Each call runs in a copy of the caller's context (usage attribution included).
+        future = self._pool.submit(contextvars.copy_context().run, self._call_route, route, *args)
+        future.route = route
+        return future
+
+    def _hedged(self, ranked: list, args):
+        waiting, errors = set(), []
+        remaining = list(ranked)
+        primary = remaining.pop(0)
+        waiting.add(self._submit(primary, args))
+        done, _ = wait(waiting, timeout=self._hedge_after(primary))
+        if not done:
+            self._count("hedged")
+        while True:
+            for future in done:
+                waiting.discard(future)
+                if future.exception() is None:
+                    for other in waiting:
+                        other.cancel()
+                    if future.route is not primary:
+                        with self._lock:
+                            future.route.counters["hedge_wins"] += 1
+                    return future.result()
+                errors.append(f"{future.route.name}: {future.exception()}")
+            # The primary is slow or a call failed: bring in the next route.
+            if remaining and (not done or not waiting):
+                if done:
+                    self._count("failovers")
+                waiting.add(self._submit(remaining.pop(0), args))
+            if not waiting:
+                raise AllRoutesFailed("every LLM route failed: " + "; ".join(errors))
+            done, _ = wait(waiting, return_when=FIRST_COMPLETED)
+
+    # --- Introspection ---
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {}
+            now = time.monotonic()
+            for route in self.routes:
+                latencies = sorted(route.latencies)
+                routes[route.name] = dict(
+                    route.counters,
+                    model=route.llm.model,
+                    p50_s=round(percentile(latencies, 0.5), 4),
+                    p95_s=round(percentile(latencies, 0.95), 4),
+                    error_rate=round(route.error_rate(), 3),
+                    circuit_open=route.open_until > now,
+                )
+            return dict(self.counters, routes=routes)
+
+    def supports_function_calling(self) -> bool:
+        return all(r.llm.supports_function_calling() for r in self.routes)
+
+    def supports_stop_words(self) -> bool:
+        return all(r.llm.supports_stop_words() for r in self.routes)
+
+    def get_context_window_size(self) -> int:
+        return min(r.llm.get_context_window_size() for r in self.routes)
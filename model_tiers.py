@@ -0,0 +1,190 @@
+import contextvars
+import json
+import re
+import threading
+
+from crewai import BaseLLM
+from crewai.utilities.events import crewai_event_bus, TaskStartedEvent
+from crewai.utilities.llm_utils import create_llm
+
+from llm_base import DelegatingLLM, with_stop
+
+# --- Model tiers with escalation on output-contract failure ---
+# A TieredLLM holds an agent's models from cheapest to strongest. Every task
+# starts on the first tier; when its output fails the task's Contract (its
+# `guard` method is the task's crewai guardrail), crewai retries the task, and the retry runs
+# one tier up. The tier is picked from the running task's retry count, which
+# the TaskStarted event announces for the calling context, so crew copies and
+# concurrent kickoffs each escalate on their own.
+#
+# Contracts check the raw output against a JSON schema, a pydantic model, a
+# regex and/or a validator callable, and count, per task, on which tier the
+# output first passed, so tiers can be tuned from the escalation rates.
+
+_running_task = contextvars.ContextVar("tier_task", default=None)
+_handlers_registered = False
+_handlers_lock = threading.Lock()
+_JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def _register_handlers():
+    global _handlers_registered
+    with _handlers_lock:
+        if _handlers_registered:
+            return
+        _handlers_registered = True
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def _on_task_started(source, event):
+        _running_task.set(event.task)
+
+
+def current_task():
+    """The task running in the calling context, or None."""
+    return _running_task.get()
+
+
+def current_attempt() -> int:
+    """0 on a task's first run, n on its n-th guardrail retry (0 outside a task)."""
+    task = _running_task.get()
+    return getattr(task, "retry_count", 0) if task is not None else 0
+
+
+class TieredLLM(DelegatingLLM):
+    """
+    Calls tier min(attempt, last) of `tiers`, a dict of name -> LLM ordered from
+    cheapest to strongest, e.g. {"8b": groq_8b, "70b": groq_70b}.
+    """
+
+    def __init__(self, tiers: dict):
+        if not tiers:
+            raise ValueError("TieredLLM needs at least one tier")
+        self.tier_names = list(tiers)
+        super().__init__(tiers[self.tier_names[0]])
+        self.tiers = [self.inner] + [llm if isinstance(llm, BaseLLM) else create_llm(llm) for llm in list(tiers.values())[1:]]
+        self.model = "tiers:" + "|".join(llm.model for llm in self.tiers)
+        self.counters = {name: 0 for name in self.tier_names}
+        self._lock = threading.Lock()
+        _register_handlers()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        level = min(current_attempt(), len(self.tiers) - 1)
+        llm = with_stop(self.tiers[level], self.stop)
+        with self._lock:
+            self.counters[self.tier_names[level]] += 1
+        return llm.call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs)
+
+    def get_context_window_size(self) -> int:
+        return min(llm.get_context_window_size() for llm in self.tiers)
+
+
+class TierStats:
+    """Per contract: how many runs passed on each attempt, and how many never passed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contracts = {}
+
+    def record(self, name: str, attempt: int, passed: bool):
+        with self._lock:
+            entry = self._contracts.setdefault(name, {"checks": 0, "failed_checks": 0, "passed_on_attempt": {}})
+            entry["checks"] += 1
+            if passed:
+                entry["passed_on_attempt"][attempt] = entry["passed_on_attempt"].get(attempt, 0) + 1
+            else:
+                entry["failed_checks"] += 1
+
+    def rows(self) -> list:
+        with self._lock:
+            items = [(name, dict(entry, passed_on_attempt=dict(entry["passed_on_attempt"])))
+                     for name, entry in self._contracts.items()]
+        rows = []
+        for name, entry in items:
+            passed = sum(entry["passed_on_attempt"].values())
+            escalated = sum(n for attempt, n in entry["passed_on_attempt"].items() if attempt > 0)
+            rows.append({
+                "contract": name,
+                "checks": entry["checks"],
+                "passed_first_try": entry["passed_on_attempt"].get(0, 0),
+                "passed_after_escalation": escalated,
+                "escalation_rate": round(escalated / passed, 3) if passed else 0.0,
+                "failed_checks": entry["failed_checks"],
+            })
+        return sorted(rows, key=lambda r: r["escalation_rate"], reverse=True)
+
+
+_default_stats = None
+_default_lock = threading.Lock()
+
+
+def default_stats() -> TierStats:
+    """The escalation statistics shared by every contract in this process."""
+    global _default_stats
+    with _default_lock:
+        if _default_stats is None:
+            _default_stats = TierStats()
+        return _default_stats
+
+
+class Contract:
+    """
+    A task's output contract. `Task(guardrail=contract.guard)` returns
+    (True, raw output) when every configured check passes, else (False, reason),
+    which makes crewai retry the task (on the next tier) with the reason as feedback.
+    """
+
+    def __init__(self, name: str, schema: dict = None, model=None, pattern: str = None,
+                 validator=None, stats: TierStats = None):
+        self.name = name
+        self.model = model
+        self.pattern = re.compile(pattern) if pattern else None
+        self.validator = validator
+        self.stats = stats or default_stats()
+        self._schema_validator = None
+        if schema is not None:
+            from jsonschema.validators import validator_for
+            self._schema_validator = validator_for(schema)(schema)
+        _register_handlers()
+
+    def check(self, raw: str):
+        """Returns None when `raw` meets the contract, else the reason it doesn't."""
+        if self.pattern is not None and not self.pattern.search(raw):
+            return f"the answer must match {self.pattern.pattern!r}"
+        if self._schema_validator is not None or self.model is not None:
+            match = _JSON_OBJECT.search(raw)
+            try:
+                value = json.loads(match.group(0) if match else raw)
+            except ValueError as e:
+                return f"the answer must be a JSON object ({e})"
+            if self._schema_validator is not None:
+                error = next(iter(self._schema_validator.iter_errors(value)), None)
+                if error is not None:
+                    where = "/".join(str(p) for p in error.absolute_path) or "the object"
+                    return f"schema violation at {where}: {error.message}"
+            if self.model is not None:
+                try:
+                    self.model.model_validate(value)
+                except Exception as e:
+                    return f"the answer doesn't match {self.model.__name__}: {e}"
+        if self.validator is not None:
+            ok, reason = self.validator(raw)
+            if not ok:
+                return reason
+        return None
+
+    def guard(self, output):
+        raw = getattr(output, "raw", output) or ""
+        reason = self.check(raw)
+        self.stats.record(self.name, current_attempt(), reason is None)
+        return (True, raw) if reason is None else (False, reason)
+
+
+def render_panel(stats: TierStats = None):
+    """Streamlit panel with the escalation rate of every task contract."""
+    import streamlit as st
+    rows = (stats or default_stats()).rows()
+    with st.expander("Model tier escalations"):
+        if not rows:
+            st.caption("No task output has been checked against a contract yet.")
+            return
+        st.dataframe(rows, use_container_width=True)
@@ -1,21 +1,22 @@
-import os
+import uuid
+
 import streamlit as st
-from dotenv import load_dotenv
-from crewai import Agent, Task, Crew, Process
-from crewai.tools import BaseTool
-# Import the specific library for Groq
-from langchain_groq import ChatGroq
+import bootstrap
+from crew_registry import registry
+from ledger import default_ledger
 
 # --- 1. Application Configuration & Setup ---
+bootstrap.begin_page("gig_bot")
 
-# Load environment variables from your .env file
-load_dotenv()
+# crewai and the LLM clients are imported the first time a gig runs
+crews = bootstrap.lazy("crews")
 
 # Configure the Streamlit page
 st.set_page_config(page_title="Gig Work Bot with AI Crew", layout="wide")
 
-# Explicitly load your credentials from the .env file
-groq_api_key = os.getenv("GROQ_API_KEY")
+# Credentials come from the .env file, read once per process
+config = bootstrap.config()
+groq_api_key = config.groq_api_key
 
 # Stop the app if credentials are not found, with a helpful message
 if not groq_api_key:
@@ -23,123 +24,11 @@ if not groq_api_key:
     st.stop()
 
 
-# --- 2. Placeholder Tools for the Gig Workflow ---
-
-class TaskPostingTool(BaseTool):
-    name: str = "Task Posting Tool"
-    description: str = "Posts a new gig task to the platform."
-    def _run(self, argument: str) -> str:
-        print(f"--- Posting Task: {argument} ---")
-        return f"Task '{argument}' has been successfully posted."
-
-class TaskExecutionTool(BaseTool):
-    name: str = "Task Execution Tool"
-    description: str = "Simulates the work being done for a given task."
-    def _run(self, argument: str) -> str:
-        print(f"--- Executing Task: {argument} ---")
-        return f"Completed work for '{argument}': A detailed summary of recent AI advancements."
-
-class VerificationTool(BaseTool):
-    name: str = "Work Verification Tool"
-    description: str = "Verifies if the completed work meets the task requirements."
-    def _run(self, argument: str) -> str:
-        print(f"--- Verifying Work: {argument} ---")
-        return "Verification Status: Approved"
-
-class PaymentTool(BaseTool):
-    name: str = "Payment Processing Tool"
-    description: str = "Processes payment to a contributor for a completed and verified task."
-    def _run(self, argument: str) -> str:
-        print(f"--- Processing Payment for: {argument} ---")
-        return f"Payment of $15 processed successfully for task '{argument}'."
-
-
-# --- 3. Crew Setup Function ---
-
-def setup_crew(gig_description: str):
-    """
-    Sets up the Gig Work Bot crew using the robust ChatGroq class.
-    """
-    
-    # Define the LLM using the ChatGroq class.
-    # We use a fast and capable model available on Groq.
-    llm = ChatGroq(
-        temperature=0.3,
-        groq_api_key=groq_api_key,
-        model_name="groq/llama3-8b-819" # A popular and fast model
-    )
-
-    # Instantiate the tools
-    task_tool = TaskPostingTool()
-    execution_tool = TaskExecutionTool()
-    verification_tool = VerificationTool()
-    payment_tool = PaymentTool()
-
-    # Define the agents for the new crew
-    project_manager = Agent(
-        role='Project Manager',
-        goal=f'Define the gig task "{gig_description}", find a contributor, and manage the workflow.',
-        backstory='An experienced project manager skilled in breaking down tasks and delegating effectively.',
-        verbose=True,
-        tools=[task_tool],
-        llm=llm
-    )
-    gig_worker = Agent(
-        role='Gig Worker',
-        goal='Execute the assigned task to the highest standard and submit it for verification.',
-        backstory='A skilled freelancer specializing in digital tasks, known for reliability and attention to detail.',
-        verbose=True,
-        tools=[execution_tool],
-        llm=llm
-    )
-    qa_specialist = Agent(
-        role='Quality Assurance Specialist',
-        goal='Rigorously check the submitted work against the original requirements and approve or reject it.',
-        backstory='A meticulous QA professional with an uncompromising eye for detail and quality.',
-        verbose=True,
-        tools=[verification_tool],
-        llm=llm
-    )
-    payment_processor = Agent(
-        role='Payment Processor',
-        goal='Process payments to contributors for successfully verified tasks.',
-        backstory='An automated financial system that ensures prompt and accurate payments upon task approval.',
-        verbose=True,
-        tools=[payment_tool],
-        llm=llm
-    )
-
-    # Define the tasks for the new crew
-    task_definition = Task(
-        description=f'Define and post the gig task: "{gig_description}".',
-        expected_output='A confirmation that the task has been posted.',
-        agent=project_manager
-    )
-    task_execution = Task(
-        description='Execute the gig task that was just posted.',
-        expected_output='The completed work, ready for verification.',
-        agent=gig_worker
-    )
-    task_verification = Task(
-        description='Verify the completed work against the task requirements. Use the verification tool.',
-        expected_output="A verification status report, either 'Approved' or 'Rejected'.",
-        agent=qa_specialist
-    )
-    task_payment = Task(
-        description='If the work was approved, use the payment tool to process payment to the contributor.',
-        expected_output='A payment confirmation receipt or a message stating no payment was made.',
-        agent=payment_processor
-    )
-    
-    # Assemble and return the crew
-    return Crew(
-        agents=[project_manager, gig_worker, qa_specialist, payment_processor],
-        tasks=[task_definition, task_execution, task_verification, task_payment],
-        process=Process.sequential,
-        verbose=True
-    )
-
-# --- 4. Streamlit User Interface ---
+# --- 2. Crew Setup ---
+# The tools, agents and LLM client are defined in `tools.py` / `crews.py` and
+# cached per process by `crew_registry`, so a rerun only binds the gig description.
+
+# --- 3. Streamlit User Interface ---
 
 st.title("🤖 Gig Work Bot")
 st.markdown("""
@@ -158,14 +47,12 @@ if st.button("Start Gig Workflow", type="primary"):
         st.warning("Please enter a gig description.")
         st.stop()
         
-    # Create the crew object with the user's input
-    gig_crew = setup_crew( gig_description)
-
     # Run the crew in a spinner to show activity
     with st.spinner("The AI crew is managing the gig..."):
         try:
-            # Kick off the crew
-            result = gig_crew.kickoff()
+            # Kick off a copy of the cached crew with the user's input
+            # With a Gemini key too, calls are routed to whichever provider is fastest and healthy
+            result = crews.kickoff_gig(gig_description, groq_api_key, config.gemini_api_key)
             # Store the result in the session state
             st.session_state.result = result
         except Exception as e:
@@ -178,3 +65,50 @@ if 'result' in st.session_state and st.session_state.result:
     st.markdown("### Final Workflow Outcome:")
     with st.container(border=True):
         st.markdown(st.session_state.result)
+
+# Show how often the cached crew objects were reused
+with st.sidebar:
+    stats = registry.stats()
+    st.caption(f"Crew registry: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%} reuse)")
+    # The response cache is only loaded once a crew has run in this process
+    llm_cache = bootstrap.loaded("llm_cache")
+    if llm_cache is not None:
+        cache_stats = llm_cache.default_cache().stats()
+        st.caption(f"LLM cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} stored")
+    llm_metrics = bootstrap.loaded("llm_metrics")
+    if llm_metrics is not None:
+        llm_metrics.render_panel()
+    model_tiers = bootstrap.loaded("model_tiers")
+    if model_tiers is not None:
+        model_tiers.render_panel()
+    dag_process = bootstrap.loaded("dag_process")
+    if dag_process is not None:
+        dag_process.render_panel()
+    typed_outputs = bootstrap.loaded("typed_outputs")
+    if typed_outputs is not None:
+        typed_outputs.render_panel()
+    context_budget = bootstrap.loaded("context_budget")
+    if context_budget is not None:
+        context_budget.render_panel()
+
+    # Payouts are posted per gig and paid out together
+    def settle_payouts(render_id):
+        # Both clicks of a double click come from the same rendering of the
+        # button, so they settle once; the ledger guards concurrent sessions.
+        if st.session_state.get("settled_render") == render_id:
+            return
+        st.session_state.settled_render = render_id
+        st.session_state.settled_batch = default_ledger().settle()
+
+    owed = default_ledger().balances("payable:")
+    st.caption(f"Unsettled payouts: ${sum(owed.values()) / 100:.2f} to {len(owed)} contributors")
+    st.button("Settle pending payouts", disabled=not any(owed.values()),
+              on_click=settle_payouts, args=(uuid.uuid4().hex,))
+    if "settled_batch" in st.session_state:
+        batch_id = st.session_state.pop("settled_batch")
+        if batch_id:
+            st.success(f"Settled in batch {batch_id}.")
+        else:
+            st.info("Nothing left to settle.")
+
+bootstrap.end_page()
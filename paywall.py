@@ -1,36 +1,19 @@
 import streamlit as st
-import os
-import time
-from dotenv import load_dotenv
-from litellm import completion
-# --- 1. Load Environment Variables & LLM ---
-load_dotenv()
-
-# We need to import the necessary classes from crewai and langchain
-from langchain_google_genai import ChatGoogleGenerativeAI
-from crewai import Agent, Task, Crew, Process
-# We'll import a tool for our writer agent to use
-from crewai_tools import FileReadTool
-
-# Explicitly load your Google credentials
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-
-# Initialize LLM - we'll only proceed if the key is available
-llm = None
-if gemini_api_key:
-    llm=ChatGoogleGenerativeAI(model="gemini-2.0-flash-lite-001",
-                           verbose=True,
-                           temperature=0.5,
-                           google_api_key=os.getenv("GOOGLE_API_KEY"))
-    llm2 = completion(
-        model="gemini-2.0-flash-lite-001",
-                           verbose=True,
-                           temperature=0.5,
-                           google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
-    print("INFO: LLM connection configured successfully.")
-else:
-    print("ERROR: GEMINI_API_KEY not found. LLM not loaded.")
+import bootstrap
+import job_queue
+# --- 1. Configuration & deferred imports ---
+bootstrap.begin_page("paywall")
+
+from crew_registry import registry
+from quota import default_quota
+
+# Keys come from the .env file, read once per process
+config = bootstrap.config()
+
+# The x402 client stack and the submission store (which imports crewai) are
+# imported on first use, i.e. when an article is actually paid for or queued
+x402 = bootstrap.lazy("x402")
+submissions = bootstrap.lazy("submission_store")
 
 # --- 2. Page Configuration & Styling ---
 st.set_page_config(
@@ -91,53 +74,83 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# --- 3. x402 Payment Simulation ---
-# This function simulates the backend API protected by x402.
-def simulate_x402_backend(headers=None):
-    if headers and 'X-PAYMENT' in headers:
-        print("BACKEND: Payment header received. Granting access.")
-        return {'status_code': 200, 'message': 'Payment Verified'}
-    else:
-        print("BACKEND: No payment header. Demanding payment with 402.")
-        return {'status_code': 402, 'message': 'Payment Required'}
+# --- 3. x402 Payment ---
+# A local facilitator stand-in protects the "article" resource with HTTP 402.
+# The server, demo wallet and async client (with its connection pool) are built
+# once per process; every purchase runs on the shared event loop, so the page
+# only waits for the real request/verification round trips.
+def build_payment_stack(config):
+    server = x402.FacilitatorServer().start()
+    url = server.add_resource(x402.PaidResource("/article", config["price_usd"], "One generated article", {"status": "unlocked"}))
+    wallet = x402.LocalWallet()
+    server.register_wallet(wallet)
+    client = x402.make_client(wallet, max_amount_usd=config["price_usd"])
+    return {"server": server, "url": url, "client": client}
 
-# This function simulates the client-side logic to handle a 402 response.
 def process_x402_payment():
-    with st.spinner("Requesting access..."):
-        time.sleep(1)
-        initial_response = simulate_x402_backend()
-
-    if initial_response['status_code'] == 402:
-        with st.spinner("Payment Required. Simulating transaction..."):
-            print("CLIENT: Received 402. Simulating payment signing.")
-            time.sleep(2) # Simulate user signing/confirming
-            
-            # Retry request with a dummy payment header
-            dummy_header = {'X-PAYMENT': 'dummy_signed_payload'}
-            final_response = simulate_x402_backend(headers=dummy_header)
-
-            if final_response['status_code'] == 200:
-                print("CLIENT: Payment successful.")
-                return True
-            else:
-                st.error("Payment failed after retry.")
-                return False
+    stack = registry.get("x402:paywall", {"price_usd": 0.50}, build_payment_stack)
+    with st.spinner("Payment required. Signing and verifying your payment..."):
+        try:
+            result = x402.submit_payment(stack["client"], stack["url"]).result(timeout=30)
+        except Exception as e:
+            st.error(f"Payment failed: {e}")
+            return False
+
+    if result.status_code == 200:
+        print(f"CLIENT: Payment settled in {result.elapsed_s * 1000:.0f} ms (tx {result.receipt['transaction']}).")
+        return True
+    st.error(f"Payment failed after retry: {result.body.get('error', result.status_code)}")
     return False
 
-# --- 4. UI Layout ---
-if 'article' not in st.session_state:
-    st.session_state.article = None
+# --- 4. Free quota ---
+# Each user gets 3 free articles in any 7-day window, tracked across server
+# processes by quota.py. The quota is keyed on an identity the client cannot
+# mint at will: the logged-in user when Streamlit authentication (`[auth]` in
+# secrets.toml) is set up, else the client address the server sees. URL
+# parameters and browser sessions cost nothing to create, so they are not used.
+def auth_configured():
+    try:
+        return "auth" in st.secrets
+    except Exception:
+        return False
+
+def current_user_id():
+    if getattr(st.user, "is_logged_in", False):
+        # Providers that return neither claim fall back to the client address
+        claim = st.user.get("sub") or st.user.get("email")
+        if claim:
+            return f"user:{claim}"
+    ip_address = st.context.ip_address
+    return f"ip:{ip_address}" if ip_address else "anonymous"
+
+def generate_article(uploaded_file, refund=None):
+    # The crew runs on a background worker (job_queue.py). The brief goes to the
+    # content-addressed brief store, which every worker process can read, and
+    # is deleted once the job is over; the job only carries its ID. If the job
+    # fails for good, the worker gives back the free article in `refund`.
+    submission_id = submissions.brief_store().put(uploaded_file.getbuffer())
+    return job_queue.submit("article", {"submission_id": submission_id, "name": uploaded_file.name, "refund": refund})
+
+# --- 5. UI Layout ---
+quota = default_quota()
+user_id = current_user_id()
+quota_status = quota.check(user_id)
 
 st.markdown('<div class="main-container">', unsafe_allow_html=True)
 
 with st.container():
     st.markdown('<div class="paywall-box">', unsafe_allow_html=True)
     
-    st.title("You've Reached Your Weekly Limit")
-    st.write("You've generated your 3 free articles for this week. Great job!")
-    st.info("To continue creating, simply upload a topic or journal entry below.")
-    
-    st.header("Create Your Next Article")
+    if quota_status.allowed:
+        st.title("Create Your Next Article")
+        st.write(f"You have {quota_status.remaining} of {quota_status.limit} free articles left this week.")
+    else:
+        st.title("You've Reached Your Weekly Limit")
+        st.write(f"You've generated your {quota_status.limit} free articles for this week. Great job!")
+        st.info("To continue creating, simply upload a topic or journal entry below.")
+        st.header("Create Your Next Article")
+    if auth_configured() and not st.user.is_logged_in:
+        st.button("Log in to use your own free articles", on_click=st.login)
 
     uploaded_file = st.file_uploader(
         "Upload a topic brief or journal entry (.txt or .md)",
@@ -146,61 +159,44 @@ with st.container():
     )
 
     if uploaded_file is not None:
-        if st.button("💳 Generate Article for $0.50", key="generate_paid_article"):
-            if not llm:
+        label = "✨ Generate Free Article" if quota_status.allowed else "💳 Generate Article for $0.50"
+        if st.button(label, key="generate_article"):
+            if not config.gemini_api_key:
                 st.error("LLM not configured. Please set your GEMINI_API_KEY in the .env file.")
             else:
-                # Step 1: Process the payment
-                payment_successful = process_x402_payment()
+                # Step 1: Use a free article if one is left (checked again atomically,
+                # another tab or server may have used it), otherwise pay with x402
+                free_use = quota.consume(user_id)
+                payment_successful = free_use.allowed or process_x402_payment()
 
-                # Step 2: If payment is successful, run the agent
+                # Step 2: If the article is covered, queue it; the job ID goes into
+                # the URL, so the article survives a page reload
                 if payment_successful:
-                    with st.spinner("Payment verified. Generating your article..."):
-                        
-                        # Save the uploaded file to a temporary path for the agent to use
-                        temp_file_path = os.path.join(".", uploaded_file.name)
-                        with open(temp_file_path, "wb") as f:
-                            f.write(uploaded_file.getbuffer())
-
-                        # Define the Article Writer Agent and its Task
-                        file_read_tool = FileReadTool()
-                        writer_agent = Agent(
-                            role="Expert Content Writer",
-                            goal="Read the content from the provided file path and expand it into a high-quality, engaging article.",
-                            backstory="You are a renowned content writer, known for your ability to turn simple ideas into compelling stories.",
-                            llm=llm2,
-                            tools=[file_read_tool],
-                            verbose=True
-                        )
-                        writing_task = Task(
-                            description=f"Read the content from the file at '{temp_file_path}'. Use this content as the brief to write a full, engaging article. The article should be well-structured, informative, and at least 300 words long.",
-                            expected_output="A complete article in markdown format.",
-                            agent=writer_agent
-                        )
-                        
-                        # Create and run the crew
-                        writing_crew = Crew(
-                            agents=[writer_agent],
-                            tasks=[writing_task],
-                            verbose=True
-                        )
-                        
-                        article_result = writing_crew.kickoff()
-                        st.session_state.article = article_result
-                        
-                        # Clean up the temp file
-                        os.remove(temp_file_path)
-
-                        st.success("Your new article has been generated!")
-                        st.balloons()
+                    refund = {"user_id": user_id, "stamp": free_use.stamp} if free_use.allowed else None
+                    try:
+                        st.query_params["job"] = generate_article(uploaded_file, refund)
+                    except Exception:
+                        if refund:
+                            quota.refund(user_id, free_use.stamp)
+                        raise
             
     st.markdown('</div>', unsafe_allow_html=True)
 
 st.markdown('</div>', unsafe_allow_html=True)
 
-# Display the final generated article if it exists
-if st.session_state.article:
-    st.markdown("---")
-    st.header("Your Generated Article")
-    st.markdown(st.session_state.article)
-
+# Display the article once its job is done; until then only the status widget reruns
+job_id = st.query_params.get("job")
+if job_id:
+    job = job_queue.watch(job_id, "Generating your article...")
+    if job is not None and job["status"] == "done":
+        if st.session_state.get("announced_job") != job_id:
+            st.session_state.announced_job = job_id
+            st.success("Your new article has been generated!")
+            st.balloons()
+        st.markdown("---")
+        st.header("Your Generated Article")
+        st.markdown(job["result"])
+    elif job is not None:
+        st.error(f"The article could not be generated: {job['error']}")
+
+bootstrap.end_page()
@@ -0,0 +1,222 @@
+import atexit
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+
+# --- Free-article quota ---
+# Sliding-window quota per user or API key: at most `limit` uses in any
+# `window_s` seconds. A user's slot holds the timestamps of their most recent
+# uses, so checking or recording one reads a fixed handful of integers: O(1),
+# and exact (no bucket approximation).
+#
+# Slots live in an open-addressing hash table in a memory-mapped file that all
+# server processes share. flock serialises processes, and a thread lock
+# serialises threads within a process. Writes go to the shared page cache
+# immediately, so other processes see them at once. They are msync'ed to disk
+# in batches (at most every `sync_interval_s`), not once per request.
+
+QUOTA_PATH = os.getenv("QUOTA_PATH", "quota.bin")
+WEEK_S = 7 * 24 * 3600
+
+_MAGIC = b"QUOTA001"
+_HEADER = struct.Struct("<8sII")  # magic, number of slots, timestamps per slot
+_HEADER_SIZE = 64
+_DIGEST_SIZE = 16
+_EMPTY = bytes(_DIGEST_SIZE)
+
+
+class QuotaError(Exception):
+    """Raised when the quota store can't be used (foreign file, full table)."""
+
+
+@dataclass
+class QuotaStatus:
+    allowed: bool
+    used: int
+    limit: int
+    resets_at: float = 0.0  # when the oldest counted use leaves the window
+    stamp: int = 0          # the use recorded by consume(), for refund()
+
+    @property
+    def remaining(self) -> int:
+        return max(self.limit - self.used, 0)
+
+
+def _digest(user_id: str) -> bytes:
+    return hashlib.blake2b(user_id.encode(), digest_size=_DIGEST_SIZE).digest()
+
+
+class QuotaTracker:
+    def __init__(self, path: str = QUOTA_PATH, limit: int = 3, window_s: int = WEEK_S,
+                 slots: int = 65_536, capacity: int = 8, sync_interval_s: float = 1.0):
+        if not 0 < limit <= capacity:
+            raise ValueError("limit must be between 1 and capacity")
+        self.limit = limit
+        self.window_s = window_s
+        self.sync_interval_s = sync_interval_s
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.pwrite(self._fd, _HEADER.pack(_MAGIC, slots, capacity).ljust(_HEADER_SIZE, b"\0"), 0)
+                os.ftruncate(self._fd, _HEADER_SIZE + slots * (_DIGEST_SIZE + 4 * capacity))
+            magic, slots, capacity = _HEADER.unpack(os.pread(self._fd, _HEADER.size, 0))
+            if magic != _MAGIC:
+                raise QuotaError(f"{path} is not a quota store")
+            if limit > capacity:
+                raise QuotaError(f"{path} keeps {capacity} uses per user; limit {limit} doesn't fit")
+            self._mm = mmap.mmap(self._fd, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self.slots = slots
+        self.capacity = capacity
+        self._stamps = struct.Struct(f"<{capacity}I")
+        self._slot_size = _DIGEST_SIZE + self._stamps.size
+        self._dirty = 0
+        self._last_sync = time.monotonic()
+        self.counters = {"checks": 0, "consumed": 0, "denied": 0, "refunded": 0, "syncs": 0}
+
+    # --- 1. Table access (callers hold the thread lock and the file lock) ---
+
+    def _find(self, digest: bytes, cutoff: int, insert: bool):
+        """
+        Returns the offset of the slot for `digest`, or None. With insert=True a
+        missing key claims the first empty slot, or a slot whose uses have all
+        left the window, along its probe chain.
+        """
+        mm, size = self._mm, self._slot_size
+        start = int.from_bytes(digest[:8], "little") % self.slots
+        reusable = None
+        for i in range(self.slots):
+            offset = _HEADER_SIZE + (start + i) % self.slots * size
+            key = mm[offset:offset + _DIGEST_SIZE]
+            if key == digest:
+                return offset
+            if key == _EMPTY:
+                reusable = offset if reusable is None else reusable
+                break
+            if insert and reusable is None and max(self._stamps.unpack_from(mm, offset + _DIGEST_SIZE)) <= cutoff:
+                reusable = offset
+        if not insert:
+            return None
+        if reusable is None:
+            raise QuotaError("quota table is full")
+        mm[reusable:reusable + size] = digest + bytes(self._stamps.size)
+        return reusable
+
+    def _status(self, stamps, cutoff: int) -> QuotaStatus:
+        live = [s for s in stamps if s > cutoff]
+        return QuotaStatus(False, len(live), self.limit, min(live) + self.window_s if live else 0.0)
+
+    def _wrote(self):
+        self._dirty += 1
+        if time.monotonic() - self._last_sync >= self.sync_interval_s:
+            self._sync()
+
+    def _sync(self):
+        if self._dirty:
+            self._mm.flush()
+            self._dirty = 0
+            self.counters["syncs"] += 1
+        self._last_sync = time.monotonic()
+
+    # --- 2. Public API ---
+
+    def check(self, user_id: str, now: float = None) -> QuotaStatus:
+        """Reports whether `user_id` has a free use left, without using it."""
+        now = int(time.time() if now is None else now)
+        cutoff = now - self.window_s
+        digest = _digest(user_id)
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+            try:
+                offset = self._find(digest, cutoff, insert=False)
+                stamps = self._stamps.unpack_from(self._mm, offset + _DIGEST_SIZE) if offset is not None else ()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self.counters["checks"] += 1
+        status = self._status(stamps, cutoff)
+        status.allowed = status.used < self.limit
+        return status
+
+    def consume(self, user_id: str, now: float = None) -> QuotaStatus:
+        """
+        Atomically checks and records one free use. If none is left the status
+        has allowed=False and nothing is recorded.
+        """
+        now = int(time.time() if now is None else now)
+        cutoff = now - self.window_s
+        digest = _digest(user_id)
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                offset = self._find(digest, cutoff, insert=True)
+                stamps = list(self._stamps.unpack_from(self._mm, offset + _DIGEST_SIZE))
+                allowed = sum(s > cutoff for s in stamps) < self.limit
+                if allowed:
+                    # Overwrite the oldest (or an unused) timestamp.
+                    stamps[stamps.index(min(stamps))] = now
+                    self._stamps.pack_into(self._mm, offset + _DIGEST_SIZE, *stamps)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self.counters["consumed" if allowed else "denied"] += 1
+            if allowed:
+                self._wrote()
+        status = self._status(stamps, cutoff)
+        status.allowed = allowed
+        status.stamp = now if allowed else 0
+        return status
+
+    def refund(self, user_id: str, stamp: int) -> bool:
+        """Gives back a use recorded by consume(), e.g. when generation failed."""
+        digest = _digest(user_id)
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                offset = self._find(digest, 0, insert=False)
+                stamps = list(self._stamps.unpack_from(self._mm, offset + _DIGEST_SIZE)) if offset is not None else []
+                found = stamp in stamps
+                if found:
+                    stamps[stamps.index(stamp)] = 0
+                    self._stamps.pack_into(self._mm, offset + _DIGEST_SIZE, *stamps)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            if found:
+                self.counters["refunded"] += 1
+                self._wrote()
+            return found
+
+    def flush(self):
+        """Writes pending changes to disk now."""
+        with self._lock:
+            self._sync()
+
+    def stats(self) -> dict:
+        return dict(self.counters, slots=self.slots, pending_writes=self._dirty)
+
+    def close(self):
+        with self._lock:
+            if not self._mm.closed:
+                self._sync()
+                self._mm.close()
+                os.close(self._fd)
+
+
+_default_quota = None
+_default_lock = threading.Lock()
+
+
+def default_quota() -> QuotaTracker:
+    """The free-article quota shared by every page in this process."""
+    global _default_quota
+    with _default_lock:
+        if _default_quota is None:
+            _default_quota = QuotaTracker()
+            atexit.register(_default_quota.close)
+        return _default_quota
@@ -0,0 +1,397 @@
+import atexit
+import json
+import os
+import queue
+import select
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+# --- Sandboxed execution of verification scripts ---
+# A pool of pre-started Python worker processes runs untrusted verification
+# code. Every worker is a separate `python -I` interpreter that starts in its
+# own empty temporary directory (removed with the worker), warms the modules
+# scripts use, and then forks a fresh child for every run. The child
+#   * sets RLIMIT_AS (memory) and a CPU-time budget (ITIMER_PROF, with
+#     RLIMIT_CPU as a hard backstop);
+#   * installs an audit hook that refuses sockets, subprocesses, fork/exec,
+#     ctypes, gc introspection, rlimit changes, writing, deleting, renaming,
+#     truncating or chmod-ing files, and reading or listing anything outside
+#     the worker's directory and the standard library;
+#   * exits after the run, so nothing a script changes (module globals,
+#     builtins, the hook's view of the world) reaches the next run.
+# The hook's rules are locals of the worker, not module globals a script
+# could rebind. Audit hooks aren't a security boundary on their own: on Linux
+# the worker also installs a seccomp filter that makes socket() fail for
+# everything but Unix sockets, so no run can reach the network even with the
+# hook defeated. The parent kills a worker (and its child) when a run exceeds
+# its wall-clock timeout, and replaces workers after `max_runs` runs or after
+# any violation.
+
+MAX_OUTPUT_CHARS = 10_000
+_BLOCKED_EVENTS = (
+    "socket.", "subprocess.", "os.system", "os.exec", "os.posix_spawn", "os.spawn",
+    "os.fork", "os.forkpty", "os.kill", "resource.setrlimit", "resource.prlimit", "ctypes.", "gc.",
+    "os.remove", "os.rename", "os.truncate", "os.rmdir", "os.chmod", "os.chown", "os.chflags",
+    "os.mkdir", "os.link", "os.symlink", "os.utime", "shutil.",
+)
+# Events whose first argument is a path the script wants to read or list.
+_READ_EVENTS = ("open", "os.listdir", "os.scandir")
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+# seccomp: architecture tag (AUDIT_ARCH_*) and socket() syscall number per machine
+_SECCOMP_ARCH = {"x86_64": (0xC000003E, 41), "aarch64": (0xC00000B7, 198)}
+
+
+@dataclass
+class SandboxResult:
+    ok: bool
+    result: str = None
+    stdout: str = ""
+    error: str = ""
+    violation: str = ""
+    duration_s: float = 0.0
+
+
+# --- 1. Worker process (runs `python -I sandbox.py --worker <limits>`) ---
+
+def _deny_network() -> bool:
+    """
+    Installs a seccomp filter on this process and its future children: socket()
+    fails with EACCES for every address family but AF_UNIX. Returns False where
+    seccomp is unavailable (not Linux, or an unknown architecture).
+    """
+    import ctypes
+    import platform
+    import socket
+    if not sys.platform.startswith("linux") or platform.machine() not in _SECCOMP_ARCH:
+        return False
+    arch, socket_nr = _SECCOMP_ARCH[platform.machine()]
+    ld, jeq, jge, ret = 0x20, 0x15, 0x35, 0x06
+    allow, deny = 0x7FFF0000, 0x00050000 | 13  # SECCOMP_RET_ALLOW, SECCOMP_RET_ERRNO | EACCES
+    program = [
+        (ld, 0, 0, 4),                        # A = seccomp_data.arch
+        (jeq, 1, 0, arch),
+        (ret, 0, 0, deny),                    # a foreign ABI: refuse every syscall
+        (ld, 0, 0, 0),                        # A = seccomp_data.nr
+        (jge, 4, 0, 0x40000000),              # x32 syscalls -> deny
+        (jeq, 0, 2, socket_nr),
+        (ld, 0, 0, 16),                       # A = low word of args[0], the address family
+        (jeq, 0, 1, socket.AF_UNIX),
+        (ret, 0, 0, allow),
+        (ret, 0, 0, deny),
+    ]
+
+    class SockFilter(ctypes.Structure):
+        _fields_ = [("code", ctypes.c_ushort), ("jt", ctypes.c_ubyte), ("jf", ctypes.c_ubyte), ("k", ctypes.c_uint)]
+
+    class SockFprog(ctypes.Structure):
+        _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.POINTER(SockFilter))]
+
+    filters = (SockFilter * len(program))(*(SockFilter(*insn) for insn in program))
+    fprog = SockFprog(len(program), filters)
+    libc = ctypes.CDLL(None, use_errno=True)
+    pr_set_no_new_privs, pr_set_seccomp, seccomp_mode_filter = 38, 22, 2
+    if libc.prctl(pr_set_no_new_privs, 1, 0, 0, 0) != 0:
+        return False
+    return libc.prctl(pr_set_seccomp, seccomp_mode_filter, ctypes.byref(fprog), 0, 0) == 0
+
+
+def _worker_main(limits: dict):
+    import builtins
+    import gc
+    import io
+    import math
+    import resource
+    import signal
+    import sysconfig
+    import traceback
+    # Warm the modules verification scripts typically use.
+    import collections, datetime, re, statistics  # noqa: F401
+
+    # Keep private copies of stdin/stdout for the protocol; the script gets neither.
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    responses = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    network_denied = _deny_network()
+
+    cpu_s = limits["cpu_s"]
+    memory = limits["memory_mb"] * 1024 * 1024
+    # The parent starts the worker in an empty temporary directory; the script
+    # may read there and in the standard library (for imports), nowhere else.
+    readable_roots = tuple(os.path.join(os.path.realpath(root), "") for root in
+                           {os.getcwd(), sysconfig.get_paths()["stdlib"], sysconfig.get_paths()["platstdlib"]})
+    # Bound here, so a script that rebinds the module globals changes nothing.
+    blocked_events, read_events, write_flags = _BLOCKED_EVENTS, _READ_EVENTS, _WRITE_FLAGS
+    realpath, fsdecode, join = os.path.realpath, os.fsdecode, os.path.join
+
+    def readable(path) -> bool:
+        # File descriptors are refused: the worker's own fds carry the protocol.
+        if isinstance(path, int):
+            return False
+        try:
+            return join(realpath(fsdecode("." if path is None else path)), "").startswith(readable_roots)
+        except (TypeError, ValueError):
+            return False
+
+    def opens_for_writing(args) -> bool:
+        _, mode, flags = args
+        if mode:
+            return any(c in mode for c in "wax+")
+        return bool(flags & write_flags)
+
+    class CPULimitExceeded(BaseException):
+        pass
+
+    def on_cpu_limit(signum, frame):
+        raise CPULimitExceeded()
+
+    def run(job: dict, out) -> dict:
+        # In the forked child: limits and hook first, then the script; the child exits afterwards.
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+        cpu_limit = math.ceil(cpu_s) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit))
+        signal.signal(signal.SIGPROF, on_cpu_limit)
+        blocked = []
+
+        def deny(event, args):
+            if event in read_events and not (event == "open" and opens_for_writing(args)):
+                if readable(args[0]):
+                    return
+                blocked.append(event)
+                raise PermissionError(f"{event} outside the sandbox directory is not allowed")
+            if event == "open" or event.startswith(blocked_events):
+                blocked.append(event)
+                raise PermissionError(f"{event} is not allowed in the sandbox")
+
+        sys.addaudithook(deny)
+        output = io.StringIO()
+        sys.stdout = sys.stderr = output
+        response = {"ok": False}
+        signal.setitimer(signal.ITIMER_PROF, cpu_s)
+        try:
+            namespace = {"__name__": "__sandbox__", "__builtins__": dict(builtins.__dict__)}
+            exec(compile(job["code"], "<verification>", "exec"), namespace)
+            entrypoint = namespace.get(job.get("entrypoint") or "")
+            result = None
+            if callable(entrypoint):
+                result = entrypoint(job["input"]) if job.get("input") is not None else entrypoint()
+            response = {"ok": True, "result": None if result is None else str(result)[:MAX_OUTPUT_CHARS]}
+        except CPULimitExceeded:
+            response["violation"] = f"CPU time limit ({cpu_s}s) exceeded"
+        except MemoryError:
+            response["violation"] = f"memory limit ({limits['memory_mb']} MB) exceeded"
+        except BaseException as e:
+            response["error"] = "".join(traceback.format_exception_only(type(e), e)).strip()[:MAX_OUTPUT_CHARS]
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+        if blocked and not response.get("violation"):
+            # Reported even when the script caught the PermissionError itself.
+            response["ok"] = False
+            response["violation"] = f"blocked operation: {blocked[0]}"
+        response["stdout"] = output.getvalue()[:MAX_OUTPUT_CHARS]
+        out.write(json.dumps(response))
+        out.flush()
+
+    responses.write(json.dumps({"ready": True, "network_denied": network_denied}) + "\n")
+    responses.flush()
+
+    # Children only read the warm heap; frozen objects are never scanned by their gc
+    gc.freeze()
+    for line in requests:
+        job = json.loads(line)
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                os.close(read_fd)
+                requests.close()
+                responses.close()
+                run(job, os.fdopen(write_fd, "w", encoding="utf-8"))
+                status = 0
+            finally:
+                os._exit(status)
+        os.close(write_fd)
+        with os.fdopen(read_fd, encoding="utf-8") as reader:
+            data = reader.read()
+        os.waitpid(pid, 0)
+        try:
+            response = json.loads(data)
+        except ValueError:
+            response = {"ok": False, "violation": "worker terminated (resource limit reached)"}
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+# --- 2. Parent side ---
+
+class _Worker:
+    def __init__(self, limits: dict, start_timeout_s: float = 10.0):
+        self.workdir = tempfile.mkdtemp(prefix="sandbox-")
+        self.proc = subprocess.Popen(
+            [sys.executable, "-I", "-B", os.path.abspath(__file__), "--worker", json.dumps(limits)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, start_new_session=True,
+            cwd=self.workdir,
+        )
+        self.runs = 0
+        if not self._read(start_timeout_s).get("ready"):
+            self.kill()
+            raise RuntimeError("sandbox worker failed to start")
+
+    def _read(self, timeout_s: float) -> dict:
+        readable, _, _ = select.select([self.proc.stdout], [], [], timeout_s)
+        if not readable:
+            raise TimeoutError
+        line = self.proc.stdout.readline()
+        if not line:
+            raise EOFError
+        return json.loads(line)
+
+    def request(self, job: dict, timeout_s: float) -> dict:
+        self.proc.stdin.write(json.dumps(job).encode() + b"\n")
+        self.proc.stdin.flush()
+        return self._read(timeout_s)
+
+    def kill(self):
+        # The worker leads its own session, so this also kills a run's forked child.
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.proc.wait()
+        for pipe in (self.proc.stdin, self.proc.stdout):
+            pipe.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class SandboxPool:
+    """
+    Runs verification code in `size` warm worker processes. Calls block until a
+    worker is free; if none frees up within `timeout_s`, an extra worker is
+    started and retired again once the pool is back to full strength.
+    """
+
+    def __init__(self, size: int = 2, cpu_s: float = 2.0, memory_mb: int = 256,
+                 timeout_s: float = 5.0, max_runs: int = 100):
+        self.size = size
+        self.timeout_s = timeout_s
+        self.limits = {"cpu_s": cpu_s, "memory_mb": memory_mb, "max_runs": max_runs}
+        self.max_runs = max_runs
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._refills = []
+        self.counters = {"runs": 0, "errors": 0, "violations": 0, "spawned": 0, "recycled": 0, "run_s": 0.0}
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self.limits)
+        with self._lock:
+            self.counters["spawned"] += 1
+        return worker
+
+    def _replace(self, worker: _Worker):
+        """Kills `worker` and starts its replacement in the background, so the next caller gets a warm one."""
+        worker.kill()
+        with self._lock:
+            self.counters["recycled"] += 1
+
+        def refill():
+            if self._closed:
+                return
+            replacement = self._spawn()
+            if self._closed:
+                replacement.kill()  # the pool closed while it was starting
+            else:
+                self._idle.put(replacement)
+        thread = threading.Thread(target=refill, name="sandbox-refill", daemon=True)
+        with self._lock:
+            self._refills = [t for t in self._refills if t.is_alive()] + [thread]
+        thread.start()
+
+    def run(self, code: str, input: str = None, entrypoint: str = "verify", timeout_s: float = None) -> SandboxResult:
+        """
+        Executes `code`; if it defines `entrypoint`, calls it with `input` (or no
+        arguments) and returns its value as a string.
+        """
+        timeout_s = timeout_s or self.timeout_s
+        try:
+            worker = self._idle.get(timeout=timeout_s)
+        except queue.Empty:
+            worker = self._spawn()
+        start = time.perf_counter()
+        try:
+            response = worker.request({"code": code, "input": input, "entrypoint": entrypoint}, timeout_s)
+        except TimeoutError:
+            response = {"ok": False, "violation": f"wall-clock timeout ({timeout_s}s) exceeded"}
+        except (EOFError, OSError, ValueError):
+            response = {"ok": False, "violation": "worker terminated (resource limit reached)"}
+        elapsed = time.perf_counter() - start
+        worker.runs += 1
+
+        with self._lock:
+            self.counters["runs"] += 1
+            self.counters["run_s"] += elapsed
+            self.counters["errors"] += bool(response.get("error"))
+            self.counters["violations"] += bool(response.get("violation"))
+        if response.get("violation") or worker.runs >= self.max_runs:
+            self._replace(worker)
+        elif self._closed or self._idle.qsize() >= self.size:
+            worker.kill()
+        else:
+            self._idle.put(worker)
+        return SandboxResult(
+            ok=response.get("ok", False),
+            result=response.get("result"),
+            stdout=response.get("stdout", ""),
+            error=response.get("error", ""),
+            violation=response.get("violation", ""),
+            duration_s=elapsed,
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["avg_run_ms"] = round(stats.pop("run_s") / stats["runs"] * 1000, 2) if stats["runs"] else 0.0
+        stats["idle_workers"] = self._idle.qsize()
+        return stats
+
+    def close(self):
+        self._closed = True
+        # Replacements still starting kill themselves once they see the pool closed.
+        with self._lock:
+            refills = list(self._refills)
+        for thread in refills:
+            thread.join(timeout=10)
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                return
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def default_pool() -> SandboxPool:
+    """The sandbox pool shared by every code interpreter tool in this process."""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = SandboxPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
+
+
+if __name__ == "__main__" and sys.argv[1:2] == ["--worker"]:
+    _worker_main(json.loads(sys.argv[2]))
@@ -0,0 +1,330 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Type
+
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field
+
+# --- Content-addressed store for submitted work ---
+# Each submission is stored once under the SHA-256 of its bytes
+# (<root>/ab/cdef...), so resubmitting identical work costs nothing. Blobs are
+# immutable, which makes everything derived from them safe to cache forever:
+#   * reads go through a memory map: a byte range or a window of lines is
+#     copied out, never the whole file;
+#   * a sparse line index (every LINE_INDEX_STEP-th line start) makes line
+#     windows cheap anywhere in a large file;
+#   * a digest (size, line count, detected format, JSON keys / CSV header, log
+#     level counts, first lines) is computed once and kept next to the blob.
+# Agents get the digest plus the slice they ask for, not the whole submission.
+
+STORE_PATH = os.getenv("SUBMISSION_STORE_PATH", "submissions")
+LINE_INDEX_STEP = 1024
+MAX_SLICE_BYTES = 16 * 1024
+MAX_OPEN_MAPS = 64
+_LOG_LEVELS = re.compile(rb"\b(ERROR|WARN(?:ING)?|FATAL|CRITICAL)\b")
+
+
+class _Blob:
+    """An open, memory-mapped blob with its line index (built on first line read)."""
+
+    def __init__(self, path: str):
+        self.size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._line_index = None
+        self._lock = threading.Lock()
+
+    def line_index(self):
+        """(offsets of every LINE_INDEX_STEP-th line start, total line count)."""
+        with self._lock:
+            if self._line_index is None:
+                offsets, count, pos, data = [0], 0, 0, self.map
+                while pos < self.size:
+                    nl = data.find(b"\n", pos)
+                    count += 1
+                    if nl < 0:
+                        break
+                    pos = nl + 1
+                    if count % LINE_INDEX_STEP == 0 and pos < self.size:
+                        offsets.append(pos)
+                self._line_index = (offsets, count)
+            return self._line_index
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+
+
+class SubmissionStore:
+    def __init__(self, root: str = STORE_PATH):
+        self.root = root
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+        self._blobs = OrderedDict()
+        self._digests = {}
+        self._lock = threading.Lock()
+        self.counters = {"stored": 0, "deduplicated": 0}
+
+    def _path(self, submission_id: str) -> str:
+        if not re.fullmatch(r"[0-9a-f]{64}", submission_id or ""):
+            raise KeyError(f"Unknown submission ID '{submission_id}'.")
+        return os.path.join(self.root, submission_id[:2], submission_id[2:])
+
+    # --- 1. Writing ---
+
+    def put(self, data) -> str:
+        """Stores bytes (or a binary file object, streamed) and returns the submission ID."""
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            submission_id = hashlib.sha256(data).hexdigest()
+            if os.path.exists(self._path(submission_id)):
+                return self._deduplicated(submission_id)
+            chunks = [data]
+        else:
+            submission_id, chunks = None, iter(lambda: data.read(1024 * 1024), b"")
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+            submission_id = submission_id or digest.hexdigest()
+            path = self._path(submission_id)
+            if os.path.exists(path):
+                return self._deduplicated(submission_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(tmp, 0o444)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        with self._lock:
+            self.counters["stored"] += 1
+        return submission_id
+
+    def _deduplicated(self, submission_id: str) -> str:
+        with self._lock:
+            self.counters["deduplicated"] += 1
+        return submission_id
+
+    # --- 2. Reading ---
+
+    def _blob(self, submission_id: str) -> _Blob:
+        with self._lock:
+            blob = self._blobs.get(submission_id)
+            if blob is not None:
+                self._blobs.move_to_end(submission_id)
+                return blob
+        path = self._path(submission_id)
+        if not os.path.exists(path):
+            raise KeyError(f"Unknown submission ID '{submission_id}'.")
+        blob = _Blob(path)
+        with self._lock:
+            blob = self._blobs.setdefault(submission_id, blob)
+            while len(self._blobs) > MAX_OPEN_MAPS:
+                # Another thread may still be reading an evicted map, so it's left to the GC to close.
+                self._blobs.popitem(last=False)
+        return blob
+
+    def size(self, submission_id: str) -> int:
+        return self._blob(submission_id).size
+
+    def read_range(self, submission_id: str, offset: int = 0, length: int = MAX_SLICE_BYTES) -> bytes:
+        blob = self._blob(submission_id)
+        offset = max(0, min(offset, blob.size))
+        return blob.map[offset:min(blob.size, offset + max(length, 0))]
+
+    def line_offset(self, submission_id: str, line: int) -> int:
+        """Byte offset where `line` (0-based) starts; the blob size past the last line."""
+        blob = self._blob(submission_id)
+        offsets, total = blob.line_index()
+        line = max(line, 0)
+        if line >= total:
+            return blob.size
+        pos, at = offsets[line // LINE_INDEX_STEP], line - line % LINE_INDEX_STEP
+        while at < line:
+            pos = blob.map.find(b"\n", pos) + 1
+            at += 1
+        return pos
+
+    def read_lines(self, submission_id: str, start: int = 0, count: int = 50) -> list:
+        """Lines [start, start + count) (0-based), without their newlines."""
+        blob = self._blob(submission_id)
+        start = max(start, 0)
+        if start >= blob.line_index()[1] or count <= 0:
+            return []
+        pos, data = self.line_offset(submission_id, start), blob.map
+        lines = []
+        while len(lines) < count and pos < blob.size:
+            nl = data.find(b"\n", pos)
+            end = blob.size if nl < 0 else nl
+            lines.append(data[pos:end].rstrip(b"\r").decode("utf-8", errors="replace"))
+            pos = end + 1
+        return lines
+
+    def delete(self, submission_id: str) -> bool:
+        """Removes a submission and its digest; False if it wasn't stored."""
+        path = self._path(submission_id)
+        with self._lock:
+            # A reader may still hold the evicted map; the GC closes it
+            self._blobs.pop(submission_id, None)
+            self._digests.pop(submission_id, None)
+        try:
+            os.unlink(os.path.join(self.root, "digests", submission_id + ".json"))
+        except FileNotFoundError:
+            pass
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def line_count(self, submission_id: str) -> int:
+        return self._blob(submission_id).line_index()[1]
+
+    # --- 3. Digest ---
+
+    def digest(self, submission_id: str) -> dict:
+        """A short description of the submission, computed once per content and cached on disk."""
+        self._path(submission_id)  # validates the ID before it is used in a file name
+        with self._lock:
+            cached = self._digests.get(submission_id)
+        if cached is not None:
+            return cached
+        sidecar = os.path.join(self.root, "digests", submission_id + ".json")
+        try:
+            with open(sidecar, encoding="utf-8") as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            summary = self._summarize(submission_id)
+            os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(summary, f)
+            os.replace(tmp, sidecar)
+        with self._lock:
+            self._digests[submission_id] = summary
+        return summary
+
+    def _summarize(self, submission_id: str) -> dict:
+        blob = self._blob(submission_id)
+        head = self.read_lines(submission_id, 0, 5)
+        summary = {"bytes": blob.size, "lines": self.line_count(submission_id), "format": "text", "head": [l[:200] for l in head]}
+        first = blob.map[:1].strip() if blob.size else b""
+        if first in (b"{", b"["):
+            try:
+                # Only whole documents up to a few MB are parsed; bigger ones keep the text digest.
+                value = json.loads(blob.map[:]) if blob.size <= 8 * 1024 * 1024 else None
+            except ValueError:
+                value = None
+            if isinstance(value, dict):
+                summary.update(format="json", top_level_keys=list(value)[:50], key_count=len(value))
+            elif isinstance(value, list):
+                summary.update(format="json", items=len(value))
+            elif summary["lines"] > 1 and all(l.lstrip().startswith("{") for l in head if l.strip()):
+                summary["format"] = "ndjson"
+        elif head and head[0].count(",") >= 1 and all(l.count(",") == head[0].count(",") for l in head[1:] if l):
+            summary.update(format="csv", header=head[0].split(","), rows=max(summary["lines"] - 1, 0))
+        levels = {}
+        for match in _LOG_LEVELS.finditer(blob.map if blob.size else b""):
+            level = match.group(1).decode()
+            levels[level] = levels.get(level, 0) + 1
+        if levels:
+            summary["log_levels"] = levels
+        return summary
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters, open_maps=len(self._blobs), digests_cached=len(self._digests))
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store() -> SubmissionStore:
+    """The submission store shared by every page and tool in this process."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = SubmissionStore()
+        return _default_store
+
+
+_brief_store = None
+
+
+def brief_store() -> SubmissionStore:
+    """Article briefs queued by the paywall; apart from submissions, since they are deleted when their job ends."""
+    global _brief_store
+    with _default_lock:
+        if _brief_store is None:
+            _brief_store = SubmissionStore(os.path.join(STORE_PATH, "briefs"))
+        return _brief_store
+
+
+# --- 4. Agent tool ---
+
+class SubmissionReadToolInput(BaseModel):
+    """Input schema for SubmissionReadTool."""
+    submission_id: str = Field(..., description="The ID of the submitted work to read.")
+    start_line: int = Field(None, description="First line to read (0-based). Use with line_count for a window of lines.")
+    line_count: int = Field(50, description="Number of lines to read from start_line.")
+    offset: int = Field(None, description="Byte offset to read from, instead of a line window.")
+    length: int = Field(4096, description="Number of bytes to read from offset.")
+
+
+class SubmissionReadTool(BaseTool):
+    name: str = "Submission Reader"
+    description: str = (
+        "Reads part of a submitted work file given its submission ID. Returns a digest of the whole file "
+        "(size, line count, format, keys or header) and the requested window of lines or byte range. "
+        "Read large submissions in windows instead of all at once."
+    )
+    args_schema: Type[BaseModel] = SubmissionReadToolInput
+
+    def _run(self, submission_id: str, start_line: int = None, line_count: int = 50,
+             offset: int = None, length: int = 4096) -> str:
+        store = default_store()
+        try:
+            summary = store.digest(submission_id)
+        except KeyError as e:
+            return str(e)
+        if offset is not None:
+            offset = max(offset, 0)
+            data = store.read_range(submission_id, offset, min(length, MAX_SLICE_BYTES))
+            end = offset + len(data)
+            body = data.decode("utf-8", errors="replace")
+            where = f"bytes {offset}-{end} of {summary['bytes']}"
+            more = f"read again with offset={end}" if end < summary["bytes"] else ""
+        else:
+            start = max(start_line or 0, 0)
+            lines = store.read_lines(submission_id, start, line_count)
+            used = 0
+            for i, line in enumerate(lines):
+                size = len(line.encode("utf-8"))
+                if used + size > MAX_SLICE_BYTES:
+                    lines = lines[:i]
+                    break
+                used += size + 1
+            if not lines and start < summary["lines"] and line_count > 0:
+                # The first line alone is over the cap: show its head and
+                # continue in byte-offset mode, else the window never moves
+                offset = store.line_offset(submission_id, start)
+                data = store.read_range(submission_id, offset, MAX_SLICE_BYTES)
+                end = offset + len(data)
+                body = data.decode("utf-8", errors="replace")
+                where = f"line {start} is longer than {MAX_SLICE_BYTES} bytes; bytes {offset}-{end} of {summary['bytes']}"
+                more = f"read the rest of the line with offset={end}, or go on with start_line={start + 1}"
+                return f"Digest: {json.dumps(summary)}\n{where}:\n{body}\n[... {more}]"
+            body = "\n".join(lines)
+            end = start + len(lines)
+            where = f"lines {start}-{end} of {summary['lines']}"
+            more = f"read again with start_line={end}" if end < summary["lines"] else ""
+        return f"Digest: {json.dumps(summary)}\n{where}:\n{body}" + (f"\n[... {more}]" if more else "")
@@ -0,0 +1,46 @@
+import re
+
+# --- Token counting shared by everything that budgets prompt text ---
+# Uses tiktoken's cl100k_base encoding when tiktoken is installed (it comes in
+# with crewai). Otherwise it falls back to an estimate from word and punctuation
+# counts, which lands within ~10% of real BPE counts for English prose and code.
+# Budgets only need to be roughly right, not exact per provider.
+
+_WORDS = re.compile(r"\w+|[^\w\s]")
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # not installed, or the encoding can't be loaded offline
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # Long words split into several tokens; ~4 characters per token.
+    return sum(max(1, (len(m) + 3) // 4) for m in _WORDS.findall(text))
+
+
+def truncate_to_tokens(text: str, budget: int, marker: str = "\n[... truncated]") -> str:
+    """Returns `text` cut to at most `budget` tokens (marker included), on a line or word boundary."""
+    if count_tokens(text) <= budget:
+        return text
+    room = max(budget - count_tokens(marker), 0)
+    if _encoding is not None:
+        cut = _encoding.decode(_encoding.encode(text, disallowed_special=())[:room])
+    else:
+        # One pass: cut before the first word that no longer fits.
+        used, end = 0, len(text)
+        for m in _WORDS.finditer(text):
+            used += max(1, (m.end() - m.start() + 3) // 4)
+            if used > room:
+                end = m.start()
+                break
+        cut = text[:end]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > len(cut) * 0.8:
+        cut = cut[:boundary]
+    return cut.rstrip() + marker
@@ -0,0 +1,49 @@
+from typing import Dict
+
+from crewai.tools import BaseTool
+
+from ledger import default_ledger
+
+# --- Tools for the Gig Workflow ---
+
+class TaskPostingTool(BaseTool):
+    name: str = "Task Posting Tool"
+    description: str = "Posts a new gig task to the platform."
+    def _run(self, argument: str) -> str:
+        print(f"--- Posting Task: {argument} ---")
+        return f"Task '{argument}' has been successfully posted."
+
+class TaskExecutionTool(BaseTool):
+    name: str = "Task Execution Tool"
+    description: str = "Simulates the work being done for a given task."
+    def _run(self, argument: str) -> str:
+        print(f"--- Executing Task: {argument} ---")
+        return f"Completed work for '{argument}': A detailed summary of recent AI advancements."
+
+class VerificationTool(BaseTool):
+    name: str = "Work Verification Tool"
+    description: str = "Verifies if the completed work meets the task requirements."
+    def _run(self, argument: str) -> str:
+        print(f"--- Verifying Work: {argument} ---")
+        return "Verification Status: Approved"
+
+class PaymentTool(BaseTool):
+    name: str = "Payment Processing Tool"
+    description: str = "Processes payment to a contributor for a completed and verified gig, given its gig ID."
+    payout_cents: int = 1500
+    splits: Dict[str, int] = {"contributor": 1}
+    def _run(self, gig_id: str) -> str:
+        print(f"--- Processing Payment for gig: {gig_id} ---")
+        # Posted to the double-entry ledger from the gig's escrow; the money
+        # moves in the next settlement batch.
+        ledger = default_ledger()
+        entry_key = ledger.post_payout(gig_id, self.payout_cents, self.splits)
+        outcome = ledger.commit([entry_key])[entry_key]
+        if outcome == "duplicate":
+            return f"Payment for gig {gig_id} was already processed (ledger entry {entry_key}). No new payment was made."
+        if outcome == "rejected":
+            return f"No payment was made for gig {gig_id}: its escrow does not cover ${self.payout_cents / 100:.2f}."
+        return (
+            f"Payment of ${self.payout_cents / 100:.2f} processed successfully for gig {gig_id} "
+            f"(ledger entry {entry_key}); it will be paid out in the next settlement batch."
+        )
@@ -0,0 +1,324 @@
+import copy
+import json
+import re
+import threading
+from typing import Annotated
+
+from crewai import LLM
+from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+from pydantic import TypeAdapter
+
+from crew_stream import FINAL_ANSWER_MARKER, FinalAnswerFilter
+from llm_base import DelegatingLLM
+from model_tiers import current_task
+
+# --- Schema-typed task outputs ---
+# A task declares its output type the crewai way, `Task(output_pydantic=Model)`.
+# crewai then puts the model's fields in the prompt and parses the final answer
+# into the model, but a malformed answer costs a guardrail retry (a full agent
+# loop) or a converter LLM call. TypedLLM wraps an agent's LLM and, while a typed
+# task runs, checks the final answer against the model as it is generated:
+#   * incremental parsing: the text after 'Final Answer:' is fed to an
+#     IncrementalJSON as it streams; prose instead of a JSON object, or a field
+#     whose value doesn't validate, aborts the stream at that point. Non-streaming
+#     answers are checked the same way once they arrive;
+#   * bounded repair: a rejected answer gets at most `max_repairs` tool-less calls
+#     that only ask for the corrected object, in the provider's JSON mode where
+#     the model supports a response schema; the agent loop is not re-run;
+#   * accounting: LLM calls per typed task that ended with a valid object.
+# The ReAct loop needs 'Thought/Action' text, so JSON mode is only used for repairs.
+
+
+class MalformedOutput(ValueError):
+    """Raised as soon as an answer can no longer become a valid instance of its model."""
+
+
+class IncrementalJSON:
+    """
+    Checks a JSON object chunk by chunk against `model`. Each top-level member is
+    validated against its field as soon as it is complete; `feed` raises
+    MalformedOutput on the first violation.
+    """
+
+    _FENCE = re.compile(r"\s*(```(?i:json)?)?\s*")
+    _FENCE_OPEN = "```json"
+    _adapters = {}
+
+    def __init__(self, model):
+        self.model = model
+        if model not in self._adapters:
+            # Built once per model: a TypeAdapter compiles a validator
+            self._adapters[model] = {
+                name: TypeAdapter(Annotated[(field.annotation, *field.metadata)] if field.metadata else field.annotation)
+                for name, field in model.model_fields.items()}
+        self.fields = self._adapters[model]
+        self.text = ""
+        self._depth = 0
+        self._in_string = self._escape = False
+        self._member_start = None
+        self._end = None
+
+    @property
+    def complete(self) -> bool:
+        return self._end is not None
+
+    def feed(self, chunk: str):
+        start = len(self.text)
+        self.text += chunk
+        if self._member_start is None:
+            lead = self._FENCE.match(self.text).end()
+            if lead == len(self.text) or self._FENCE_OPEN.startswith(self.text.lstrip().lower()):
+                return  # still whitespace or part of an opening fence split across chunks
+            if self.text[lead] != "{":
+                raise MalformedOutput(f"the answer must be a JSON object, not {self.text[lead:lead + 40]!r}")
+            self._member_start = lead + 1
+            self._depth = 1
+            start = lead + 1
+        for i in range(start, len(self.text)):
+            if self._end is not None:
+                return
+            self._char(i, self.text[i])
+
+    def _char(self, i: int, ch: str):
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+        elif ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+            if self._depth == 0:
+                self._member(self.text[self._member_start:i])
+                self._end = i + 1
+        elif ch == "," and self._depth == 1:
+            self._member(self.text[self._member_start:i])
+            self._member_start = i + 1
+
+    def _member(self, text: str):
+        if not text.strip():
+            return
+        try:
+            (name, value), = json.loads("{" + text + "}").items()
+        except ValueError as e:
+            raise MalformedOutput(f"invalid JSON near {text.strip()[:60]!r}: {e}")
+        adapter = self.fields.get(name)
+        if adapter is not None:
+            try:
+                adapter.validate_python(value)
+            except Exception as e:
+                raise MalformedOutput(f"field {name!r}: {e}")
+
+    def finish(self):
+        """Validates the whole object; call once the answer is complete."""
+        if not self.complete:
+            raise MalformedOutput("the answer ended before its JSON object was closed")
+        lead = self._FENCE.match(self.text).end()
+        try:
+            return self.model.model_validate_json(self.text[lead:self._end])
+        except Exception as e:
+            raise MalformedOutput(f"the answer doesn't match {self.model.__name__}: {e}")
+
+    def json(self) -> str:
+        return self.text[self._FENCE.match(self.text).end():self._end]
+
+
+# Stream chunks are checked in the thread that makes the call. crewai's event
+# handlers swallow exceptions, so the checker listens on the bus's underlying
+# signal, where raising stops the provider stream.
+_watchers = {}
+_watchers_lock = threading.Lock()
+_receiver_registered = False
+
+
+class _Watcher:
+    def __init__(self, model):
+        self.filter = FinalAnswerFilter()
+        self.parser = IncrementalJSON(model)
+        self.error = None
+
+    def feed(self, chunk: str):
+        if self.error is not None:
+            return
+        visible = self.filter.feed(chunk)
+        if visible:
+            try:
+                self.parser.feed(visible)
+            except MalformedOutput as e:
+                self.error = str(e)
+                raise
+
+
+def _on_signal(source, event=None, **_):
+    if isinstance(event, LLMStreamChunkEvent) and event.chunk and not event.tool_call:
+        watcher = _watchers.get(threading.get_ident())
+        if watcher is not None:
+            watcher.feed(event.chunk)
+
+
+def _register_receiver():
+    global _receiver_registered
+    with _watchers_lock:
+        if _receiver_registered:
+            return
+        _receiver_registered = True
+    crewai_event_bus._signal.connect(_on_signal, weak=False)
+
+
+class TypedStats:
+    """Per typed task: LLM calls, final answers, aborted streams and repairs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks = {}
+
+    def count(self, task: str, **deltas):
+        with self._lock:
+            entry = self._tasks.setdefault(task, {"llm_calls": 0, "answers": 0, "valid": 0, "aborted_streams": 0,
+                                                  "repairs": 0, "repaired": 0})
+            for key, delta in deltas.items():
+                entry[key] += delta
+
+    def rows(self) -> list:
+        with self._lock:
+            items = [(task, dict(entry)) for task, entry in self._tasks.items()]
+        rows = []
+        for task, entry in items:
+            successes = entry["valid"] + entry["repaired"]
+            rows.append(dict(entry, task=task, llm_calls_per_success=(
+                round(entry["llm_calls"] / successes, 2) if successes else None)))
+        return sorted(rows, key=lambda r: r["task"])
+
+
+_default_stats = None
+_default_lock = threading.Lock()
+
+
+def default_stats() -> TypedStats:
+    """The typed-output statistics shared by every TypedLLM in this process."""
+    global _default_stats
+    with _default_lock:
+        if _default_stats is None:
+            _default_stats = TypedStats()
+        return _default_stats
+
+
+def json_mode_llm(llm, model):
+    """
+    A sibling of the crewai LLM at the bottom of `llm`'s wrapper chain that
+    answers in the provider's structured-output mode for `model`, or None when
+    the provider model doesn't support a response schema.
+    """
+    while not isinstance(llm, LLM) and hasattr(llm, "inner"):
+        llm = llm.inner
+    if not isinstance(llm, LLM):
+        return None
+    from litellm import supports_response_schema
+    try:
+        provider = llm._get_custom_llm_provider()
+        if not supports_response_schema(model=llm.model, custom_llm_provider=provider):
+            return None
+    except Exception:
+        return None
+    sibling = copy.copy(llm)
+    sibling.response_format = model
+    sibling.stream = False
+    sibling.stop = []
+    return sibling
+
+
+class TypedLLM(DelegatingLLM):
+    """
+    Checks the final answers of typed tasks (`output_pydantic`) while they are
+    generated and repairs malformed ones with at most `max_repairs` calls.
+    """
+
+    def __init__(self, llm, max_repairs: int = 1, stats: TypedStats = None):
+        super().__init__(llm)
+        self.max_repairs = max_repairs
+        self.stats = stats or default_stats()
+        self._json_mode = {}
+        self._lock = threading.Lock()
+        _register_receiver()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        task = current_task()
+        model = getattr(task, "output_pydantic", None)
+        if model is None:
+            return self.call_inner(messages, tools, callbacks, available_functions, **kwargs)
+        label = task.name or model.__name__
+        watcher = _Watcher(model)
+        ident = threading.get_ident()
+        with _watchers_lock:
+            _watchers[ident] = watcher
+        try:
+            response = self.call_inner(messages, tools, callbacks, available_functions, **kwargs)
+        except MalformedOutput:
+            response = None
+        finally:
+            with _watchers_lock:
+                _watchers.pop(ident, None)
+        self.stats.count(label, llm_calls=1)
+        if watcher.error is not None:
+            # The stream was cut short; crewai may have returned the partial text.
+            self.stats.count(label, answers=1, aborted_streams=1)
+            return self._repair(label, model, watcher.parser.text, watcher.error, response)
+        if FINAL_ANSWER_MARKER not in (response or ""):
+            return response  # a tool step, not an answer
+        self.stats.count(label, answers=1)
+        thought, answer = response.split(FINAL_ANSWER_MARKER, 1)
+        try:
+            parser = IncrementalJSON(model)
+            parser.feed(answer.strip())
+            parser.finish()
+        except MalformedOutput as e:
+            return self._repair(label, model, answer, str(e), response)
+        self.stats.count(label, valid=1)
+        # Downstream tasks read the raw output, so it is the bare object, without fences
+        return f"{thought}{FINAL_ANSWER_MARKER} {parser.json()}"
+
+    def _json_llm(self, model):
+        with self._lock:
+            if model not in self._json_mode:
+                self._json_mode[model] = json_mode_llm(self.inner, model)
+            return self._json_mode[model]
+
+    def _repair(self, label: str, model, answer: str, error: str, original):
+        schema = json.dumps(model.model_json_schema())
+        llm = self._json_llm(model) or self.inner
+        for _ in range(self.max_repairs):
+            self.stats.count(label, llm_calls=1, repairs=1)
+            messages = [
+                {"role": "system", "content": "You correct malformed structured answers. Reply with only a JSON "
+                                              f"object that matches this JSON schema: {schema}"},
+                {"role": "user", "content": f"This answer was rejected ({error}):\n\n{answer.strip()}\n\n"
+                                            "Reply with the corrected JSON object only."},
+            ]
+            try:
+                fixed = llm.call(messages)
+                parser = IncrementalJSON(model)
+                parser.feed(str(fixed).strip())
+                parser.finish()
+            except Exception as e:
+                error = str(e)
+                continue
+            self.stats.count(label, repaired=1)
+            return f"Thought: I now know the final answer\n{FINAL_ANSWER_MARKER} {parser.json()}"
+        # Out of repairs: the task's guardrail decides, as without TypedLLM.
+        return original if original is not None else f"{FINAL_ANSWER_MARKER} {answer}"
+
+
+def render_panel(stats: TypedStats = None):
+    """Streamlit panel with LLM calls per successful typed task."""
+    import streamlit as st
+    rows = (stats or default_stats()).rows()
+    with st.expander("Typed task outputs"):
+        if not rows:
+            st.caption("No typed task has run yet.")
+            return
+        st.dataframe(rows, use_container_width=True)
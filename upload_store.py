@@ -0,0 +1,145 @@
+import atexit
+import mmap
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Type
+
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field
+
+# --- In-memory store for uploaded documents ---
+# Uploads stay in the memory Streamlit already holds them in and are handed to
+# agents as read-only memoryviews, keyed by a per-session document ID, so two
+# sessions uploading "notes.md" never collide and nothing touches the working
+# directory. Only uploads above `spill_threshold` are written to a private temp
+# file, which is memory-mapped and always deleted on release or at exit.
+
+SPILL_THRESHOLD = 16 * 1024 * 1024
+
+
+class _Document:
+    __slots__ = ("name", "view", "_mmap", "_path")
+
+    def __init__(self, name, view, mm=None, path=None):
+        self.name = name
+        self.view = view
+        self._mmap = mm
+        self._path = path
+
+    def close(self):
+        self.view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            os.unlink(self._path)
+
+
+class UploadStore:
+    """Maps document IDs to read-only buffers; IDs are scoped by session."""
+
+    def __init__(self, spill_threshold: int = SPILL_THRESHOLD, spill_dir: str = None):
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self._documents = {}
+        self._lock = threading.Lock()
+        atexit.register(self.clear)
+
+    def put(self, session_id: str, name: str, data) -> str:
+        """
+        Registers `data` (bytes or any buffer, e.g. `uploaded_file.getbuffer()`)
+        and returns its document ID. Small uploads are not copied.
+        """
+        view = memoryview(data).cast("B")
+        if view.nbytes > self.spill_threshold:
+            document = self._spill(name, view)
+        else:
+            document = _Document(name, view.toreadonly())
+        doc_id = f"{session_id}/{uuid.uuid4().hex[:8]}/{name}"
+        with self._lock:
+            self._documents[doc_id] = document
+        return doc_id
+
+    def _spill(self, name, view) -> _Document:
+        fd, path = tempfile.mkstemp(prefix="upload-", suffix=os.path.splitext(name)[1], dir=self.spill_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(view)
+            view.release()
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            os.unlink(path)
+            raise
+        return _Document(name, memoryview(mm), mm, path)
+
+    def view(self, doc_id: str) -> memoryview:
+        with self._lock:
+            document = self._documents.get(doc_id)
+        if document is None:
+            raise KeyError(f"Unknown or expired document: {doc_id}")
+        return document.view
+
+    def read_text(self, doc_id: str, offset: int = 0, length: int = None, encoding: str = "utf-8") -> str:
+        """Decodes a slice of the document without copying the rest of it."""
+        view = self.view(doc_id)
+        end = view.nbytes if length is None else min(view.nbytes, offset + length)
+        return str(view[offset:end], encoding, errors="replace")
+
+    def release(self, doc_id: str):
+        with self._lock:
+            document = self._documents.pop(doc_id, None)
+        if document is not None:
+            document.close()
+
+    def release_session(self, session_id: str):
+        prefix = f"{session_id}/"
+        with self._lock:
+            doc_ids = [doc_id for doc_id in self._documents if doc_id.startswith(prefix)]
+        for doc_id in doc_ids:
+            self.release(doc_id)
+
+    def clear(self):
+        with self._lock:
+            doc_ids = list(self._documents)
+        for doc_id in doc_ids:
+            self.release(doc_id)
+
+    @contextmanager
+    def document(self, session_id: str, name: str, data):
+        """Registers an upload for the duration of a `with` block, releasing it even on errors."""
+        doc_id = self.put(session_id, name, data)
+        try:
+            yield doc_id
+        finally:
+            self.release(doc_id)
+
+
+# The store shared by every page in this process.
+upload_store = UploadStore()
+
+
+# --- Agent tool over the store ---
+
+class BufferReadToolInput(BaseModel):
+    """Input schema for BufferReadTool."""
+    document_id: str = Field(..., description="The ID of the uploaded document to read.")
+    offset: int = Field(0, description="Byte offset to start reading from.")
+    length: int = Field(20_000, description="Maximum number of bytes to read.")
+
+
+class BufferReadTool(BaseTool):
+    name: str = "Uploaded Document Reader"
+    description: str = "Reads the text of a document the user uploaded, given its document ID. Long documents can be read in slices with offset and length."
+    args_schema: Type[BaseModel] = BufferReadToolInput
+
+    def _run(self, document_id: str, offset: int = 0, length: int = 20_000) -> str:
+        try:
+            view = upload_store.view(document_id)
+        except KeyError as e:
+            return str(e)
+        text = upload_store.read_text(document_id, offset, length)
+        if offset + length < view.nbytes:
+            text += f"\n\n[... {view.nbytes - offset - length} more bytes; read again with offset={offset + length}]"
+        return text
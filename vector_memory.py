@@ -0,0 +1,386 @@
+import atexit
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+
+import numpy as np
+from crewai.memory.storage.interface import Storage
+
+from llm_metrics import percentile
+
+# --- Local vector memory for crews ---
+# crewai recalls short-term memory when it builds each task prompt and saves
+# every final answer to it. By default that goes to a Chroma collection and a
+# remote embedder. A VectorStore keeps it in-process instead, within a fixed
+# size:
+#   * embeddings are rows of one contiguous float32 matrix, L2-normalised, so
+#     a recall is a single matrix-vector product and a top-k partition;
+#   * text is embedded once: vectors are keyed by the SHA-256 of their text
+#     (stored rows, plus an LRU of recent queries), and saving known text only
+#     refreshes it;
+#   * the matrix has a hard capacity. When it is full, a new entry replaces the
+#     row with the lowest importance x 0.5^(age / half_life), where age counts
+#     from the row's last save or recall;
+#   * the matrix and the row state are memory-mapped .npy files, and text and
+#     metadata an append-only log, so a restart maps the files instead of
+#     re-embedding anything.
+# Embeddings come from a local feature-hashing embedder (no network, no key),
+# or from a litellm embedding model named in VECTOR_MEMORY_MODEL. Recall cost
+# is bound by memory bandwidth, so the default is 128 dimensions: ~0.7 ms for
+# 20,000 entries on one core, including hashing an unseen query (~0.04 ms;
+# benchmarks/bench_vector_memory.py). A remote embedder adds its round trip
+# for every query that is not cached.
+#
+# A store file belongs to one process (flock). Another process opening the same
+# store name gets the next free shard (<name>-1, <name>-2, ...).
+
+MEMORY_PATH = os.getenv("VECTOR_MEMORY_PATH", "vector_memory")
+EMBEDDING_MODEL = os.getenv("VECTOR_MEMORY_MODEL")  # e.g. "gemini/text-embedding-004"
+DIM = 128
+_WORDS = re.compile(r"[a-z0-9]{2,}")
+_STOPWORDS = frozenset(
+    "an and are as at be by for from has have in is it its of on or that the this to was were will with you your".split())
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class HashingEmbedder:
+    """
+    Embeds text locally by hashing its words and word pairs (stopwords dropped)
+    into `dim` signed buckets. A memory and a long task prompt share few words,
+    so matches score lower than with a dense embedding model: recalls through
+    crewai use `score_threshold` instead of crewai's 0.35.
+    """
+
+    score_threshold = 0.15
+
+    def __init__(self, dim: int = DIM):
+        self.dim = dim
+
+    def __call__(self, texts: list) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), np.float32)
+        for row, text in enumerate(texts):
+            words = [w for w in _WORDS.findall(text.lower()) if w not in _STOPWORDS]
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(feature.encode("utf-8"))
+                out[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return _normalize(np.sign(out) * np.log1p(np.abs(out)))
+
+
+class LiteLLMEmbedder:
+    """Embeds text with a litellm embedding model, asking for `dim` dimensions."""
+
+    def __init__(self, model: str, dim: int = DIM):
+        self.model = model
+        self.dim = dim
+
+    def __call__(self, texts: list) -> np.ndarray:
+        import litellm
+        response = litellm.embedding(model=self.model, input=list(texts), dimensions=self.dim)
+        vectors = np.array([item["embedding"] for item in response.data], np.float32)
+        return _normalize(vectors[:, :self.dim])
+
+
+class StoreLocked(Exception):
+    """Raised when another process has the store's files open."""
+
+
+def _open_matrix(path: str, shape: tuple, dtype):
+    if os.path.exists(path):
+        matrix = np.lib.format.open_memmap(path, mode="r+")
+        if matrix.shape == shape and matrix.dtype == dtype:
+            return matrix, True
+        del matrix  # opened with another capacity or dimension: start over
+    return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape), False
+
+
+class VectorStore:
+    """
+    Up to `capacity` texts with their embeddings, searched by cosine similarity.
+    With `path`, the store persists to <path>.vectors.npy, <path>.rows.npy and
+    <path>.log; without it, it lives in memory only.
+    """
+
+    def __init__(self, path: str = None, capacity: int = 20_000, dim: int = DIM, embed=None,
+                 half_life_s: float = 24 * 3600, cache_entries: int = 4096):
+        self.path = path
+        self.capacity = capacity
+        self.dim = dim
+        self.embed = embed or HashingEmbedder(dim)
+        self.half_life_s = half_life_s
+        self.cache_entries = cache_entries
+        self._lock = threading.RLock()
+        self._texts = [None] * capacity
+        self._metadata = [None] * capacity
+        self._hashes = [None] * capacity
+        self._row_of = {}
+        self._cache = OrderedDict()
+        self._scores = np.empty(capacity, np.float32)
+        self._latencies = deque(maxlen=1000)
+        self.counters = {"saved": 0, "refreshed": 0, "evicted": 0, "searches": 0, "embedded": 0, "embed_cache_hits": 0}
+        self.size = 0
+        self._log = self._lock_file = None
+        self._log_lines = 0
+        if path is None:
+            self._vectors = np.zeros((capacity, dim), np.float32)
+            self._rows = np.zeros((capacity, 2), np.float64)  # last used (0: empty), importance
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock_file = open(path + ".lock", "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise StoreLocked(path)
+        self._vectors, kept = _open_matrix(path + ".vectors.npy", (capacity, dim), np.float32)
+        self._rows, kept_rows = _open_matrix(path + ".rows.npy", (capacity, 2), np.float64)
+        if kept and kept_rows:
+            self._replay()
+        else:
+            self._rows[:] = 0
+            open(path + ".log", "w").close()
+        self._log = open(path + ".log", "a", encoding="utf-8")
+        atexit.register(self.close)
+
+    # --- 1. Persistence ---
+
+    def _replay(self):
+        torn = False
+        if os.path.exists(self.path + ".log"):
+            with open(self.path + ".log", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        torn = True  # a write cut short by a crash; everything before it is intact
+                        break
+                    self._log_lines += 1
+                    if entry.get("reset"):
+                        self._texts = [None] * self.capacity
+                        self._metadata = [None] * self.capacity
+                        self._hashes = [None] * self.capacity
+                        continue
+                    row = entry["row"]
+                    self._texts[row], self._metadata[row], self._hashes[row] = entry["text"], entry["metadata"], entry["hash"]
+        self.size = max((i + 1 for i, text in enumerate(self._texts) if text is not None), default=0)
+        for row in range(self.size):
+            if self._texts[row] is None:
+                # A vector written without its log line, or a row from before a reset
+                self._rows[row] = 0
+                self._vectors[row] = 0
+            else:
+                self._row_of[self._hashes[row]] = row
+        if torn or self._log_lines > 2 * self.capacity:
+            self._compact_log()
+
+    def _append(self, entry: dict):
+        if self._log is None:
+            return
+        self._log.write(json.dumps(entry, default=str) + "\n")
+        self._log.flush()
+        self._log_lines += 1
+        if self._log_lines > 2 * self.capacity:
+            # Evictions leave superseded lines behind; rewrite the log from the live rows
+            self._log.close()
+            self._compact_log()
+            self._log = open(self.path + ".log", "a", encoding="utf-8")
+
+    def _compact_log(self):
+        tmp = self.path + ".log.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for row in range(self.size):
+                if self._texts[row] is not None:
+                    f.write(json.dumps({"row": row, "hash": self._hashes[row], "text": self._texts[row],
+                                        "metadata": self._metadata[row]}, default=str) + "\n")
+        os.replace(tmp, self.path + ".log")
+        self._log_lines = self.size
+
+    def flush(self):
+        with self._lock:
+            if self.path is not None:
+                self._vectors.flush()
+                self._rows.flush()
+
+    def close(self):
+        with self._lock:
+            if self._log is None:
+                return
+            self.flush()
+            self._log.close()
+            self._log = None
+            self._lock_file.close()
+
+    # --- 2. Embedding ---
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _vector(self, text: str, digest: str) -> np.ndarray:
+        with self._lock:
+            row = self._row_of.get(digest)
+            if row is not None:
+                self.counters["embed_cache_hits"] += 1
+                return self._vectors[row].copy()
+            vector = self._cache.get(digest)
+            if vector is not None:
+                self._cache.move_to_end(digest)
+                self.counters["embed_cache_hits"] += 1
+                return vector
+        vector = self.embed([text])[0]  # outside the lock: a remote embedder takes a while
+        with self._lock:
+            self.counters["embedded"] += 1
+            self._cache[digest] = vector
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return vector
+
+    # --- 3. Saving and searching ---
+
+    def add(self, text: str, metadata: dict = None, importance: float = 1.0) -> int:
+        """Stores `text` and returns its row; known text is refreshed, not embedded again."""
+        digest = self._hash(text)
+        vector = self._vector(text, digest)
+        now = time.time()
+        with self._lock:
+            row = self._row_of.get(digest)
+            if row is not None:
+                self._rows[row] = (now, max(self._rows[row, 1], importance))
+                self.counters["refreshed"] += 1
+                return row
+            if self.size < self.capacity:
+                row = self.size
+                self.size += 1
+            else:
+                row = self._victim(now)
+                self._row_of.pop(self._hashes[row], None)
+                self.counters["evicted"] += 1
+            self._vectors[row] = vector
+            self._rows[row] = (now, importance)
+            self._texts[row], self._metadata[row], self._hashes[row] = text, metadata or {}, digest
+            self._row_of[digest] = row
+            self._cache.pop(digest, None)
+            self.counters["saved"] += 1
+            self._append({"row": row, "hash": digest, "text": text, "metadata": metadata or {}})
+            return row
+
+    def _victim(self, now: float) -> int:
+        rows = self._rows[:self.size]
+        keep = rows[:, 1] * np.exp2((rows[:, 0] - now) / self.half_life_s)
+        return int(np.argmin(keep))
+
+    def search(self, query: str, limit: int = 3, score_threshold: float = 0.35) -> list:
+        """The `limit` entries most similar to `query` scoring at least `score_threshold`, best first."""
+        start = time.perf_counter()  # the recorded latency includes embedding the query
+        vector = self._vector(query, self._hash(query))
+        with self._lock:
+            n = self.size
+            if n == 0 or limit <= 0:
+                return []
+            scores = self._scores[:n]
+            np.dot(self._vectors[:n], vector, out=scores)
+            k = min(limit, n)
+            top = np.argpartition(scores, n - k)[n - k:]
+            top = top[np.argsort(scores[top])[::-1]]
+            top = top[scores[top] >= score_threshold]
+            self._rows[top, 0] = time.time()
+            results = [{"id": self._hashes[row], "context": self._texts[row], "metadata": self._metadata[row],
+                        "score": float(scores[row])} for row in top if self._texts[row] is not None]
+            self._latencies.append(time.perf_counter() - start)
+            self.counters["searches"] += 1
+            return results
+
+    def reset(self):
+        with self._lock:
+            self._rows[:] = 0
+            self._texts = [None] * self.capacity
+            self._metadata = [None] * self.capacity
+            self._hashes = [None] * self.capacity
+            self._row_of.clear()
+            self.size = 0
+            self._append({"reset": True})
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counters = dict(self.counters)
+            size = self.size
+        return dict(counters, entries=size, capacity=self.capacity, dim=self.dim,
+                    search_p50_ms=round(percentile(latencies, 0.5) * 1000, 3) if latencies else None,
+                    search_p99_ms=round(percentile(latencies, 0.99) * 1000, 3) if latencies else None)
+
+
+# --- 4. crewai integration ---
+
+class VectorMemoryStorage(Storage):
+    """
+    crewai memory storage backed by a VectorStore. Crew.copy deep-copies a
+    crew's memory; copies of this storage share its store.
+    """
+
+    def __init__(self, store: VectorStore):
+        self.store = store
+
+    def save(self, value, metadata: dict) -> None:
+        metadata = dict(metadata or {})
+        importance = float(metadata.pop("importance", 1.0))
+        self.store.add(str(value), metadata, importance)
+
+    def search(self, query: str, limit: int = 3, score_threshold: float = 0.35) -> list:
+        threshold = getattr(self.store.embed, "score_threshold", score_threshold)
+        return self.store.search(query, limit, threshold)
+
+    def reset(self) -> None:
+        self.store.reset()
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+_stores = {}
+_default_lock = threading.Lock()
+
+
+def default_store(name: str) -> VectorStore:
+    """The persistent store called `name` for this process, on the first shard no other process holds."""
+    with _default_lock:
+        store = _stores.get(name)
+        if store is None:
+            embed = LiteLLMEmbedder(EMBEDDING_MODEL) if EMBEDDING_MODEL else None
+            shard = 0
+            while store is None:
+                suffix = f"-{shard}" if shard else ""
+                try:
+                    store = VectorStore(os.path.join(MEMORY_PATH, name + suffix), embed=embed)
+                except StoreLocked:
+                    shard += 1
+            _stores[name] = store
+        return store
+
+
+def short_term_memory(name: str):
+    """A crewai ShortTermMemory over the store `name`; pass it as Crew(short_term_memory=...)."""
+    from crewai.memory.short_term.short_term_memory import ShortTermMemory
+    return ShortTermMemory(storage=VectorMemoryStorage(default_store(name)))
+
+
+def render_panel():
+    """Streamlit panel with the size, recall latency and embedding reuse of every store."""
+    import streamlit as st
+    with _default_lock:
+        stores = dict(_stores)
+    with st.expander("Agent memory"):
+        if not stores:
+            st.caption("No crew has used memory yet.")
+            return
+        st.dataframe([dict(store.stats(), store=name) for name, store in stores.items()], use_container_width=True)
@@ -0,0 +1,302 @@
+import json
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from crew_registry import registry
+
+# --- Deterministic verification rules ---
+# Structural checks (valid JSON, required keys, a JSON schema, key parity with
+# a reference locale file, length limits, regexes) don't need an LLM. Each gig
+# type declares its rules below; a rule set is compiled once per process
+# (through the crew registry, so editing a spec recompiles it) and produces the
+# Auditor's `{"status", "reason"}` verdict directly:
+#   * any failing rule      -> "rejected", no LLM call;
+#   * every rule passes     -> "verified", no LLM call, unless the gig type also
+#                              lists `judgment` criteria that need a reviewer;
+#   * otherwise             -> "undecided"; only the pending checks go to the LLM.
+#
+# Submissions are a dict of named texts, e.g. {"submission": ..., "reference": ...}.
+
+PASS, FAIL, UNDECIDED = "pass", "fail", "undecided"
+
+RULE_SETS = {
+    "structured_data": {
+        "description": "A JSON object with the fields agreed in the gig.",
+        "rules": [
+            {"check": "required_keys", "keys": ["key", "status"]},
+            {"check": "json_schema", "schema": {
+                "type": "object",
+                "properties": {"key": {"type": "string"}, "status": {"enum": ["submitted", "draft", "final"]}},
+            }},
+        ],
+    },
+    "translation": {
+        "description": "A translated copy of a JSON locale file, checked against the original (e.g. en.json).",
+        "rules": [
+            {"check": "key_parity", "reference": "reference", "placeholders": True},
+            {"check": "max_length", "max_chars": 500},
+            {"check": "regex", "pattern": r"\A\s*\Z", "on": "values", "must_match": False, "message": "untranslated (empty) value"},
+        ],
+    },
+    "summary": {
+        "description": "A prose summary of the source material.",
+        "rules": [
+            {"check": "max_length", "max_chars": 2000, "on": "text"},
+            {"check": "regex", "pattern": r"(?i)lorem ipsum|\bTODO\b", "must_match": False, "message": "placeholder text"},
+        ],
+        "judgment": ["The summary is accurate and faithful to the source material."],
+    },
+}
+
+
+@dataclass(frozen=True)
+class Verdict:
+    status: str                # "verified", "rejected" or "undecided"
+    reason: str
+    pending: Tuple[str, ...] = ()
+
+    @property
+    def decided(self) -> bool:
+        return self.status != "undecided"
+
+    def as_dict(self) -> dict:
+        return {"status": self.status, "reason": self.reason}
+
+
+class Submission:
+    """The submitted files, with each file's JSON parsed at most once."""
+
+    def __init__(self, files: Dict[str, str]):
+        self.files = files
+        self._parsed = {}
+
+    def text(self, name: str) -> Optional[str]:
+        return self.files.get(name)
+
+    def json(self, name: str):
+        """Returns (value, error); error is None when the file parsed."""
+        if name not in self._parsed:
+            text = self.files.get(name)
+            if text is None:
+                self._parsed[name] = (None, f"'{name}' was not provided")
+            else:
+                try:
+                    self._parsed[name] = (json.loads(text), None)
+                except ValueError as e:
+                    self._parsed[name] = (None, f"'{name}' is not valid JSON ({e})")
+        return self._parsed[name]
+
+
+Check = Callable[[Submission], Tuple[str, str]]
+
+
+def _flatten(value, prefix: str = "") -> Dict[str, object]:
+    """Maps dotted key paths to leaf values: {"a": {"b": 1}} -> {"a.b": 1}."""
+    if isinstance(value, dict) and value:
+        flat = {}
+        for key, child in value.items():
+            flat.update(_flatten(child, f"{prefix}{key}."))
+        return flat
+    return {prefix[:-1]: value} if prefix else {}
+
+
+def _strings(value) -> List[str]:
+    return [v for v in _flatten(value).values() if isinstance(v, str)] if isinstance(value, dict) else []
+
+
+def _list_preview(items, limit: int = 5) -> str:
+    items = sorted(items)
+    more = f" (+{len(items) - limit} more)" if len(items) > limit else ""
+    return ", ".join(items[:limit]) + more
+
+
+# --- 1. Rule compilers: spec dict -> check(submission) -> (outcome, message) ---
+
+def _required_keys(spec) -> Check:
+    file, keys = spec.get("file", "submission"), spec["keys"]
+
+    def check(sub):
+        value, error = sub.json(file)
+        if error:
+            return FAIL, error
+        flat = _flatten(value)
+        missing = [k for k in keys if k not in flat and not (isinstance(value, dict) and k in value)]
+        if missing:
+            return FAIL, f"missing required keys: {_list_preview(missing)}"
+        return PASS, f"all {len(keys)} required keys present"
+    return check
+
+
+def _json_schema(spec) -> Check:
+    from jsonschema.validators import validator_for
+    file, schema = spec.get("file", "submission"), spec["schema"]
+    validator = validator_for(schema)(schema)
+
+    def check(sub):
+        value, error = sub.json(file)
+        if error:
+            return FAIL, error
+        first = next(iter(validator.iter_errors(value)), None)
+        if first is not None:
+            where = "/".join(str(p) for p in first.absolute_path) or "document"
+            return FAIL, f"schema violation at {where}: {first.message}"
+        return PASS, "matches the JSON schema"
+    return check
+
+
+_PLACEHOLDER = re.compile(r"\{\{?\s*\w+\s*\}?\}|%\(\w+\)s|%[sd]")
+
+
+def _key_parity(spec) -> Check:
+    file, reference = spec.get("file", "submission"), spec.get("reference", "reference")
+    placeholders = spec.get("placeholders", False)
+
+    def check(sub):
+        if sub.text(reference) is None:
+            return UNDECIDED, f"key parity needs the reference file '{reference}'"
+        ref, error = sub.json(reference)
+        if error:
+            return UNDECIDED, error
+        value, error = sub.json(file)
+        if error:
+            return FAIL, error
+        ref_flat, flat = _flatten(ref), _flatten(value)
+        missing, extra = ref_flat.keys() - flat.keys(), flat.keys() - ref_flat.keys()
+        if missing or extra:
+            parts = [f"missing keys: {_list_preview(missing)}"] if missing else []
+            parts += [f"unexpected keys: {_list_preview(extra)}"] if extra else []
+            return FAIL, "; ".join(parts)
+        if placeholders:
+            broken = [k for k, v in ref_flat.items()
+                      if isinstance(v, str) and sorted(_PLACEHOLDER.findall(v)) != sorted(_PLACEHOLDER.findall(str(flat[k])))]
+            if broken:
+                return FAIL, f"placeholders changed in: {_list_preview(broken)}"
+        return PASS, f"keys match the reference ({len(ref_flat)} keys)"
+    return check
+
+
+def _texts(sub: Submission, file: str, on: str):
+    """The strings a length/regex rule applies to: the whole file, or every JSON string value."""
+    if on == "text":
+        text = sub.text(file)
+        return ([text], None) if text is not None else (None, f"'{file}' was not provided")
+    value, error = sub.json(file)
+    return (_strings(value), None) if error is None else (None, error)
+
+
+def _max_length(spec) -> Check:
+    file, on, limit = spec.get("file", "submission"), spec.get("on", "values"), spec["max_chars"]
+
+    def check(sub):
+        texts, error = _texts(sub, file, on)
+        if error:
+            return FAIL, error
+        longest = max((len(t) for t in texts), default=0)
+        if longest > limit:
+            return FAIL, f"text is {longest} characters long (limit {limit})"
+        return PASS, f"within the {limit}-character limit"
+    return check
+
+
+def _regex(spec) -> Check:
+    file, on = spec.get("file", "submission"), spec.get("on", "text")
+    pattern = re.compile(spec["pattern"], re.MULTILINE)
+    must_match = spec.get("must_match", True)
+    message = spec.get("message", f"pattern {spec['pattern']!r}")
+
+    def check(sub):
+        texts, error = _texts(sub, file, on)
+        if error:
+            return FAIL, error
+        found = any(pattern.search(t) for t in texts)
+        if found != must_match:
+            return FAIL, f"{'missing' if must_match else 'contains'} {message}"
+        return PASS, f"{'has' if must_match else 'no'} {message}"
+    return check
+
+
+_COMPILERS = {
+    "required_keys": _required_keys,
+    "json_schema": _json_schema,
+    "key_parity": _key_parity,
+    "max_length": _max_length,
+    "regex": _regex,
+}
+
+
+# --- 2. Compiled rule sets and the engine ---
+
+class RuleSet:
+    def __init__(self, spec: dict):
+        unknown = [r["check"] for r in spec["rules"] if r["check"] not in _COMPILERS]
+        if unknown:
+            raise ValueError(f"unknown verification checks: {', '.join(unknown)}")
+        self.checks = [(rule["check"], _COMPILERS[rule["check"]](rule)) for rule in spec["rules"]]
+        self.judgment = tuple(spec.get("judgment", ()))
+
+    def evaluate(self, files: Dict[str, str]) -> Verdict:
+        sub = Submission(files)
+        passed, pending = [], []
+        for name, check in self.checks:
+            outcome, message = check(sub)
+            if outcome == FAIL:
+                return Verdict("rejected", f"{name}: {message}")
+            (passed if outcome == PASS else pending).append(f"{name}: {message}")
+        pending.extend(self.judgment)
+        if pending:
+            return Verdict("undecided", "; ".join(passed) or "no deterministic checks passed", tuple(pending))
+        return Verdict("verified", "All deterministic checks passed: " + "; ".join(passed) + ".")
+
+
+class VerificationEngine:
+    """
+    Decides verdicts with the compiled rules and falls back to an LLM reviewer
+    only for what the rules leave open. Counts how many verdicts skipped the LLM.
+    """
+
+    def __init__(self, rule_sets: dict = None):
+        self.rule_sets = rule_sets or RULE_SETS
+        self._lock = threading.Lock()
+        self.counters = {"verdicts": 0, "by_rules": 0, "by_llm": 0}
+
+    def rules_for(self, gig_type: str) -> RuleSet:
+        spec = self.rule_sets[gig_type]
+        return registry.get(f"rules:{gig_type}", spec, RuleSet)
+
+    def evaluate(self, gig_type: str, files: Dict[str, str]) -> Verdict:
+        """Runs the deterministic rules only."""
+        return self.rules_for(gig_type).evaluate(files)
+
+    def decide(self, gig_type: str, files: Dict[str, str], llm_review: Callable[[Verdict], dict]) -> dict:
+        """
+        Returns the final {"status", "reason"} verdict. `llm_review` is called
+        with the undecided Verdict (its `pending` checks) only when needed.
+        """
+        verdict = self.evaluate(gig_type, files)
+        decided = verdict.decided
+        result = verdict.as_dict() if decided else llm_review(verdict)
+        with self._lock:
+            self.counters["verdicts"] += 1
+            self.counters["by_rules" if decided else "by_llm"] += 1
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["llm_skip_rate"] = stats["by_rules"] / stats["verdicts"] if stats["verdicts"] else 0.0
+        return stats
+
+
+_default_engine = None
+_default_lock = threading.Lock()
+
+
+def default_engine() -> VerificationEngine:
+    """The verification engine shared by every Auditor in this process."""
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            _default_engine = VerificationEngine()
+        return _default_engine
@@ -0,0 +1,267 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import List
+from urllib.parse import urlsplit
+
+import httpx
+
+import tokens
+
+# --- Web fetching for agent tools ---
+# One connection-pooled httpx.Client is shared by every fetch in the process.
+# Pages are cached on disk (SQLite, like the LLM cache) together with their
+# extracted text and its token count:
+#   * a page fetched less than `fresh_s` ago is served without any request;
+#   * an older page is revalidated with If-None-Match / If-Modified-Since, and
+#     a 304 reuses the stored text, so it's neither downloaded nor re-tokenized;
+#   * the text truncated to the last requested budget is stored too.
+# HTML is reduced to its main text (the <main>/<article> element when there is
+# one, without scripts, navigation or footers); other text types pass through.
+
+DEFAULT_PATH = os.getenv("WEB_CACHE_PATH", "web_cache.sqlite3")
+MAX_BODY_BYTES = 5 * 1024 * 1024
+USER_AGENT = "warpspeed-gig-architect/0.1 (+https://github.com/saheelwagh/warpspeed25)"
+_GITHUB_BLOB = re.compile(r"^https://github\.com/([^/]+)/([^/]+)/blob/(.+)$")
+
+
+@dataclass
+class FetchResult:
+    url: str
+    text: str = ""
+    tokens: int = 0
+    truncated: bool = False
+    status: int = 0
+    source: str = ""          # "cache" (fresh), "revalidated" (304) or "network"
+    error: str = ""
+
+
+# --- 1. Text extraction ---
+
+class _TextExtractor(HTMLParser):
+    SKIP = {"script", "style", "noscript", "svg", "nav", "footer", "header", "aside", "form", "template"}
+    BLOCK = {"p", "div", "section", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "article", "main"}
+    MAIN = {"main", "article"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self._in_title = False
+        self._skip = 0
+        self._main_depth = 0
+        self._all, self._main = [], []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag in self.MAIN:
+            self._main_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        if tag in self.BLOCK:
+            self._emit("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(self._skip - 1, 0)
+        elif tag in self.MAIN:
+            self._main_depth = max(self._main_depth - 1, 0)
+        elif tag == "title":
+            self._in_title = False
+        if tag in self.BLOCK:
+            self._emit("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self._emit(data)
+
+    def _emit(self, data):
+        self._all.append(data)
+        if self._main_depth:
+            self._main.append(data)
+
+    def text(self) -> str:
+        raw = "".join(self._main) if "".join(self._main).strip() else "".join(self._all)
+        lines = (" ".join(line.split()) for line in raw.splitlines())
+        body = "\n".join(line for line in lines if line)
+        title = " ".join(self.title.split())
+        return f"# {title}\n\n{body}" if title else body
+
+
+def extract_text(body: str, content_type: str = "") -> str:
+    """Main text of an HTML page; other content (plain text, JSON, code) is returned as is."""
+    looks_html = "html" in content_type or (not content_type and body.lstrip()[:1] == "<")
+    if not looks_html:
+        return body
+    parser = _TextExtractor()
+    parser.feed(body)
+    parser.close()
+    return parser.text()
+
+
+def normalize_url(url: str) -> str:
+    """GitHub file pages are fetched from raw.githubusercontent.com to get the file, not the page around it."""
+    url = url.strip()
+    match = _GITHUB_BLOB.match(url)
+    if match:
+        return f"https://raw.githubusercontent.com/{match.group(1)}/{match.group(2)}/{match.group(3)}"
+    return url
+
+
+# --- 2. Fetcher ---
+
+class WebFetcher:
+    def __init__(self, path: str = DEFAULT_PATH, fresh_s: float = 300, timeout_s: float = 15.0,
+                 max_connections: int = 20, client: httpx.Client = None):
+        self.path = path
+        self.fresh_s = fresh_s
+        self._client = client or httpx.Client(
+            timeout=httpx.Timeout(timeout_s),
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.counters = {"cache": 0, "revalidated": 0, "network": 0, "errors": 0}
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, status INTEGER NOT NULL,"
+                " text TEXT NOT NULL, tokens INTEGER NOT NULL, checked_at REAL NOT NULL,"
+                " budget INTEGER, budget_text TEXT)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.counters[key] += 1
+
+    def _download(self, url: str, headers: dict):
+        """GET with a body size cap; returns (response, body text or None for 304)."""
+        with self._client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                return response, None
+            chunks, size = [], 0
+            for chunk in response.iter_bytes():
+                size += len(chunk)
+                if size > MAX_BODY_BYTES:
+                    raise ValueError(f"response is larger than {MAX_BODY_BYTES // (1024 * 1024)} MB")
+                chunks.append(chunk)
+            body = b"".join(chunks).decode(response.encoding or "utf-8", errors="replace")
+            return response, body
+
+    def fetch(self, url: str, token_budget: int = 2000) -> FetchResult:
+        url = normalize_url(url)
+        if urlsplit(url).scheme not in ("http", "https"):
+            self._count("errors")
+            return FetchResult(url, error="only http(s) URLs can be fetched")
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT etag, last_modified, status, text, tokens, checked_at, budget, budget_text FROM pages WHERE url = ?",
+            (url,),
+        ).fetchone()
+        now = time.time()
+
+        if row is not None and now - row[5] < self.fresh_s:
+            source = "cache"
+        else:
+            headers = {}
+            if row is not None and row[0]:
+                headers["If-None-Match"] = row[0]
+            if row is not None and row[1]:
+                headers["If-Modified-Since"] = row[1]
+            try:
+                response, body = self._download(url, headers)
+            except (httpx.HTTPError, ValueError) as e:
+                self._count("errors")
+                if row is not None:  # serve the stale copy rather than nothing
+                    return self._result(url, row, token_budget, "cache", error=f"refresh failed: {e}")
+                return FetchResult(url, error=f"{type(e).__name__}: {e}")
+            if body is None and row is None:
+                self._count("errors")
+                return FetchResult(url, status=304, error="server answered 304 to an unconditional request")
+            if body is None:
+                source = "revalidated"
+                conn.execute("UPDATE pages SET checked_at = ? WHERE url = ?", (now, url))
+                row = row[:5] + (now,) + row[6:]
+            else:
+                source = "network"
+                text = extract_text(body, response.headers.get("content-type", ""))
+                row = (response.headers.get("etag"), response.headers.get("last-modified"), response.status_code,
+                       text, tokens.count_tokens(text), now, None, None)
+                conn.execute(
+                    "INSERT OR REPLACE INTO pages (url, etag, last_modified, status, text, tokens, checked_at, budget, budget_text)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url,) + row,
+                )
+        self._count(source)
+        return self._result(url, row, token_budget, source)
+
+    def _result(self, url, row, token_budget, source, error="") -> FetchResult:
+        _, _, status, text, count, _, budget, budget_text = row
+        truncated = count > token_budget
+        if truncated:
+            if budget != token_budget or budget_text is None:
+                budget_text = tokens.truncate_to_tokens(text, token_budget)
+                self._connect().execute("UPDATE pages SET budget = ?, budget_text = ? WHERE url = ?",
+                                        (token_budget, budget_text, url))
+            text = budget_text
+        if status >= 400 and not error:
+            error = f"HTTP {status}"
+        return FetchResult(url, text, min(count, token_budget), truncated, status, source, error)
+
+    def fetch_many(self, urls: List[str], token_budget: int = 2000, max_workers: int = 8) -> List[FetchResult]:
+        """Fetches several URLs at once over the shared connection pool; results keep the input order."""
+        urls = list(dict.fromkeys(u for u in urls if u.strip()))
+        if len(urls) <= 1:
+            return [self.fetch(u, token_budget) for u in urls]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls)), thread_name_prefix="fetch") as pool:
+            return list(pool.map(lambda u: self.fetch(u, token_budget), urls))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self.counters)
+
+    def close(self):
+        self._client.close()
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def default_fetcher() -> WebFetcher:
+    """The fetcher (and HTTP connection pool) shared by every scraping tool in this process."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = WebFetcher()
+        return _default_fetcher
+
+
+def format_results(results: List[FetchResult]) -> str:
+    """Renders fetched pages as one tool answer for an agent."""
+    sections = []
+    for r in results:
+        if r.error and not r.text:
+            sections.append(f"## {r.url}\nCould not fetch this URL: {r.error}")
+            continue
+        note = f" (truncated to ~{r.tokens} tokens)" if r.truncated else ""
+        sections.append(f"## {r.url}{note}\n{r.text}")
+    return "\n\n".join(sections)
@@ -0,0 +1,271 @@
+import asyncio
+import base64
+import hashlib
+import json
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import httpx
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from x402_verify import X402_VERSION, PaymentVerifier, decode_header, signing_bytes
+
+# --- x402 payments: client, local wallet and a local facilitator stand-in ---
+# Flow (https://x402.org):
+#   1. client GETs a paid resource and receives 402 with a list of accepted
+#      payment requirements;
+#   2. client signs a transfer authorization that satisfies one of them and
+#      retries with it, base64-encoded, in the X-PAYMENT header;
+#   3. server verifies/settles and answers 200 with an X-PAYMENT-RESPONSE header.
+#
+# The stand-in server plays both resource server and facilitator. Wallets sign
+# with secp256k1 ECDSA; since the stand-in can't recover keys from signatures
+# the way a chain does, wallets register their public key with the server.
+# Payment checks live in x402_verify.
+
+NETWORK = "base-sepolia"
+USDC_ASSET = "0x036CbD53842c5426634e7929541eC2318f3dCF7e"
+USDC_DECIMALS = 6
+
+
+def usd_to_atomic(usd: float) -> str:
+    return str(round(usd * 10 ** USDC_DECIMALS))
+
+
+def encode_header(obj: dict) -> str:
+    return base64.b64encode(json.dumps(obj, separators=(",", ":"), sort_keys=True).encode()).decode()
+
+
+# --- 1. Local wallet ---
+
+class LocalWallet:
+    """A secp256k1 key pair standing in for a browser or CDP wallet."""
+
+    def __init__(self, private_key: ec.EllipticCurvePrivateKey = None):
+        self._key = private_key or ec.generate_private_key(ec.SECP256K1())
+        self.public_key_bytes = self._key.public_key().public_bytes(
+            serialization.Encoding.X962, serialization.PublicFormat.CompressedPoint
+        )
+        self.address = "0x" + hashlib.sha256(self.public_key_bytes).hexdigest()[-40:]
+
+    def sign_payment(self, requirements: dict) -> dict:
+        """Builds the X-PAYMENT payload for one entry of a 402 `accepts` list."""
+        now = int(time.time())
+        authorization = {
+            "from": self.address,
+            "to": requirements["payTo"],
+            "value": requirements["maxAmountRequired"],
+            "validAfter": str(now - 5),
+            "validBefore": str(now + int(requirements.get("maxTimeoutSeconds", 60))),
+            "nonce": "0x" + secrets.token_hex(32),
+        }
+        signature = self._key.sign(signing_bytes(authorization, requirements), ec.ECDSA(hashes.SHA256()))
+        return {
+            "x402Version": X402_VERSION,
+            "scheme": requirements["scheme"],
+            "network": requirements["network"],
+            "payload": {"signature": "0x" + signature.hex(), "authorization": authorization},
+        }
+
+
+# --- 2. Local resource server / facilitator stand-in ---
+
+@dataclass
+class PaidResource:
+    path: str
+    price_usd: float
+    description: str
+    body: dict = field(default_factory=dict)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        app = self.server.app
+        resource = app.resources.get(self.path)
+        if resource is None:
+            self._send(404, {"error": "Not found"})
+            return
+        requirements = app.requirements(resource)
+        header = self.headers.get("X-PAYMENT")
+        if not header:
+            self._send(402, {"x402Version": X402_VERSION, "error": "X-PAYMENT header is required", "accepts": [requirements]})
+            return
+        result = app.verifier.settle(header, requirements)
+        if not result.ok:
+            self._send(402, {"x402Version": X402_VERSION, "error": result.reason, "accepts": [requirements]})
+            return
+        receipt = {"success": True, "transaction": "0x" + secrets.token_hex(32), "network": NETWORK, "payer": result.payer}
+        self._send(200, resource.body, {"X-PAYMENT-RESPONSE": encode_header(receipt)})
+
+
+class FacilitatorServer:
+    """
+    Serves x402-protected resources on a local port from a background thread.
+    Requests are handled concurrently, one thread each.
+    """
+
+    def __init__(self, pay_to: str = None, host: str = "127.0.0.1", port: int = 0):
+        self.pay_to = pay_to or "0x" + secrets.token_hex(20)
+        self.resources = {}
+        self.verifier = PaymentVerifier()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.app = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_resource(self, resource: PaidResource) -> str:
+        self.resources[resource.path] = resource
+        return self.base_url + resource.path
+
+    def register_wallet(self, wallet: LocalWallet):
+        self.verifier.register(wallet.address, wallet.public_key_bytes)
+
+    def requirements(self, resource: PaidResource) -> dict:
+        return {
+            "scheme": "exact",
+            "network": NETWORK,
+            "maxAmountRequired": usd_to_atomic(resource.price_usd),
+            "resource": self.base_url + resource.path,
+            "description": resource.description,
+            "mimeType": "application/json",
+            "payTo": self.pay_to,
+            "maxTimeoutSeconds": 60,
+            "asset": USDC_ASSET,
+            "extra": {"name": "USDC", "version": "2"},
+        }
+
+    def start(self) -> "FacilitatorServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="x402-facilitator", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+# --- 3. Async client ---
+
+class PaymentError(Exception):
+    """Raised when a resource can't be bought under the client's limits."""
+
+
+@dataclass
+class PaymentResult:
+    status_code: int
+    body: dict
+    receipt: Optional[dict]
+    elapsed_s: float
+    attempts: int
+
+
+class X402Client:
+    """
+    Fetches x402-protected resources, paying when the server answers 402.
+    One client (and its connection pool) is meant to be shared by every request
+    in a process; see `submit_payment` for use from synchronous code.
+    """
+
+    def __init__(self, wallet: LocalWallet, max_amount_usd: float = 1.0, timeout_s: float = 10.0,
+                 max_retries: int = 2, max_connections: int = 100):
+        self.wallet = wallet
+        self.max_amount = int(usd_to_atomic(max_amount_usd))
+        self.max_retries = max_retries
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout_s),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def _get(self, url: str, headers: dict = None) -> httpx.Response:
+        """GET with retries on connection errors, timeouts and 5xx answers."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._http.get(url, headers=headers)
+                if response.status_code < 500 or attempt == self.max_retries:
+                    return response
+            except (httpx.TransportError, httpx.TimeoutException):
+                if attempt == self.max_retries:
+                    raise
+            await asyncio.sleep(0.1 * 2 ** attempt)
+
+    def _choose(self, accepts: list) -> dict:
+        for requirements in accepts:
+            if (requirements.get("scheme") == "exact" and requirements.get("network") == NETWORK
+                    and int(requirements["maxAmountRequired"]) <= self.max_amount):
+                return requirements
+        raise PaymentError("No acceptable payment option within the spending limit")
+
+    async def fetch(self, url: str) -> PaymentResult:
+        start = time.perf_counter()
+        response = await self._get(url)
+        attempts = 1
+        if response.status_code == 402:
+            requirements = self._choose(response.json().get("accepts", []))
+            payment = self.wallet.sign_payment(requirements)
+            response = await self._get(url, headers={"X-PAYMENT": encode_header(payment)})
+            attempts = 2
+        receipt_header = response.headers.get("X-PAYMENT-RESPONSE")
+        return PaymentResult(
+            status_code=response.status_code,
+            body=response.json(),
+            receipt=decode_header(receipt_header) if receipt_header else None,
+            elapsed_s=time.perf_counter() - start,
+            attempts=attempts,
+        )
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+# --- 4. Shared event loop for synchronous callers (e.g. Streamlit) ---
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """An event loop running forever on a daemon thread, shared by the process."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="x402-client", daemon=True).start()
+        return _loop
+
+
+def submit_payment(client: X402Client, url: str):
+    """Starts `client.fetch(url)` on the shared loop and returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(client.fetch(url), background_loop())
+
+
+def make_client(wallet: LocalWallet, **kwargs) -> X402Client:
+    """Creates a client whose connection pool lives on the shared loop."""
+    async def create():
+        return X402Client(wallet, **kwargs)
+    return asyncio.run_coroutine_threadsafe(create(), background_loop()).result()
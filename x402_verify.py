@@ -0,0 +1,217 @@
+import base64
+import heapq
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+
+# --- x402 payment verification ---
+# Checks an X-PAYMENT header against the payment requirements a server sent:
+# format, scheme/network, recipient, amount, validity window, payer signature
+# and nonce reuse. Two caches keep the hot path cheap:
+#   * decoded headers and signature results are memoized (LRU), because a
+#     facilitator verifies the same payload again when it settles it;
+#   * used nonces live in a store with O(1) lookups. A nonce only has to be
+#     remembered until its own validBefore (+ clock skew) has passed on the wall
+#     clock, since the payment carrying it is rejected as expired after that.
+
+X402_VERSION = 1
+CLOCK_SKEW_S = 5
+
+
+def decode_header(value: str) -> dict:
+    return json.loads(base64.b64decode(value))
+
+
+def signing_bytes(authorization: dict, requirements: dict) -> bytes:
+    """The exact bytes a wallet signs: the authorization bound to the asset and network."""
+    message = {"authorization": authorization, "asset": requirements["asset"], "network": requirements["network"]}
+    return json.dumps(message, separators=(",", ":"), sort_keys=True).encode()
+
+
+@dataclass(frozen=True)
+class VerificationResult:
+    ok: bool
+    reason: str = ""
+    payer: Optional[str] = None
+    nonce: Optional[str] = None
+    valid_before: Optional[int] = None
+
+
+class LRUCache:
+    """A small thread-safe LRU map."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class NonceStore:
+    """
+    Remembers used nonces until their own expiry time (wall clock): a nonce
+    stays recorded until the payment that carried it can no longer be valid.
+    Expiry times differ per nonce, so they are kept in a heap.
+    """
+
+    def __init__(self):
+        self._expiry = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        heap, expiry = self._heap, self._expiry
+        while heap and heap[0][0] < now:
+            expires, key = heapq.heappop(heap)
+            if expiry.get(key) == expires:
+                del expiry[key]
+
+    def seen(self, key, now: float = None) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            expires = self._expiry.get(key)
+            return expires is not None and expires >= now
+
+    def add(self, key, expires_at: float, now: float = None) -> bool:
+        """Records `key` until `expires_at` (inclusive); returns False if it is already recorded and unexpired."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._evict(now)
+            if key in self._expiry:
+                return False
+            self._expiry[key] = expires_at
+            heapq.heappush(self._heap, (expires_at, key))
+            return True
+
+    def __len__(self):
+        return len(self._expiry)
+
+
+class PaymentVerifier:
+    def __init__(self, max_timeout_s: int = 60, cache_size: int = 65_536):
+        self._public_keys = {}
+        self._decoded = LRUCache(cache_size)
+        self._signatures = LRUCache(cache_size)
+        # A used nonce is remembered until its payment's validBefore (+ skew) has passed.
+        self.nonces = NonceStore()
+        self.max_timeout_s = max_timeout_s
+
+    def register(self, address: str, public_key_bytes: bytes):
+        """Makes a payer's public key known (the stand-in for on-chain signature recovery)."""
+        self._public_keys[address] = ec.EllipticCurvePublicKey.from_encoded_point(ec.SECP256K1(), public_key_bytes)
+
+    def _decode(self, header: str):
+        payment = self._decoded.get(header)
+        if payment is None:
+            try:
+                payment = decode_header(header)
+                authorization = payment["payload"]["authorization"]
+                if not (isinstance(authorization, dict)
+                        and all(isinstance(authorization.get(f), str) for f in ("from", "nonce"))
+                        and isinstance(payment["payload"]["signature"], str)):
+                    payment = False
+            except (ValueError, KeyError, TypeError):
+                payment = False
+            self._decoded.put(header, payment)
+        return payment or None
+
+    def _signature_ok(self, payer: str, message: bytes, signature: str) -> bool:
+        key = (payer, message, signature)
+        ok = self._signatures.get(key)
+        if ok is None:
+            public_key = self._public_keys.get(payer)
+            try:
+                public_key.verify(bytes.fromhex(signature.removeprefix("0x")), message, ec.ECDSA(hashes.SHA256()))
+                ok = True
+            except (InvalidSignature, ValueError, AttributeError):
+                ok = False
+            self._signatures.put(key, ok)
+        return ok
+
+    def verify(self, header: str, requirements: dict, now: float = None) -> VerificationResult:
+        """Checks a payment without consuming its nonce."""
+        payment = self._decode(header)
+        if payment is None:
+            return VerificationResult(False, "Malformed X-PAYMENT header")
+        authorization = payment["payload"]["authorization"]
+        payer, nonce = authorization.get("from"), authorization.get("nonce")
+
+        if payment.get("x402Version") != X402_VERSION:
+            return VerificationResult(False, "Unsupported x402 version", payer)
+        if payment.get("scheme") != requirements["scheme"] or payment.get("network") != requirements["network"]:
+            return VerificationResult(False, "Unsupported scheme or network", payer)
+        if authorization.get("to") != requirements["payTo"]:
+            return VerificationResult(False, "Payment is addressed to a different recipient", payer)
+        try:
+            value = int(authorization["value"])
+            valid_after = int(authorization["validAfter"])
+            valid_before = int(authorization["validBefore"])
+        except (KeyError, TypeError, ValueError):
+            return VerificationResult(False, "Malformed authorization", payer)
+        if value < int(requirements["maxAmountRequired"]):
+            return VerificationResult(False, "Payment amount is too low", payer)
+
+        now = time.time() if now is None else now
+        if now + CLOCK_SKEW_S < valid_after:
+            return VerificationResult(False, "Payment is not valid yet", payer)
+        if now - CLOCK_SKEW_S > valid_before:
+            return VerificationResult(False, "Payment has expired", payer)
+        if valid_before - valid_after > self.max_timeout_s + 2 * CLOCK_SKEW_S:
+            return VerificationResult(False, "Payment validity window is too long", payer)
+        if not nonce or self.nonces.seen((payer, nonce), now):
+            return VerificationResult(False, "Payment nonce has already been used", payer, nonce)
+
+        if payer not in self._public_keys:
+            return VerificationResult(False, "Unknown payer", payer)
+        message = signing_bytes(authorization, requirements)
+        if not self._signature_ok(payer, message, payment["payload"]["signature"]):
+            return VerificationResult(False, "Invalid payment signature", payer, nonce)
+        return VerificationResult(True, "", payer, nonce, valid_before)
+
+    def settle(self, header: str, requirements: dict, now: float = None) -> VerificationResult:
+        """Verifies a payment and consumes its nonce, so the same payment is accepted only once."""
+        now = time.time() if now is None else now
+        result = self.verify(header, requirements, now)
+        if result.ok and not self.nonces.add((result.payer, result.nonce), result.valid_before + CLOCK_SKEW_S, now):
+            return VerificationResult(False, "Payment nonce has already been used", result.payer, result.nonce)
+        return result
+
+    def settle_batch(self, headers: List[str], requirements: dict) -> List[VerificationResult]:
+        """
+        Settles a burst of payments in arrival order. Identical headers are
+        decoded and signature-checked once; later copies are rejected as replays.
+        """
+        now = time.time()
+        return [self.settle(header, requirements, now) for header in headers]
+
+    def stats(self) -> dict:
+        return {
+            "nonces_tracked": len(self.nonces),
+            "decode_cache_hits": self._decoded.hits,
+            "signature_cache_hits": self._signatures.hits,
+            "signature_cache_misses": self._signatures.misses,
+        }